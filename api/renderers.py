@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer
+
+
+def _ics_escape(value):
+    return str(value).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+class ICalendarRenderer(BaseRenderer):
+    """
+    Nalivshik smena jadvalini iCalendar (RFC 5545) ko'rinishida qaytaradi:
+    har bir smena — bitta VEVENT. Vaqtlar TIME_ZONE bo'yicha mahalliy vaqt.
+    """
+
+    media_type = "text/calendar"
+    format = "ics"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if "days" not in (data or {}):
+            # Xatolik javoblari (400/403) oddiy matn sifatida
+            return str((data or {}).get("detail", "")).encode(self.charset)
+
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        tzid = settings.TIME_ZONE
+        lines = [
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            "PRODID:-//davomat//nalivshik-schedule//UZ",
+            "CALSCALE:GREGORIAN",
+            f"X-WR-CALNAME:{_ics_escape('Nalivshik smena jadvali')}",
+            f"X-WR-TIMEZONE:{tzid}",
+        ]
+        for day in data["days"]:
+            for shift in day["shifts"]:
+                start = datetime.fromisoformat(shift["start"])
+                end = datetime.fromisoformat(shift["end"])
+                lines += [
+                    "BEGIN:VEVENT",
+                    f"UID:nalivshik-{day['date']}-{shift['kind']}@davomat",
+                    f"DTSTAMP:{stamp}",
+                    f"DTSTART;TZID={tzid}:{start:%Y%m%dT%H%M%S}",
+                    f"DTEND;TZID={tzid}:{end:%Y%m%dT%H%M%S}",
+                    f"SUMMARY:{_ics_escape(shift['team_name'])}",
+                    "END:VEVENT",
+                ]
+        lines.append("END:VCALENDAR")
+        return ("\r\n".join(lines) + "\r\n").encode(self.charset)
@@ -6,7 +6,7 @@ from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
 
-from blog.models import Attendance, Employee, MonthlyEmployeeStat
+from blog.models import Attendance, Employee, MonthlyEmployeeStat, NalivshikShiftOverride, PayrollDirtyMonth, Team
 
 User = get_user_model()
 
@@ -97,3 +97,122 @@ class ApiIntegrationTests(APITestCase):
         self.assertIn("salary", first)
         self.assertIn("currency", first)
         self.assertIn("davomat_id", first)
+
+    def test_nalivshik_schedule_json_ical_and_conditional_get(self):
+        day_team = Team.objects.create(code=1, name="1-komanda")
+        night_team = Team.objects.create(code=3, name="3-komanda")
+        NalivshikShiftOverride.objects.create(date=date(2026, 3, 2), day_team=day_team, night_team=night_team)
+
+        self.client.login(username=self.username, password=self.password)
+        url = f"{reverse('api-nalivshik-schedule')}?from=2026-02-27&to=2026-03-03"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        days = response.data["days"]
+        self.assertEqual(len(days), 5)
+        self.assertEqual(days[3]["date"], "2026-03-02")
+        self.assertEqual((days[3]["day_team"], days[3]["night_team"], days[3]["overridden"]), (1, 3, True))
+        self.assertEqual(days[3]["shifts"][1]["start"], "2026-03-02T21:00:00")
+        self.assertTrue(response["ETag"])
+        self.assertNotIn("Last-Modified", response)
+
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        ical = self.client.get(url + "&format=ics")
+        self.assertEqual(ical.status_code, status.HTTP_200_OK)
+        self.assertTrue(ical["Content-Type"].startswith("text/calendar"))
+        body = ical.content.decode()
+        self.assertEqual(body.count("BEGIN:VEVENT"), 10)
+        self.assertIn("DTSTART;TZID=Asia/Tashkent:20260302T090000", body)
+        self.assertNotEqual(ical["ETag"], response["ETag"])
+
+        # Override o'zgarsa ETag ham o'zgaradi
+        NalivshikShiftOverride.objects.filter(date=date(2026, 3, 2)).delete()
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(changed.status_code, status.HTTP_200_OK)
+        self.assertFalse(changed.data["days"][3]["overridden"])
+
+    def test_nalivshik_schedule_ignores_stale_process_cache(self):
+        from django.core.cache import cache
+
+        from blog.models import ShiftRotation
+        from blog.shift_schedule import CACHE_KEY, DEFAULT_ROTATION, ROTATION_CACHE_KEY
+
+        self.client.login(username=self.username, password=self.password)
+        url = f"{reverse('api-nalivshik-schedule')}?from=2026-03-01&to=2026-03-02"
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+
+        # Boshqa jarayon qoidani o'zgartirgan, bu jarayonning cache'i esa eski
+        ShiftRotation.objects.bulk_create([ShiftRotation(
+            anchor_date=date(2026, 1, 1), anchor_hour=9, shift_hours=24, team_order="2,1,3", day_start_hour=8,
+        )])
+        cache.set(ROTATION_CACHE_KEY, DEFAULT_ROTATION.as_tuple())
+        key = CACHE_KEY.format(rotation=DEFAULT_ROTATION.cache_token, year=2026, month=3)
+        cache.set(key, (((1, 2),) * 31, frozenset()))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["days"][0]["shifts"][0]["start"], "2026-03-01T08:00:00")
+        self.assertNotEqual(
+            (response.data["days"][0]["day_team"], response.data["days"][0]["night_team"]), (1, 2)
+        )
+        cache.delete(ROTATION_CACHE_KEY)
+        cache.delete(key)
+
+    def test_nalivshik_schedule_rejects_bad_range(self):
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.get(f"{reverse('api-nalivshik-schedule')}?from=2026-03-05&to=2026-03-01")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_attendance_batch_requires_authentication(self):
+        response = self.client.post(reverse("api-attendance-batch"), [], format="json")
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+    def test_attendance_batch_json_returns_per_row_results(self):
+        emp = Employee.objects.create(first_name="Turniket", last_name="Xodim", position="Op")
+        Attendance.objects.create(employee=emp, date=date(2026, 5, 4), status="absent")
+        PayrollDirtyMonth.objects.all().delete()
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+        records = [
+            {"worker_code": str(emp.id), "date": "2026-05-04", "status": "present"},
+            {"davomat_id": f"emp_{emp.id}", "date": "2026-05-05", "status": "late", "comment": "08:40"},
+            {"worker_code": "999999", "date": "2026-05-05", "status": "present"},
+            {"worker_code": str(emp.id), "date": "05/05/2026", "status": "present"},
+            "bad",
+        ]
+        response = self.client.post(reverse("api-attendance-batch"), records, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            (response.data["received"], response.data["accepted"], response.data["rejected"], response.data["changed"]),
+            (5, 2, 3, 2),
+        )
+        results = response.data["results"]
+        self.assertEqual([row["status"] for row in results], ["ok", "ok", "error", "error", "error"])
+        self.assertEqual(results[2]["field"], "employee_id")
+        self.assertEqual(results[3]["field"], "date")
+        self.assertEqual(Attendance.objects.get(employee=emp, date=date(2026, 5, 4)).status, "present")
+        self.assertEqual(Attendance.objects.get(employee=emp, date=date(2026, 5, 5)).comment, "08:40")
+        # Oylik qayta hisoblanmaydi, faqat navbatga qo'yiladi
+        self.assertTrue(PayrollDirtyMonth.objects.filter(employee=emp, year=2026, month=5).exists())
+        self.assertFalse(MonthlyEmployeeStat.objects.filter(employee=emp).exists())
+
+    def test_attendance_batch_accepts_ndjson(self):
+        emp = Employee.objects.create(first_name="Bio", last_name="Metrik", position="Op")
+        self.client.login(username=self.username, password=self.password)
+        body = "\n".join(
+            f'{{"worker_code": "{emp.id}", "date": "2026-05-{day:02d}", "status": "present"}}' for day in (4, 5, 6)
+        ) + "\n\n"
+        response = self.client.post(reverse("api-attendance-batch"), body, content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["accepted"], 3)
+        self.assertEqual(Attendance.objects.filter(employee=emp).count(), 3)
+
+        broken = self.client.post(
+            reverse("api-attendance-batch"), '{"worker_code": 1}\n{oops', content_type="application/x-ndjson",
+        )
+        self.assertEqual(broken.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("2-satr", str(broken.data["detail"]))
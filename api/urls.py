@@ -1,12 +1,20 @@
 from django.urls import path
 from rest_framework.authtoken.views import obtain_auth_token
 
-from .views import HealthCheckAPIView, MeAPIView, SalaryStatisticsAPIView
+from .views import (
+    AttendanceBatchAPIView,
+    HealthCheckAPIView,
+    MeAPIView,
+    NalivshikScheduleAPIView,
+    SalaryStatisticsAPIView,
+)
 
 
 urlpatterns = [
     path("health/", HealthCheckAPIView.as_view(), name="api-health"),
     path("me/", MeAPIView.as_view(), name="api-me"),
     path("statistics/salary/", SalaryStatisticsAPIView.as_view(), name="api-salary-statistics"),
+    path("schedule/nalivshik/", NalivshikScheduleAPIView.as_view(), name="api-nalivshik-schedule"),
+    path("attendance/batch/", AttendanceBatchAPIView.as_view(), name="api-attendance-batch"),
     path("auth/token/", obtain_auth_token, name="api-token"),
 ]
@@ -1,15 +1,29 @@
-from datetime import date
+from calendar import monthrange
+from datetime import date, datetime, timedelta
 
-from django.db.models import Count, Q
+from django.conf import settings
+from django.utils.cache import get_conditional_response, quote_etag
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from blog.models import Attendance, MonthlyEmployeeStat
-from blog.services import calculate_monthly_stats
+from blog.attendance_import import ingest_attendance_records
+from blog.models import MonthlyEmployeeStat, NalivshikShiftOverride, Team
+from blog.services import ensure_monthly_stats_for_month, get_attendance_summary_map, recalculate_dirty_stats
+from blog.shift_schedule import (
+    DEFAULT_ROTATION, NIGHT_SHIFT_OFFSET_HOURS, SCHEDULE_MAX_DAYS, CompiledRotation, active_rotation_record,
+    iter_schedule,
+)
 
+from .parsers import NDJSONParser
+from .renderers import ICalendarRenderer
 from .serializers import SalaryStatisticsItemSerializer, UserInfoSerializer
 
+def _batch_max_records():
+    return getattr(settings, "ATTENDANCE_API_MAX_RECORDS", 10000)
+
 
 class HealthCheckAPIView(APIView):
     """
@@ -53,31 +67,25 @@ class SalaryStatisticsAPIView(APIView):
         if month < 1 or month > 12:
             return Response({"detail": "month 1 dan 12 gacha bo'lishi kerak."}, status=400)
 
-        # Statlar bo'lmasa ham endpoint bo'sh ro'yxat qaytarmasligi uchun hisoblaymiz.
-        calculate_monthly_stats(year, month)
+        # Statlar bo'lmasa ham endpoint bo'sh ro'yxat qaytarmasligi uchun yaratamiz;
+        # mavjudlari faqat navbatda (dirty) bo'lsa qayta hisoblanadi.
+        ensure_monthly_stats_for_month(year, month)
+        recalculate_dirty_stats(year, month)
 
         stats = MonthlyEmployeeStat.objects.filter(year=year, month=month).select_related("employee")
-        attendance_counts = Attendance.objects.filter(
-            date__year=year,
-            date__month=month,
-            employee__in=[s.employee_id for s in stats],
-        ).values("employee_id").annotate(
-            present_days=Count("id", filter=Q(status__in=["present", "sick", "late"])),
-            absent_days=Count("id", filter=Q(status="absent")),
-        )
-        attendance_map = {row["employee_id"]: row for row in attendance_counts}
+        summary_map = get_attendance_summary_map(year, month, [s.employee_id for s in stats])
 
         data = []
         for stat in stats:
             emp = stat.employee
-            counts = attendance_map.get(emp.id, {})
+            summary = summary_map.get(emp.id)
             full_name = emp.get_full_name()
             data.append(
                 {
                     "worker_code": str(emp.id),
                     "full_name": full_name,
-                    "present_days": counts.get("present_days", 0),
-                    "absent_days": counts.get("absent_days", 0),
+                    "present_days": summary.worked if summary else 0,
+                    "absent_days": summary.absent if summary else 0,
                     "salary": float(stat.accrued),
                     "currency": stat.currency,
                     "davomat_id": f"emp_{emp.id}",
@@ -86,3 +94,118 @@ class SalaryStatisticsAPIView(APIView):
 
         serializer = SalaryStatisticsItemSerializer(instance=data, many=True)
         return Response({"employees": serializer.data, "year": year, "month": month})
+
+
+class NalivshikScheduleAPIView(APIView):
+    """
+    Nalivshik komandalarining kunduzgi/tungi smena jadvali (JSON yoki iCal).
+    URL: /api/schedule/nalivshik/?from=2026-03-01&to=2026-03-31[&format=ics]
+    Default — joriy oy. ETag aylanish qoidasi va override'lar bo'yicha
+    hisoblanadi, o'zgarish bo'lmasa 304 qaytadi.
+    """
+
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, ICalendarRenderer]
+
+    def get(self, request):
+        today = date.today()
+        try:
+            start = date.fromisoformat(request.GET["from"]) if request.GET.get("from") else today.replace(day=1)
+            end = (
+                date.fromisoformat(request.GET["to"]) if request.GET.get("to")
+                else start.replace(day=monthrange(start.year, start.month)[1])
+            )
+        except ValueError:
+            return Response({"detail": "from/to YYYY-MM-DD formatida bo'lishi kerak."}, status=400)
+        if start > end:
+            return Response({"detail": "from sanasi to sanasidan keyin bo'lishi mumkin emas."}, status=400)
+        if (end - start).days >= SCHEDULE_MAX_DAYS:
+            return Response({"detail": f"Oraliq {SCHEDULE_MAX_DAYS} kundan oshmasligi kerak."}, status=400)
+
+        # Javob ham, validatorlar ham bazadan bir xil ma'lumotdan (jarayon cache'isiz)
+        rotation_record = active_rotation_record()
+        rotation = CompiledRotation.from_model(rotation_record) if rotation_record else DEFAULT_ROTATION
+        overrides = {}
+        last_modified = None
+        for day, day_code, night_code, updated_at in NalivshikShiftOverride.objects.filter(
+            date__range=(start, end)
+        ).values_list("date", "day_team__code", "night_team__code", "updated_at"):
+            overrides[day] = (day_code, night_code)
+            last_modified = max(last_modified or updated_at, updated_at)
+        # Soni o'chirishni, eng oxirgi updated_at — qo'shish/tahrirni ko'rsatadi.
+        # Last-Modified yuborilmaydi: o'chirilgan override uni o'zgartirmaydi.
+        etag = quote_etag(":".join([
+            request.accepted_renderer.format,
+            start.isoformat(),
+            end.isoformat(),
+            rotation.cache_token,
+            str(rotation_record.updated_at.timestamp()) if rotation_record else "-",
+            str(len(overrides)),
+            str(last_modified.timestamp()) if last_modified else "-",
+        ]))
+
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified["ETag"] = etag
+            return not_modified
+
+        team_names = dict(Team.objects.values_list("code", "name"))
+        days = []
+        for day, day_team, night_team, overridden in iter_schedule(start, end, rotation, overrides):
+            day_start = datetime.combine(day, datetime.min.time()) + timedelta(hours=rotation.day_start_hour)
+            night_start = day_start + timedelta(hours=NIGHT_SHIFT_OFFSET_HOURS)
+            days.append({
+                "date": day.isoformat(),
+                "day_team": day_team,
+                "night_team": night_team,
+                "overridden": overridden,
+                "shifts": [
+                    {
+                        "kind": kind,
+                        "team": code,
+                        "team_name": team_names.get(code, f"{code}-komanda"),
+                        "start": shift_start.isoformat(),
+                        "end": (shift_start + timedelta(hours=NIGHT_SHIFT_OFFSET_HOURS)).isoformat(),
+                    }
+                    for kind, code, shift_start in (("day", day_team, day_start), ("night", night_team, night_start))
+                ],
+            })
+
+        response = Response({"from": start.isoformat(), "to": end.isoformat(), "days": days})
+        response["ETag"] = etag
+        return response
+
+
+class AttendanceBatchAPIView(APIView):
+    """
+    Turniket/biometrik qurilmalardan davomatni paket bilan qabul qiladi.
+    URL: POST /api/attendance/batch/
+    Body: JSON massiv (yoki {"records": [...]}) yoki NDJSON
+    (Content-Type: application/x-ndjson). Har bir yozuv:
+    {"worker_code": "12" | "davomat_id": "emp_12", "date": "2026-05-04",
+     "status": "present", "comment": "..."}.
+    Yozuvlar bo'laklab upsert qilinadi, oyliklar navbat orqali keyinroq
+    qayta hisoblanadi. Javobda har bir yozuv uchun natija qaytadi.
+    """
+
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def post(self, request):
+        records = request.data
+        if isinstance(records, dict):
+            records = records.get("records")
+        if not isinstance(records, list):
+            return Response({"detail": "Yozuvlar ro'yxati (massiv) kutilmoqda."}, status=400)
+        max_records = _batch_max_records()
+        if len(records) > max_records:
+            return Response({"detail": f"Bitta so'rovda {max_records} tadan ko'p yozuv bo'lmasligi kerak."}, status=400)
+
+        results, accepted, rejected, changed = ingest_attendance_records(records)
+        return Response({
+            "received": len(records),
+            "accepted": accepted,
+            "rejected": rejected,
+            "changed": changed,
+            "results": results,
+        })
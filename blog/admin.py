@@ -6,12 +6,16 @@ from .models import (
     Attendance,
     DayOff,
     AttendanceImportLog,
+    AttendanceImportError,
+    ExportJob,
     Team,
     MonthlyEmployeeStat,
     NalivshikShiftOverride,
+    ShiftRotation,
     MonthlyProduction,
     SalaryPayment,
 )
+from .resources import AttendanceResource, MonthlyEmployeeStatResource
 
 
 @admin.register(Team)
@@ -43,6 +47,7 @@ class EmployeeAdmin(ImportExportModelAdmin):
 
 @admin.register(Attendance)
 class AttendanceAdmin(ImportExportModelAdmin):
+    resource_classes = [AttendanceResource]
     list_display = ("date", "employee", "status", "comment")
     list_filter = ("date", "status", "employee__department")
     search_fields = ("employee__first_name", "employee__last_name", "comment")
@@ -56,12 +61,28 @@ class DayOffAdmin(admin.ModelAdmin):
 
 @admin.register(AttendanceImportLog)
 class AttendanceImportLogAdmin(admin.ModelAdmin):
-    list_display = ("file_name", "imported_at", "record_count", "success")
-    readonly_fields = ("imported_at",)
+    list_display = ("file_name", "imported_at", "status", "processed_rows", "record_count", "error_count", "success")
+    list_filter = ("status", "success")
+    readonly_fields = ("imported_at", "started_at", "finished_at")
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ("kind", "created_at", "status", "row_count", "file_size", "duration", "user")
+    list_filter = ("status", "kind")
+    readonly_fields = ("params_hash", "created_at", "started_at", "finished_at")
+
+
+@admin.register(AttendanceImportError)
+class AttendanceImportErrorAdmin(admin.ModelAdmin):
+    list_display = ("log", "row_number", "column", "value", "message")
+    list_filter = ("column",)
+    search_fields = ("value", "message")
 
 
 @admin.register(MonthlyEmployeeStat)
 class MonthlyEmployeeStatAdmin(ImportExportModelAdmin):
+    resource_classes = [MonthlyEmployeeStatResource]
     list_display = (
         "employee",
         "year",
@@ -84,6 +105,12 @@ class NalivshikShiftOverrideAdmin(admin.ModelAdmin):
     search_fields = ("comment",)
 
 
+@admin.register(ShiftRotation)
+class ShiftRotationAdmin(admin.ModelAdmin):
+    list_display = ("name", "anchor_date", "anchor_hour", "shift_hours", "team_order", "day_start_hour", "is_active")
+    list_filter = ("is_active",)
+
+
 @admin.register(SalaryPayment)
 class SalaryPaymentAdmin(admin.ModelAdmin):
     list_display = ("stat", "amount", "paid_at", "note", "created_at")
@@ -0,0 +1,586 @@
+"""
+Davomatni CSV/Excel fayldan oqim (streaming) rejimida import qilish.
+
+Fayl butunlay xotiraga yuklanmaydi: CSV `csv` moduli bilan, XLSX esa
+openpyxl read_only rejimida qatorma-qator o'qiladi (eski .xls — pandas orqali).
+Xodimlar bir marta EmployeeResolver indeksiga yuklanadi (id, telefon yoki
+to'liq ism bo'yicha, noaniq mosliklar xatolik sifatida), davomat
+satrlari bo'laklab bulk upsert qilinadi. Bulk yozuvlar signal yubormaydi,
+shuning uchun har bir bo'lakdan keyin rollup va qayta hisoblash navbati
+qo'lda yangilanadi.
+
+Veb so'rov faylni saqlab, AttendanceImportLog vazifasini yaratadi va darhol
+qaytadi; import fon worker'ida bajariladi, oyliklar esa vazifa oxirida
+bir marta qayta hisoblanadi.
+"""
+import csv
+import hashlib
+import io
+import threading
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from openpyxl import load_workbook
+
+from .employee_resolver import EmployeeLookupError, EmployeeResolver
+from .models import Attendance, AttendanceImportError, AttendanceImportLog
+from .services import (
+    mark_payroll_dirty,
+    normalize_attendance_status,
+    recalculate_dirty_stats,
+    refresh_attendance_summary,
+)
+from .work_calendar import SUNDAY, WorkCalendar
+
+REQUIRED_COLUMNS = ('date', 'status')
+
+# Xodimni aniqlash uchun kamida bitta ustunlar to'plami kerak
+EMPLOYEE_COLUMN_SETS = (('employee_id',), ('phone_number',), ('last_name', 'first_name'))
+
+# AttendanceImportLog.log ga yoziladigan xatoliklar soni (qolganlari — AttendanceImportError)
+IMPORT_LOG_ERROR_LIMIT = 20
+
+
+def _chunk_size():
+    return getattr(settings, 'ATTENDANCE_IMPORT_CHUNK_SIZE', 2000)
+
+
+def _check_columns(columns):
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if not any(all(name in columns for name in names) for names in EMPLOYEE_COLUMN_SETS):
+        missing.insert(0, 'employee_id / phone_number / last_name+first_name')
+    if missing:
+        raise ValueError(f"Faylda ustunlar yo'q: {', '.join(missing)}")
+
+
+def iter_csv_rows(file):
+    """(satr raqami, {ustun: qiymat}) — header 1-satr deb hisoblanadi."""
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.DictReader(text)
+        _check_columns(reader.fieldnames or ())
+        for row_number, row in enumerate(reader, start=2):
+            yield row_number, row
+    finally:
+        # Yuklangan fayl obyekti yopilib qolmasligi uchun
+        text.detach()
+
+
+def iter_xlsx_rows(file):
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, ())
+        columns = [str(name).strip() if name is not None else '' for name in header]
+        _check_columns(columns)
+        for row_number, values in enumerate(rows, start=2):
+            if all(value is None for value in values):
+                continue
+            yield row_number, dict(zip(columns, values))
+    finally:
+        workbook.close()
+
+
+def iter_xls_rows(file):
+    """Eski .xls formatini openpyxl o'qimaydi — pandas orqali."""
+    import pandas as pd
+
+    df = pd.read_excel(file)
+    _check_columns(df.columns)
+    df = df.astype(object).where(pd.notna(df), None)
+    for idx, row in enumerate(df.to_dict('records')):
+        yield idx + 2, row
+
+
+def iter_attendance_rows(file, name=None):
+    ext = (name or file.name).split('.')[-1].lower()
+    if ext == 'xlsx':
+        return iter_xlsx_rows(file)
+    if ext == 'xls':
+        return iter_xls_rows(file)
+    return iter_csv_rows(file)
+
+
+def _text(value):
+    return '' if value is None else str(value)
+
+
+def parse_import_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(_text(value).strip())
+
+
+ImportResult = namedtuple('ImportResult', 'count error_count changed_count changed_keys')
+
+
+class RowError(namedtuple('RowError', 'row_number column value message')):
+    """Bitta satr xatoligi (xatoliklar jadvali va yuklab olinadigan hisobot uchun)."""
+
+    __slots__ = ()
+
+    def __str__(self):
+        return f"{self.row_number}-satr: {self.message}"
+
+
+class ImportValidator:
+    """
+    Bo'lak satrlarini ustunlar bo'yicha tekshiradi: har bir ustunning takrorlanmas
+    qiymatlari (sana, status) bir marta tahlil qilinadi, xodimlar EmployeeResolver
+    indeksidan, ish kalendari xotiradagi lug'atdan olinadi — satr boshiga so'rov yo'q.
+    """
+
+    def __init__(self, resolver=None):
+        self.employees = EmployeeResolver.load() if resolver is None else resolver
+        self._dates = {}
+        self._statuses = {}
+        self._calendars = {}
+
+    def _parse_dates(self, values):
+        for value in set(values) - self._dates.keys():
+            try:
+                self._dates[value] = parse_import_date(value)
+            except Exception:
+                self._dates[value] = None
+        return [self._dates[value] for value in values]
+
+    def _normalize_statuses(self, values):
+        """Har bir qiymat → (kod, None) yoki (None, xatolik matni)."""
+        for value in set(values) - self._statuses.keys():
+            try:
+                self._statuses[value] = (normalize_attendance_status(value), None)
+            except ValueError as exc:
+                self._statuses[value] = (None, str(exc))
+        return [self._statuses[value] for value in values]
+
+    def _restricted_reason(self, day):
+        calendar = self._calendars.get(day.year)
+        if calendar is None:
+            # Tekshiruv bazadagi DayOff bo'yicha (import davomida yil uchun bir marta)
+            calendar = self._calendars[day.year] = WorkCalendar.load(day.year)
+        if not calendar.is_restricted(day):
+            return None
+        if day.weekday() == SUNDAY:
+            return str(_("Yakshanba"))
+        return calendar.day_offs.get(day) or str(_("Yopiq kun"))
+
+    def validate(self, rows):
+        """
+        rows: [(satr raqami, qator)]. Natija: (yoziladigan Attendance'lar, RowError'lar).
+        Har bir satr uchun birinchi xatolik qaytariladi; bir xil (xodim, sana)
+        takrorlansa, oxirgi satr yoziladi.
+        """
+        def column(name):
+            return [_hashable(row.get(name)) for _row_number, row in rows]
+
+        raw_dates = column('date')
+        raw_statuses = column('status')
+        days = self._parse_dates(raw_dates)
+        statuses = self._normalize_statuses(raw_statuses)
+
+        valid = {}
+        errors = []
+        for index, (row_number, row) in enumerate(rows):
+            try:
+                employee = self.employees.resolve_row(row)
+            except EmployeeLookupError as exc:
+                errors.append(RowError(row_number, exc.column, exc.value, str(exc)))
+                continue
+            day = days[index]
+            if day is None:
+                value = _text(raw_dates[index])
+                errors.append(RowError(row_number, 'date', value, f"Sana formati noto'g'ri ({value})"))
+                continue
+            status, status_error = statuses[index]
+            if status_error:
+                errors.append(RowError(row_number, 'status', _text(raw_statuses[index]), status_error))
+                continue
+            employee_id = employee.pk
+            if employee.role != 'nalivshik':
+                reason = self._restricted_reason(day)
+                if reason:
+                    errors.append(RowError(
+                        row_number, 'date', day.isoformat(),
+                        f"{day.strftime('%d.%m.%Y')} — {reason}. Bu kunda faqat nalivshiklar davomat kiritishi mumkin.",
+                    ))
+                    continue
+            valid[(employee_id, day)] = Attendance(
+                employee_id=employee_id,
+                date=day,
+                status=status,
+                comment=_text(row.get('comment')),
+            )
+        return valid, errors
+
+
+def _hashable(value):
+    try:
+        hash(value)
+    except TypeError:
+        return _text(value)
+    return value
+
+
+def _changed_rows(pending):
+    """
+    Bazadagi davomat bilan solishtirib, faqat yangi yoki status/izohi
+    o'zgargan satrlarni qoldiradi (bir so'rov bilan).
+    """
+    employee_ids = {employee_id for employee_id, _day in pending}
+    days = {day for _employee_id, day in pending}
+    existing = {
+        (employee_id, day): (status, comment or '')
+        for employee_id, day, status, comment in Attendance.objects.filter(
+            employee_id__in=employee_ids, date__in=days
+        ).values_list('employee_id', 'date', 'status', 'comment')
+    }
+    return {
+        key: attendance
+        for key, attendance in pending.items()
+        if existing.get(key) != (attendance.status, attendance.comment or '')
+    }
+
+
+def _flush(pending):
+    """
+    O'zgargan satrlarni bitta upsert bilan yozadi va faqat ularning oylari
+    uchun rollup/navbatni yangilaydi. Natija: (yozilgan satrlar soni,
+    o'zgargan (xodim, yil, oy) kalitlari).
+    """
+    if not pending:
+        return 0, set()
+    changed = _changed_rows(pending)
+    if not changed:
+        return 0, set()
+    keys = {(employee_id, day.year, day.month) for employee_id, day in changed}
+    with transaction.atomic():
+        Attendance.objects.bulk_create(
+            list(changed.values()),
+            update_conflicts=True,
+            unique_fields=['employee', 'date'],
+            update_fields=['status', 'comment', 'updated_at'],
+        )
+        refresh_attendance_summary(keys)
+        mark_payroll_dirty(keys)
+    return len(changed), keys
+
+
+def import_attendance_rows(rows, chunk_size=None, progress=None, on_errors=None):
+    """
+    (satr raqami, qator) oqimini bo'laklab tekshiradi va import qiladi.
+    Natija: ImportResult (to'g'ri satrlar soni, xatoliklar soni, bazada
+    o'zgargan satrlar soni, o'zgargan (xodim, yil, oy) kalitlari).
+    on_errors(RowError ro'yxati) har bir bo'lak xatoliklari bilan chaqiriladi;
+    progress(to'g'ri, xatoliklar, o'zgargan) har bir bo'lak yozilgach.
+    """
+    chunk_size = chunk_size or _chunk_size()
+    validator = ImportValidator()
+    count = 0
+    error_count = 0
+    changed_count = 0
+    changed_keys = set()
+    for chunk in _chunks(rows, chunk_size):
+        valid, errors = validator.validate(chunk)
+        flushed, keys = _flush(valid)
+        changed_count += flushed
+        changed_keys |= keys
+        count += len(chunk) - len(errors)
+        error_count += len(errors)
+        if errors and on_errors:
+            on_errors(errors)
+        if progress:
+            progress(count, error_count, changed_count)
+    return ImportResult(count, error_count, changed_count, changed_keys)
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_attendance_file(file, chunk_size=None, progress=None, on_errors=None, name=None):
+    """
+    Yuklangan faylni import qiladi: ImportResult (to'g'ri, xatoliklar,
+    o'zgargan sonlari va o'zgargan kalitlar).
+    name — format uchun asl fayl nomi.
+    """
+    return import_attendance_rows(
+        iter_attendance_rows(file, name), chunk_size=chunk_size, progress=progress, on_errors=on_errors,
+    )
+
+
+# --- Qurilmalardan (turniket, biometrik) keladigan yozuvlar -----------------
+
+# API yozuvidagi davomat_id ko'rinishi: "emp_<xodim id>"
+DAVOMAT_ID_PREFIX = 'emp_'
+
+
+def _record_row(record):
+    """API yozuvi → import qatori: worker_code/davomat_id → employee_id."""
+    if not isinstance(record, dict):
+        return None
+    row = dict(record)
+    worker_code = _text(row.pop('worker_code', None)).strip()
+    davomat_id = _text(row.pop('davomat_id', None)).strip()
+    if worker_code:
+        row.setdefault('employee_id', worker_code)
+    elif davomat_id:
+        row.setdefault('employee_id', davomat_id.removeprefix(DAVOMAT_ID_PREFIX))
+    return row
+
+
+def ingest_attendance_records(records, chunk_size=None):
+    """
+    Qurilmalar yuborgan yozuvlar ro'yxatini (worker_code yoki davomat_id, date,
+    status, comment) fayl importi bilan bir xil tekshiruv va bo'laklab upsert
+    orqali yozadi. Oyliklar qayta hisoblanmaydi — faqat PayrollDirtyMonth
+    navbatiga qo'shiladi.
+    Natija: (har bir yozuv uchun natija, to'g'ri, xatoliklar, o'zgargan) —
+    natija {'index': i, 'status': 'ok'} yoki xatolik maydoni va matni bilan.
+    """
+    results = [{'index': index, 'status': 'ok'} for index in range(len(records))]
+    rows = []
+    invalid = 0
+    for index, record in enumerate(records):
+        row = _record_row(record)
+        if row is None:
+            results[index].update(status='error', field=None, error="Yozuv obyekt bo'lishi kerak")
+            invalid += 1
+        else:
+            rows.append((index, row))
+
+    def on_errors(errors):
+        for error in errors:
+            results[error.row_number].update(status='error', field=error.column, error=error.message)
+
+    count, error_count, changed_count, _keys = import_attendance_rows(rows, chunk_size=chunk_size, on_errors=on_errors)
+    return results, count, error_count + invalid, changed_count
+
+
+# --- Fon rejimidagi import vazifalari ---------------------------------------
+#
+# ATTENDANCE_IMPORT_MODE:
+#   'thread' — vazifa shu jarayondagi thread pool'da bajariladi (default);
+#   'queue'  — vazifa navbatda qoladi, `process_attendance_imports` buyrug'i bajaradi;
+#   'sync'   — so'rov ichida darhol bajariladi (testlar, kichik o'rnatishlar).
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _import_mode():
+    return getattr(settings, 'ATTENDANCE_IMPORT_MODE', 'thread')
+
+
+def _stale_after():
+    """Shuncha soniyadan beri 'jarayonda' turgan vazifa to'xtab qolgan hisoblanadi."""
+    return getattr(settings, 'ATTENDANCE_IMPORT_STALE_AFTER', 60 * 60)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'ATTENDANCE_IMPORT_WORKERS', 1),
+                thread_name_prefix='attendance-import',
+            )
+        return _executor
+
+
+def _run_in_thread(log_id):
+    try:
+        run_import_job(log_id)
+    finally:
+        # Thread o'z DB ulanishini yopadi
+        connection.close()
+
+
+def file_content_hash(file):
+    """Faylning SHA-256 xeshi (bo'laklab o'qiladi)."""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def find_duplicate_import(content_hash):
+    """
+    Xuddi shu fayl avval muvaffaqiyatli import qilingan yoki hozir navbatda/
+    jarayonda bo'lsa. To'xtab qolgan (ATTENDANCE_IMPORT_STALE_AFTER dan eski)
+    vazifalar dublikat hisoblanmaydi — faylni qayta yuklash mumkin.
+    """
+    stale_before = timezone.now() - timedelta(seconds=_stale_after())
+    return (
+        AttendanceImportLog.objects.filter(content_hash=content_hash)
+        .filter(
+            Q(status=AttendanceImportLog.STATUS_DONE)
+            | Q(status=AttendanceImportLog.STATUS_QUEUED, imported_at__gte=stale_before)
+            | Q(status=AttendanceImportLog.STATUS_PROCESSING, started_at__gte=stale_before)
+        )
+        .order_by('-imported_at', '-pk')
+        .first()
+    )
+
+
+def enqueue_attendance_import(file, user=None, force=False):
+    """
+    Yuklangan faylni saqlab, import vazifasini yaratadi va rejimga ko'ra
+    ishga tushiradi. Natija: (AttendanceImportLog, yangi vazifa yaratildimi).
+    Aynan shu fayl avval yuklangan bo'lsa (force=False), faylni qayta
+    o'qimasdan mavjud vazifa qaytariladi.
+    """
+    content_hash = file_content_hash(file)
+    if not force:
+        duplicate = find_duplicate_import(content_hash)
+        if duplicate:
+            return duplicate, False
+
+    log = AttendanceImportLog(user=user, file_name=file.name, content_hash=content_hash)
+    log.file.save(file.name, file, save=False)
+    log.save()
+
+    mode = _import_mode()
+    if mode == 'sync':
+        run_import_job(log.pk)
+        log.refresh_from_db()
+    elif mode == 'thread':
+        # Yozuv bazaga tushgandan keyingina thread uni ko'ra oladi
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, log.pk))
+    return log, True
+
+
+def run_import_job(log_id):
+    """
+    Navbatdagi importni bajaradi: fayl oqim rejimida o'qiladi, har bo'lakdan
+    keyin hisoblagichlar yangilanadi, oxirida oyliklar bir marta qayta
+    hisoblanadi. Vazifani boshqa worker olgan bo'lsa, False qaytaradi.
+    """
+    claimed = AttendanceImportLog.objects.filter(
+        pk=log_id, status=AttendanceImportLog.STATUS_QUEUED
+    ).update(status=AttendanceImportLog.STATUS_PROCESSING, started_at=timezone.now())
+    if not claimed:
+        return False
+
+    log = AttendanceImportLog.objects.get(pk=log_id)
+    progress_qs = AttendanceImportLog.objects.filter(pk=log_id)
+    # Qayta ishga tushirilgan vazifaning eski xatoliklari
+    log.errors.all().delete()
+    first_errors = []
+
+    def progress(count, error_count, changed_count):
+        progress_qs.update(
+            processed_rows=count + error_count,
+            record_count=count,
+            error_count=error_count,
+            changed_count=changed_count,
+        )
+
+    def save_errors(errors):
+        AttendanceImportError.objects.bulk_create([
+            AttendanceImportError(
+                log_id=log_id,
+                row_number=error.row_number,
+                column=error.column,
+                value=error.value[:255],
+                message=error.message[:500],
+            )
+            for error in errors
+        ])
+        first_errors.extend(str(error) for error in errors[:IMPORT_LOG_ERROR_LIMIT - len(first_errors)])
+
+    try:
+        with log.file.open('rb'):
+            count, error_count, changed_count, changed_keys = import_attendance_file(
+                log.file.file, progress=progress, on_errors=save_errors, name=log.file_name,
+            )
+    except Exception as e:
+        progress_qs.update(
+            status=AttendanceImportLog.STATUS_FAILED,
+            success=False,
+            log=str(e),
+            finished_at=timezone.now(),
+        )
+        return True
+
+    summary = _error_summary(first_errors, error_count)
+    try:
+        recalculate_import_keys(changed_keys)
+    except Exception as e:
+        # Satrlar yozilgan: import muvaffaqiyatli, kalitlar navbatda qoladi
+        summary += f"; oyliklarni qayta hisoblashda xatolik (navbatda qoldi): {e}"
+
+    progress_qs.update(
+        status=AttendanceImportLog.STATUS_DONE,
+        processed_rows=count + error_count,
+        record_count=count,
+        error_count=error_count,
+        changed_count=changed_count,
+        success=(error_count == 0),
+        log=summary,
+        finished_at=timezone.now(),
+    )
+    return True
+
+
+def recalculate_import_keys(keys):
+    """
+    Faqat import o'zgartirgan (xodim, yil, oy) kalitlarini oy bo'yicha qayta
+    hisoblaydi — boshqa foydalanuvchilar navbatga qo'ygan kalitlar tegilmaydi.
+    """
+    ids_by_month = defaultdict(set)
+    for employee_id, year, month in keys:
+        ids_by_month[(year, month)].add(employee_id)
+    for year, month in sorted(ids_by_month):
+        recalculate_dirty_stats(year, month, employee_ids=ids_by_month[(year, month)])
+
+
+def _error_summary(first_errors, error_count):
+    """Log uchun qisqa matn: birinchi xatoliklar va jami soni (to'liq ro'yxat — hisobotda)."""
+    if not error_count:
+        return 'OK'
+    summary = '; '.join(first_errors)
+    if error_count > len(first_errors):
+        summary += f"; ... jami {error_count} ta xatolik (to'liq ro'yxatni yuklab oling)"
+    return summary
+
+
+def requeue_stale_imports():
+    """
+    Worker (yoki server) import o'rtasida to'xtasa, vazifa 'jarayonda' holatida
+    qolib ketadi. ATTENDANCE_IMPORT_STALE_AFTER soniyadan eski bunday vazifalar
+    navbatga qaytariladi — import upsert bo'lgani uchun qayta bajarish xavfsiz.
+    Qaytarilganlar sonini beradi.
+    """
+    stale_before = timezone.now() - timedelta(seconds=_stale_after())
+    return AttendanceImportLog.objects.filter(
+        status=AttendanceImportLog.STATUS_PROCESSING, started_at__lt=stale_before,
+    ).update(status=AttendanceImportLog.STATUS_QUEUED)
+
+
+def process_queued_imports(limit=None):
+    """
+    Navbatdagi importlarni eski → yangi tartibda bajaradi (to'xtab qolganlari
+    avval navbatga qaytariladi); bajarilganlar soni.
+    """
+    requeue_stale_imports()
+    done = 0
+    queued = AttendanceImportLog.objects.filter(status=AttendanceImportLog.STATUS_QUEUED).order_by('imported_at', 'pk')
+    for log_id in queued.values_list('pk', flat=True)[:limit]:
+        if run_import_job(log_id):
+            done += 1
+    return done
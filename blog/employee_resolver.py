@@ -0,0 +1,178 @@
+"""
+Tashqi ma'lumotlardagi (import fayllari, admin import-export, API) xodimni
+bazadagi Employee yozuviga moslash.
+
+Xodimlar bir marta xotiraga yuklanadi va uchta indeks quriladi: id, telefon
+raqami hamda normallashtirilgan to'liq ism (familiya, ism, otchestva). Ismlar
+katta-kichik harf va o'zbekcha apostrof variantlaridan (o‘, oʻ, o’, o`)
+qat'i nazar solishtiriladi. Bir nechta xodim mos kelsa, birinchisi jimgina
+olinmaydi — EmployeeLookupError bilan "noaniq" deb qaytariladi.
+"""
+import re
+from collections import defaultdict, namedtuple
+
+from .models import Employee
+
+# O'zbek lotin yozuvida o‘/g‘ va tutuq belgisi uchun ishlatiladigan variantlar
+APOSTROPHES = "'`´‘’ʻʼʹ′"
+_APOSTROPHE_TABLE = str.maketrans({char: "'" for char in APOSTROPHES})
+_SPACES = re.compile(r"\s+")
+
+
+class EmployeeMatch(namedtuple('EmployeeMatch', 'pk role full_name')):
+    __slots__ = ()
+
+
+class EmployeeLookupError(ValueError):
+    """Xodim topilmadi yoki bir nechta xodim mos keldi."""
+
+    def __init__(self, message, column, value, candidates=()):
+        super().__init__(message)
+        self.column = column
+        self.value = value
+        self.candidates = tuple(candidates)
+
+    @property
+    def is_ambiguous(self):
+        return len(self.candidates) > 1
+
+
+def normalize_name(value):
+    """'  O‘RINBOYEV ' → "o'rinboyev": apostroflar, bo'shliqlar va registr bir xil."""
+    if value is None:
+        return ''
+    return _SPACES.sub(' ', str(value).translate(_APOSTROPHE_TABLE)).strip().casefold()
+
+
+def _number_text(value):
+    # Excel raqamli katakchalari float bo'lib keladi: 998901234567.0 → "998901234567"
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return '' if value is None else str(value).strip()
+
+
+def normalize_phone(value):
+    """Faqat raqamlar; 9 xonali mahalliy raqamga 998 qo'shiladi."""
+    digits = re.sub(r"\D", "", _number_text(value))
+    if len(digits) == 9:
+        digits = '998' + digits
+    return digits
+
+
+def parse_employee_id(value):
+    text = _number_text(value)
+    return int(text) if text.isdigit() else None
+
+
+class EmployeeResolver:
+    """
+    Xotiradagi xodimlar indeksi. Bitta import/so'rov davomida bir marta
+    quriladi (EmployeeResolver.load()); har bir satr uchun bazaga so'rov yo'q.
+    Bir xil identifikatorlar uchun natija eslab qolinadi.
+    """
+
+    def __init__(self, employees):
+        """employees: (id, familiya, ism, otchestva, telefon, rol) qatorlari."""
+        self._by_id = {}
+        self._by_phone = defaultdict(list)
+        self._by_name = defaultdict(list)
+        self._middle_names = {}
+        for pk, last_name, first_name, middle_name, phone, role in employees:
+            full_name = ' '.join(part for part in (last_name, first_name, middle_name) if part)
+            self._by_id[pk] = EmployeeMatch(pk, role, full_name)
+            phone = normalize_phone(phone)
+            if phone:
+                self._by_phone[phone].append(pk)
+            self._by_name[(normalize_name(last_name), normalize_name(first_name))].append(pk)
+            self._middle_names[pk] = normalize_name(middle_name)
+        self._resolved = {}
+
+    @classmethod
+    def load(cls, queryset=None):
+        queryset = Employee.objects.all() if queryset is None else queryset
+        return cls(queryset.order_by('pk').values_list(
+            'pk', 'last_name', 'first_name', 'middle_name', 'phone_number', 'role',
+        ))
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def get(self, pk):
+        return self._by_id.get(pk)
+
+    def _name_candidates(self, last_name, first_name, middle_name):
+        candidates = self._by_name.get((last_name, first_name), ())
+        if not middle_name or len(candidates) < 2:
+            return candidates
+        exact = [pk for pk in candidates if self._middle_names[pk] == middle_name]
+        # Otchestvasi kiritilmagan xodimlar ham mos kelishi mumkin
+        return exact or [pk for pk in candidates if not self._middle_names[pk]]
+
+    def resolve(self, employee_id=None, phone=None, last_name=None, first_name=None, middle_name=None):
+        """
+        Xodimni topadi: id → telefon → to'liq ism tartibida. Telefon bir nechta
+        xodimga tegishli bo'lsa, ism bilan toraytiriladi.
+        Natija EmployeeMatch; topilmasa yoki noaniq bo'lsa — EmployeeLookupError.
+        """
+        key = (
+            _number_text(employee_id),
+            normalize_phone(phone),
+            normalize_name(last_name),
+            normalize_name(first_name),
+            normalize_name(middle_name),
+        )
+        result = self._resolved.get(key)
+        if result is None:
+            result = self._resolved[key] = self._resolve(key, phone, last_name, first_name, middle_name)
+        if isinstance(result, EmployeeLookupError):
+            raise result
+        return result
+
+    def _resolve(self, key, raw_phone, last_name, first_name, middle_name):
+        raw_pk, phone, *name = key
+        name_label = ' '.join(_number_text(part) for part in (last_name, first_name, middle_name) if part)
+        if raw_pk:
+            match = self._by_id.get(parse_employee_id(raw_pk))
+            if match is None:
+                return EmployeeLookupError(f"Xodim topilmadi (id {raw_pk})", 'employee_id', raw_pk)
+            return match
+
+        candidates, column, label = (), 'last_name', name_label
+        if phone:
+            candidates, column, label = self._by_phone.get(phone, ()), 'phone_number', _number_text(raw_phone)
+        if name[0] or name[1]:
+            by_name = self._name_candidates(*name)
+            narrowed = [candidate for candidate in candidates if candidate in by_name]
+            if narrowed or not candidates:
+                candidates, column, label = narrowed or by_name, 'last_name', name_label
+        if not candidates:
+            return EmployeeLookupError(f"Xodim topilmadi ({label})", column, label)
+        if len(candidates) > 1:
+            ids = ', '.join(str(candidate) for candidate in candidates)
+            return EmployeeLookupError(
+                f"Bir nechta xodim mos keldi ({label}): id {ids}", column, label, candidates,
+            )
+        return self._by_id[candidates[0]]
+
+    def resolve_row(self, row):
+        """Import qatori (lug'at) ustunlaridan: employee_id, phone_number, last_name, first_name, middle_name."""
+        return self.resolve(
+            employee_id=row.get('employee_id'),
+            phone=row.get('phone_number'),
+            last_name=row.get('last_name'),
+            first_name=row.get('first_name'),
+            middle_name=row.get('middle_name'),
+        )
+
+    def resolve_label(self, value):
+        """
+        Bitta katakdagi qiymat: xodim id si, telefon raqami yoki
+        "Familiya Ism [Otchestva]" ko'rinishidagi to'liq ism.
+        """
+        text = _number_text(value)
+        if text.isdigit() and int(text) in self._by_id:
+            return self._by_id[int(text)]
+        if text.lstrip('+').replace(' ', '').replace('-', '').isdigit():
+            return self.resolve(phone=text)
+        parts = text.split(None, 2)
+        return self.resolve(*([None, None] + parts + [None, None])[:5])
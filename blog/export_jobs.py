@@ -0,0 +1,325 @@
+"""
+Katta eksportlarni fonda tayyorlash.
+
+Eksport view'i `background=1` parametri bilan chaqirilsa, fayl so'rov ichida
+qurilmaydi: ExportJob vazifasi yaratiladi va foydalanuvchi "tayyor fayllar"
+sahifasiga yo'naltiriladi. Worker xuddi shu view'ni saqlangan parametrlar
+bilan chaqiradi va javobni MEDIA_ROOT/exports/ ga yozadi; vazifada
+parametrlar, davomiylik, qatorlar soni va fayl hajmi saqlanadi.
+
+Parametrlari (va tili) bir xil vazifa navbatda turgan bo'lsa yoki
+EXPORT_JOB_MAX_AGE soniya ichida tayyorlangan bo'lsa, yangi fayl
+qurilmaydi — mavjud artefakt qaytariladi. EXPORT_JOB_STALE_AFTER soniyadan
+beri navbatda/jarayonda turgan vazifa to'xtab qolgan hisoblanadi: qayta
+ishlatilmaydi, worker uni navbatga qaytaradi. EXPORT_JOB_KEEP_DAYS kundan
+eski vazifalar va ularning fayllari (egasiz qolgan fayllar ham) o'chiriladi.
+"""
+import hashlib
+import json
+import re
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import wraps
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.files import File
+from django.db import connection, transaction
+from django.db.models import Q
+from django.http import HttpRequest, QueryDict
+from django.shortcuts import redirect
+from django.urls import resolve, reverse
+from django.utils import timezone, translation
+from django.utils.translation import gettext as _
+
+from .exports import count_export_rows
+from .models import ExportJob
+
+ExportKind = namedtuple('ExportKind', 'url_name method')
+
+# ExportJob.kind → eksport view'ining URL nomi va so'rov usuli
+EXPORT_KINDS = {
+    'attendance': ExportKind('attendance_export', 'POST'),
+    'employees': ExportKind('employee_list_export', 'GET'),
+    'absence_quota': ExportKind('absence_quota_export', 'GET'),
+    'salary_payments': ExportKind('salary_payment_history_export', 'GET'),
+    'salary_statistics': ExportKind('salary_statistics_export', 'GET'),
+}
+
+# Vazifa parametrlariga kirmaydigan so'rov maydonlari
+_CONTROL_FIELDS = ('csrfmiddlewaretoken', 'background', 'force')
+
+
+# EXPORT_JOB_MODE — ATTENDANCE_IMPORT_MODE bilan bir xil:
+#   'thread' — shu jarayondagi thread pool (default), 'queue' — `process_export_jobs`
+#   buyrug'i bajaradi, 'sync' — so'rov ichida darhol (testlar).
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _job_mode():
+    return getattr(settings, 'EXPORT_JOB_MODE', 'thread')
+
+
+def _max_age():
+    return getattr(settings, 'EXPORT_JOB_MAX_AGE', 60 * 60)
+
+
+def _stale_after():
+    return getattr(settings, 'EXPORT_JOB_STALE_AFTER', 60 * 60)
+
+
+def _keep_days():
+    return getattr(settings, 'EXPORT_JOB_KEEP_DAYS', 7)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'EXPORT_JOB_WORKERS', 1),
+                thread_name_prefix='export-job',
+            )
+        return _executor
+
+
+def _run_in_thread(job_id):
+    try:
+        run_export_job(job_id)
+    finally:
+        connection.close()
+
+
+def export_params(request):
+    """So'rovdagi filtrlar: {nom: qiymat} (takrorlangan maydonlar — ro'yxat)."""
+    data = request.POST if request.method == 'POST' else request.GET
+    return {
+        key: values if len(values) > 1 else values[0]
+        for key, values in sorted(data.lists())
+        if key not in _CONTROL_FIELDS
+    }
+
+
+def params_hash(kind, params, language=''):
+    payload = json.dumps([kind, language, params], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def find_reusable_export(digest):
+    """
+    Yaqinda navbatga qo'yilgan/boshlangan (to'xtab qolmagan) yoki yaqinda
+    tayyorlangan, fayli joyida turgan vazifa.
+    """
+    now = timezone.now()
+    fresh_since = now - timedelta(seconds=_max_age())
+    live_since = now - timedelta(seconds=_stale_after())
+    candidates = ExportJob.objects.filter(params_hash=digest).filter(
+        Q(status=ExportJob.STATUS_QUEUED, created_at__gte=live_since)
+        | Q(status=ExportJob.STATUS_PROCESSING, started_at__gte=live_since)
+        | Q(status=ExportJob.STATUS_DONE, finished_at__gte=fresh_since)
+    )
+    for job in candidates.order_by('-created_at', '-pk'):
+        if job.status != ExportJob.STATUS_DONE or (job.file and job.file.storage.exists(job.file.name)):
+            return job
+    return None
+
+
+def enqueue_export(kind, params, user=None, force=False):
+    """
+    Eksport vazifasini yaratadi va rejimga ko'ra ishga tushiradi.
+    Natija: (ExportJob, yangi vazifa yaratildimi). force=False bo'lsa,
+    bir xil parametrli mavjud vazifa qaytariladi.
+    """
+    if kind not in EXPORT_KINDS:
+        raise ValueError(f"Noma'lum eksport turi: {kind}")
+    language = translation.get_language() or ''
+    digest = params_hash(kind, params, language)
+    if not force:
+        existing = find_reusable_export(digest)
+        if existing:
+            return existing, False
+
+    prune_export_jobs()
+    job = ExportJob.objects.create(
+        user=user if user is not None and user.is_authenticated else None,
+        kind=kind, params=params, params_hash=digest, language=language,
+    )
+    mode = _job_mode()
+    if mode == 'sync':
+        run_export_job(job.pk)
+        job.refresh_from_db()
+    elif mode == 'thread':
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, job.pk))
+    return job, True
+
+
+def background_export(kind):
+    """
+    Eksport view'i uchun dekorator: `background` parametri bo'lsa, faylni
+    fonda tayyorlashga qo'yib, tayyor fayllar sahifasiga yo'naltiradi.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            data = request.POST if request.method == 'POST' else request.GET
+            if not data.get('background'):
+                return view(request, *args, **kwargs)
+            job, created = enqueue_export(kind, export_params(request), user=request.user, force=bool(data.get('force')))
+            if created:
+                messages.info(request, _("Eksport fonda tayyorlanmoqda. Tayyor bo'lgach shu yerdan yuklab olasiz."))
+            else:
+                messages.info(request, _("Xuddi shu parametrli eksport allaqachon mavjud — tayyor fayl ishlatiladi."))
+            return redirect(f"{reverse('export_jobs')}?job={job.pk}")
+        return wrapper
+    return decorator
+
+
+def _build_request(job):
+    spec = EXPORT_KINDS[job.kind]
+    query = QueryDict(mutable=True)
+    for key, value in job.params.items():
+        query.setlist(key, value if isinstance(value, list) else [value])
+    request = HttpRequest()
+    request.method = spec.method
+    request.path = reverse(spec.url_name)
+    if spec.method == 'POST':
+        request.POST = query
+    else:
+        request.GET = query
+    request.user = job.user
+    request._messages = CookieStorage(request)
+    return request
+
+
+_FILENAME_RE = re.compile(r"filename\*=UTF-8''(?P<quoted>[^;]+)|filename=\"(?P<plain>[^\"]+)\"", re.IGNORECASE)
+
+
+def _response_filename(response, default):
+    filename = getattr(response, 'filename', None)
+    if filename:
+        return filename
+    match = _FILENAME_RE.search(response.get('Content-Disposition', ''))
+    if not match:
+        return default
+    return unquote(match.group('quoted')) if match.group('quoted') else match.group('plain')
+
+
+def run_export_job(job_id):
+    """
+    Vazifani bajaradi: eksport view'i saqlangan parametrlar bilan chaqiriladi,
+    javob vaqtinchalik faylga oqim bilan yoziladi va MEDIA_ROOT/exports/ ga
+    ko'chiriladi. Vazifani boshqa worker olgan bo'lsa, False qaytaradi.
+    """
+    claimed = ExportJob.objects.filter(pk=job_id, status=ExportJob.STATUS_QUEUED).update(
+        status=ExportJob.STATUS_PROCESSING, started_at=timezone.now(),
+    )
+    if not claimed:
+        return False
+
+    job = ExportJob.objects.get(pk=job_id)
+    started = time.monotonic()
+    try:
+        # Eksport view'lari login_required — egasi o'chirilgan vazifa bajarilmaydi
+        if job.user is None or not job.user.is_active:
+            raise ValueError(_("Eksport egasi topilmadi yoki faol emas"))
+        view = resolve(reverse(EXPORT_KINDS[job.kind].url_name)).func
+        with translation.override(job.language or None), count_export_rows() as counter:
+            request = _build_request(job)
+            response = view(request)
+            try:
+                if response.status_code != 200:
+                    raise ValueError(_("Eksport bajarilmadi (HTTP %(status)s)") % {"status": response.status_code})
+                with tempfile.TemporaryFile() as buffer:
+                    for chunk in response:
+                        buffer.write(chunk)
+                    buffer.seek(0)
+                    filename = _response_filename(response, f"{job.kind}.xlsx")
+                    job.file.save(filename, File(buffer), save=False)
+            finally:
+                response.close()
+    except Exception as e:
+        ExportJob.objects.filter(pk=job_id).update(
+            status=ExportJob.STATUS_FAILED,
+            log=str(e),
+            duration=time.monotonic() - started,
+            finished_at=timezone.now(),
+        )
+        return True
+
+    job.file_name = filename
+    job.file_size = job.file.size
+    job.row_count = counter.rows
+    job.status = ExportJob.STATUS_DONE
+    job.duration = time.monotonic() - started
+    job.finished_at = timezone.now()
+    job.log = 'OK'
+    job.save(update_fields=[
+        'file', 'file_name', 'file_size', 'row_count', 'status', 'duration', 'finished_at', 'log',
+    ])
+    return True
+
+
+def requeue_stale_exports():
+    """
+    EXPORT_JOB_STALE_AFTER soniyadan beri 'jarayonda' turgan (worker to'xtagan)
+    vazifalarni navbatga qaytaradi; qaytarilganlar soni.
+    """
+    stale_before = timezone.now() - timedelta(seconds=_stale_after())
+    return ExportJob.objects.filter(
+        status=ExportJob.STATUS_PROCESSING, started_at__lt=stale_before,
+    ).update(status=ExportJob.STATUS_QUEUED)
+
+
+def _prune_orphan_files(storage, directory, referenced, deadline):
+    directories, files = storage.listdir(directory)
+    for name in files:
+        path = f"{directory}/{name}"
+        if path not in referenced and storage.get_modified_time(path) < deadline:
+            storage.delete(path)
+    for name in directories:
+        _prune_orphan_files(storage, f"{directory}/{name}", referenced, deadline)
+
+
+def prune_export_jobs():
+    """
+    EXPORT_JOB_KEEP_DAYS kundan eski vazifalarni fayllari bilan o'chiradi,
+    so'ng MEDIA_ROOT/exports/ dagi hech bir vazifaga tegishli bo'lmagan eski
+    fayllarni ham tozalaydi. O'chirilgan vazifalar soni.
+    """
+    deadline = timezone.now() - timedelta(days=_keep_days())
+    expired = ExportJob.objects.filter(created_at__lt=deadline)
+    count = 0
+    for job in expired.only('pk', 'file'):
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        count += 1
+
+    storage = ExportJob._meta.get_field('file').storage
+    if storage.exists('exports'):
+        referenced = set(ExportJob.objects.exclude(file='').exclude(file=None).values_list('file', flat=True))
+        _prune_orphan_files(storage, 'exports', referenced, deadline)
+    return count
+
+
+def process_queued_exports(limit=None):
+    """
+    Navbatdagi eksport vazifalarini eski → yangi tartibda bajaradi (to'xtab
+    qolganlari avval navbatga qaytariladi, eskilari tozalanadi); bajarilganlar soni.
+    """
+    requeue_stale_exports()
+    prune_export_jobs()
+    done = 0
+    queued = ExportJob.objects.filter(status=ExportJob.STATUS_QUEUED).order_by('created_at', 'pk')
+    for job_id in queued.values_list('pk', flat=True)[:limit]:
+        if run_export_job(job_id):
+            done += 1
+    return done
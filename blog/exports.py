@@ -0,0 +1,530 @@
+"""
+Eksportlarning tezkor CSV formati (skriptlar va BI yuklovchilar uchun).
+
+?format=csv yoki ?format=csv.gz bo'lsa, eksport view'lari openpyxl o'rniga
+qatorlarni bazadan (values_list().iterator()) to'g'ridan-to'g'ri
+StreamingHttpResponse orqali yuboradi: stil va zip yo'q, xotirada faqat
+bitta bo'lak turadi. csv.gz — gzip oqimi (zlib), javob tanasi bo'laklab siqiladi.
+
+Excel eksportlari umumiy dvigatel orqali quriladi: ustunlar deklarativ
+(Column — sarlavha, qiymat oluvchi, stil, raqam formati, kenglik), stillar
+esa nomlangan (NamedStyle) reyestrdan olinadi — har bir katak uchun yangi
+Font/Border/PatternFill yaratilmaydi. Ustun kengliklari qatorlar yozilayotganda
+o'lchanadi; write_only rejimida esa kenglik ko'rsatmasidan olinadi.
+
+Og'ir Excel fayllari diskdagi keshda saqlanadi: kalit (eksport turi, filtrlar,
+til, ma'lumotlar "watermark"i) dan hosil qilinadi, ma'lumot o'zgarsa watermark
+ham o'zgaradi va fayl qayta quriladi. Eski fayllar EXPORT_CACHE_MAX_AGE
+soniyadan keyin o'chiriladi.
+
+Yozilgan ma'lumot qatorlari count_export_rows() hisoblagichiga qo'shiladi —
+fon eksport vazifalari (export_jobs) qator sonini shundan oladi.
+"""
+import csv
+import hashlib
+import os
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from openpyxl.cell import Cell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+CSV_FORMATS = ('csv', 'csv.gz')
+
+# Bitta yield'da yuboriladigan taxminiy hajm (bayt)
+STREAM_BUFFER_SIZE = 64 * 1024
+
+
+_row_counter = ContextVar('export_row_counter', default=None)
+
+
+class RowCounter:
+    __slots__ = ('rows',)
+
+    def __init__(self):
+        self.rows = 0
+
+
+@contextmanager
+def count_export_rows():
+    """Blok ichida yozilgan eksport qatorlari soni: with count_export_rows() as counter: ... counter.rows"""
+    counter = RowCounter()
+    token = _row_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _row_counter.reset(token)
+
+
+def add_export_rows(count):
+    counter = _row_counter.get()
+    if counter is not None:
+        counter.rows += count
+
+
+def export_format(request):
+    """So'ralgan CSV formati ('csv' / 'csv.gz') yoki None (Excel)."""
+    value = (request.POST.get('format') or request.GET.get('format') or '').strip().lower()
+    return value if value in CSV_FORMATS else None
+
+
+class _LineBuffer:
+    """csv.writer uchun: yozilgan satrni qaytaradi, o'zida saqlamaydi."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(headers, rows):
+    """Sarlavha (Excel uchun BOM bilan) va qatorlar — bufer hajmidagi matn bo'laklari."""
+    writer = csv.writer(_LineBuffer())
+    chunk = ['\ufeff' + writer.writerow([str(header) for header in headers])]
+    size = len(chunk[0])
+    count = 0
+    for row in rows:
+        line = writer.writerow(row)
+        chunk.append(line)
+        size += len(line)
+        count += 1
+        if size >= STREAM_BUFFER_SIZE:
+            yield ''.join(chunk)
+            chunk, size = [], 0
+    add_export_rows(count)
+    if chunk:
+        yield ''.join(chunk)
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip sarlavhasi bilan
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def csv_response(headers, rows, filename, fmt='csv'):
+    """
+    Qatorlarni CSV (yoki csv.gz) oqimi sifatida yuboradi.
+    filename — kengaytmasiz fayl nomi.
+    """
+    chunks = iter_csv(headers, rows)
+    if fmt == 'csv.gz':
+        response = StreamingHttpResponse(_gzip(chunks), content_type='application/gzip')
+    else:
+        response = StreamingHttpResponse(chunks, content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+
+def _cache_dir():
+    return getattr(settings, 'EXPORT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'davomat-export-cache'))
+
+
+def _cache_max_age():
+    return getattr(settings, 'EXPORT_CACHE_MAX_AGE', 24 * 60 * 60)
+
+
+def export_cache_path(key_parts, suffix='.xlsx'):
+    """Kesh kaliti qismlaridan (repr qilinadigan qiymatlar) fayl yo'li."""
+    digest = hashlib.sha256(repr(tuple(key_parts)).encode('utf-8')).hexdigest()
+    return os.path.join(_cache_dir(), digest + suffix)
+
+
+def cached_file_response(path, filename, content_type):
+    """Keshdagi fayl bo'lsa — FileResponse, bo'lmasa None."""
+    try:
+        handle = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+    return FileResponse(handle, as_attachment=True, filename=filename, content_type=content_type)
+
+
+def _prune_cache(directory):
+    deadline = time.time() - _cache_max_age()
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < deadline:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+def store_in_cache(path, write):
+    """
+    write(fayl) natijasini keshga yozadi: avval vaqtinchalik faylga, so'ng
+    os.replace — parallel so'rovlar chala faylni o'qimasligi uchun.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    _prune_cache(directory)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            write(handle)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+# --- Excel eksport dvigateli ------------------------------------------------
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class StyleRegistry:
+    """
+    Nomlangan stillar ta'riflari. Stil workbook'ga birinchi ishlatilganda bir
+    marta qo'shiladi, kataklar unga nomi bilan murojaat qiladi.
+    """
+
+    def __init__(self):
+        self._specs = {}
+
+    def define(self, name, based_on=None, **attrs):
+        """attrs: font, fill, border, alignment, number_format. based_on — boshqa stildan meros."""
+        spec = dict(self._specs[based_on]) if based_on else {}
+        spec.update(attrs)
+        self._specs[name] = spec
+        return name
+
+    def ensure(self, wb, name):
+        if name not in wb.named_styles:
+            wb.add_named_style(NamedStyle(name=name, **self._specs[name]))
+
+
+EXPORT_HEADER_STYLE = 'davomat-header'
+
+# Oylik statistikasi workbook'idagi guruh sarlavhalari ranglari (xodim turi bo'yicha)
+SALARY_GROUP_COLORS = {'full': '2E75B6', 'half': 'FF6B35', 'weekly': '6C757D', 'guard': 'DC3545', 'office': '8E44AD'}
+
+
+def _define_employee_list_styles(styles):
+    border = Border(**{side: Side(style='thin', color='D1D5DB') for side in ('left', 'right', 'top', 'bottom')})
+    styles.define(
+        'employee-list-title',
+        font=Font(bold=True, size=16, color='FFFFFF'),
+        fill=PatternFill(start_color='4A90E2', end_color='5B6FE8', fill_type='solid'),
+        alignment=Alignment(horizontal='center', vertical='center'),
+    )
+    styles.define(
+        'employee-list-subtitle',
+        font=Font(size=10, color='475569'), alignment=Alignment(horizontal='center', vertical='center'),
+    )
+    styles.define(
+        'employee-list-header',
+        font=Font(bold=True, color='FFFFFF', size=11),
+        fill=PatternFill(start_color='2C3E50', end_color='2C3E50', fill_type='solid'),
+        alignment=Alignment(horizontal='center', vertical='center', wrap_text=True),
+        border=border,
+    )
+    for name, alignment in (
+        ('employee-list-cell', Alignment(horizontal='left', vertical='center')),
+        ('employee-list-center', Alignment(horizontal='center', vertical='center')),
+        ('employee-list-wrap', Alignment(horizontal='left', vertical='center', wrap_text=True)),
+    ):
+        styles.define(name, border=border, alignment=alignment)
+        styles.define(
+            f'{name}-alt', based_on=name, fill=PatternFill(start_color='F8FAFC', end_color='F8FAFC', fill_type='solid'),
+        )
+    styles.define(
+        'employee-list-active', based_on='employee-list-center',
+        fill=PatternFill(start_color='D1FAE5', end_color='D1FAE5', fill_type='solid'),
+        font=Font(bold=True, color='065F46'),
+    )
+    styles.define(
+        'employee-list-inactive', based_on='employee-list-center',
+        fill=PatternFill(start_color='F3F4F6', end_color='F3F4F6', fill_type='solid'),
+        font=Font(bold=True, color='6B7280'),
+    )
+
+
+def _define_salary_styles(styles):
+    thick_white = Side(style='thick', color='FFFFFF')
+    header_border = Border(
+        left=Side(style='medium', color='1E3A5F'), right=Side(style='medium', color='1E3A5F'),
+        top=Side(style='medium', color='1E3A5F'), bottom=Side(style='thick', color='1E3A5F'),
+    )
+    styles.define(
+        'salary-title',
+        font=Font(name='Calibri', bold=True, size=16, color='FFFFFF'),
+        fill=PatternFill(start_color='2C3E50', end_color='34495E', fill_type='solid'),
+        alignment=Alignment(horizontal='center', vertical='center', wrap_text=True),
+        border=Border(left=thick_white, right=thick_white, top=thick_white, bottom=thick_white),
+    )
+    styles.define(
+        'salary-header',
+        font=Font(name='Calibri', bold=True, size=12, color='FFFFFF'),
+        fill=PatternFill(start_color='4472C4', end_color='5B7FBD', fill_type='solid'),
+        alignment=Alignment(horizontal='center', vertical='center', wrap_text=True),
+        border=header_border,
+    )
+    styles.define(
+        'salary-subheader', based_on='salary-header',
+        font=Font(name='Calibri', bold=True, size=11, color='FFFFFF'),
+        fill=PatternFill(start_color='5B7FBD', end_color='4472C4', fill_type='solid'),
+    )
+    for emp_type, color in SALARY_GROUP_COLORS.items():
+        # Gradient effekt uchun biroz qorong'iroq rang
+        darker = f"{max(int(color, 16) - 0x202020, 0):06X}"
+        styles.define(
+            f'salary-group-{emp_type}',
+            font=Font(name='Calibri', bold=True, size=13, color='FFFFFF'),
+            fill=PatternFill(start_color=color, end_color=darker, fill_type='solid'),
+            alignment=Alignment(horizontal='center', vertical='center'),
+            border=Border(left=thick_white, right=thick_white, top=thick_white, bottom=thick_white),
+        )
+
+    thin_black = Side(style='thin', color='000000')
+    alt_fill = PatternFill(start_color='F5F5F5', end_color='F5F5F5', fill_type='solid')
+    styles.define(
+        'salary-cell',
+        font=Font(name='Calibri', size=11, color='1F1F1F'),
+        border=Border(left=thin_black, right=thin_black, top=thin_black, bottom=thin_black),
+    )
+    styles.define(
+        'salary-number', based_on='salary-cell',
+        font=Font(name='Calibri', bold=True, size=11, color='1F1F1F'),
+        alignment=Alignment(horizontal='center', vertical='center'),
+        fill=PatternFill(start_color='F0F0F0', end_color='F0F0F0', fill_type='solid'),
+    )
+    styles.define('salary-name', based_on='salary-cell', alignment=Alignment(horizontal='left', vertical='center'))
+    styles.define('salary-name-alt', based_on='salary-name', fill=alt_fill)
+    styles.define('salary-money', based_on='salary-cell', alignment=Alignment(horizontal='right', vertical='center'))
+    styles.define('salary-money-alt', based_on='salary-money', fill=alt_fill)
+    styles.define(
+        'salary-debt', based_on='salary-money',
+        font=Font(name='Calibri', bold=True, size=11, color='9C0006'),
+        fill=PatternFill(start_color='FFE4E1', end_color='FFE4E1', fill_type='solid'),
+    )
+    styles.define(
+        'salary-debt-clear', based_on='salary-money',
+        font=Font(name='Calibri', bold=True, size=11, color='006100'),
+        fill=PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid'),
+    )
+
+    styles.define(
+        'salary-total-banner', based_on='salary-title',
+        font=Font(name='Calibri', bold=True, size=14, color='FFFFFF'),
+        fill=PatternFill(start_color='1E3A5F', end_color='2C5282', fill_type='solid'),
+        alignment=Alignment(horizontal='center', vertical='center'),
+    )
+    # JAMI qatori: tashqi ramka qalin, ichki ajratgichlar medium
+    total_thick = Side(style='thick', color='0B2A3C')
+    total_medium = Side(style='medium', color='0B2A3C')
+    styles.define(
+        'salary-total',
+        font=Font(name='Calibri', bold=True, size=12, color='FFFFFF'),
+        fill=PatternFill(start_color='1E3A5F', end_color='1E3A5F', fill_type='solid'),
+        alignment=Alignment(horizontal='right', vertical='center'),
+        border=Border(left=total_medium, right=total_medium, top=total_thick, bottom=total_thick),
+    )
+    styles.define(
+        'salary-total-first', based_on='salary-total',
+        border=Border(left=total_thick, right=total_medium, top=total_thick, bottom=total_thick),
+    )
+    styles.define(
+        'salary-total-label', based_on='salary-total', alignment=Alignment(horizontal='center', vertical='center'),
+    )
+    styles.define(
+        'salary-total-debt', based_on='salary-total',
+        fill=PatternFill(start_color='FF6B6B', end_color='FF6B6B', fill_type='solid'),
+    )
+    styles.define(
+        'salary-total-clear', based_on='salary-total',
+        fill=PatternFill(start_color='4ECDC4', end_color='4ECDC4', fill_type='solid'),
+    )
+    for name in ('salary-total', 'salary-total-debt', 'salary-total-clear'):
+        styles.define(
+            f'{name}-last', based_on=name,
+            border=Border(left=total_medium, right=total_thick, top=total_thick, bottom=total_thick),
+        )
+
+
+def build_styles():
+    """Eksportlar uchun umumiy nomlangan stillar reyestrini quradi."""
+    styles = StyleRegistry()
+    styles.define(EXPORT_HEADER_STYLE, font=Font(bold=True), alignment=Alignment(horizontal='center'))
+    _define_employee_list_styles(styles)
+    _define_salary_styles(styles)
+    return styles
+
+
+STYLES = build_styles()
+
+
+class Column:
+    """
+    Eksport ustuni.
+    value — yozuvdan qiymat oluvchi funksiya; style — stil nomi yoki
+    style(qiymat, yozuv, qator raqami) → nom; number_format — format yoki
+    number_format(yozuv) → format (bo'sh qiymatlarga qo'yilmaydi);
+    width — kenglik ko'rsatmasi: berilsa o'lchanmaydi, write_only rejimida
+    faqat shu ishlatiladi. Aks holda kenglik eng uzun qiymat + padding,
+    max_width bilan cheklanadi.
+    """
+
+    __slots__ = ('header', 'value', 'style', 'number_format', 'width', 'padding', 'max_width')
+
+    def __init__(self, header, value, style=None, number_format=None, width=None, padding=2, max_width=None):
+        self.header = header
+        self.value = value
+        self.style = style
+        self.number_format = number_format
+        self.width = width
+        self.padding = padding
+        self.max_width = max_width
+
+
+def zebra(style, alt_style):
+    """Juft qatorlar uchun alt_style (jadvalning "zebra" chiziqlari)."""
+    return lambda value, record, row_number: alt_style if row_number % 2 == 0 else style
+
+
+class SheetWriter:
+    """
+    Bitta varaqni qatorma-qator yozadi (oddiy yoki write_only workbook).
+    Qatorlar har doim ws.append bilan qo'shiladi, shuning uchun ikkala
+    rejimda ham bir xil kod ishlaydi.
+    """
+
+    def __init__(self, wb, title, columns, styles=STYLES, freeze_panes=None):
+        self.wb = wb
+        self.ws = wb.create_sheet(title=str(title))
+        self.columns = columns
+        self.styles = styles
+        self.row_number = 0
+        self._measured = [0] * len(columns)
+        if wb.write_only:
+            # write_only: kenglik va panellar birinchi qatordan oldin yozilishi shart
+            for index, column in enumerate(columns, start=1):
+                if column.width:
+                    self.ws.column_dimensions[get_column_letter(index)].width = column.width
+        if freeze_panes:
+            self.ws.freeze_panes = freeze_panes
+
+    def _cell(self, value, style=None, number_format=None):
+        if not style and not number_format:
+            return value
+        # Joy ws.append da qo'yiladi; write_only rejimi koordinatasiz katakni qabul qilmaydi
+        cell = Cell(self.ws, row=1, column=1, value=value)
+        if style:
+            self.styles.ensure(self.wb, style)
+            cell.style = style
+        if number_format and value not in (None, ''):
+            cell.number_format = number_format
+        return cell
+
+    def append(self, cells, height=None):
+        self.ws.append(cells)
+        self.row_number += 1
+        if height:
+            self.ws.row_dimensions[self.row_number].height = height
+        return self.row_number
+
+    def row(self, values, style=None, height=None, measure=False):
+        """Erkin qator: values — qiymatlar yoki (qiymat, stil[, format]) juftliklari."""
+        cells = []
+        for index, item in enumerate(values):
+            if isinstance(item, tuple):
+                value, cell_style, number_format = item + (None,) * (3 - len(item))
+            else:
+                value, cell_style, number_format = item, style, None
+            cells.append(self._cell(value, cell_style, number_format))
+            if measure:
+                self._measure(index, value)
+        return self.append(cells, height)
+
+    def merge(self, first_col, last_col, first_row=None, last_row=None):
+        first_row = first_row or self.row_number
+        last_row = last_row or first_row
+        cell_range = f"{get_column_letter(first_col)}{first_row}:{get_column_letter(last_col)}{last_row}"
+        if self.wb.write_only:
+            self.ws.merged_cells.add(cell_range)
+        else:
+            self.ws.merge_cells(cell_range)
+
+    def banner(self, text, style, height=None, rows=1):
+        """Barcha ustunlar bo'ylab birlashtirilgan sarlavha qatori (rows qator balandlikda)."""
+        width = len(self.columns)
+        first = self.row_number + 1
+        for offset in range(rows):
+            self.row([text if offset == 0 else None] + [None] * (width - 1), style=style, height=height)
+        self.merge(1, width, first, self.row_number)
+
+    def blank(self):
+        return self.append([])
+
+    def header(self, style=None, height=None):
+        for index, column in enumerate(self.columns):
+            self._measure(index, column.header)
+        return self.row([column.header for column in self.columns], style=style, height=height)
+
+    def _measure(self, index, value):
+        if value is not None and value != '':
+            length = len(str(value))
+            if length > self._measured[index]:
+                self._measured[index] = length
+
+    def write(self, records, height=None):
+        """Yozuvlarni ustun ta'riflari bo'yicha yozadi; kengliklar shu yerda o'lchanadi."""
+        columns = list(enumerate(self.columns))
+        count = 0
+        for record in records:
+            count += 1
+            row_number = self.row_number + 1
+            cells = []
+            for index, column in columns:
+                value = column.value(record)
+                style = column.style(value, record, row_number) if callable(column.style) else column.style
+                number_format = column.number_format
+                if callable(number_format):
+                    number_format = number_format(record)
+                cells.append(self._cell(value, style, number_format))
+                self._measure(index, value)
+            self.append(cells, height)
+        add_export_rows(count)
+
+    def finish(self):
+        """Oddiy rejimda o'lchangan kengliklarni qo'yadi."""
+        if self.wb.write_only:
+            return self.ws
+        for index, column in enumerate(self.columns):
+            width = column.width
+            if not width and self._measured[index]:
+                width = self._measured[index] + column.padding
+                if column.max_width:
+                    width = min(width, column.max_width)
+            if width:
+                self.ws.column_dimensions[get_column_letter(index + 1)].width = width
+        return self.ws
+
+
+def new_workbook(write_only=False):
+    """Bo'sh workbook (oddiy rejimdagi standart varaqsiz)."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=write_only)
+    if not write_only:
+        wb.remove(wb.active)
+    return wb
+
+
+def xlsx_file_response(wb, filename):
+    """
+    Workbook'ni vaqtinchalik faylga yozib, FileResponse bilan qismlab yuboradi.
+    Kichik fayllar xotirada qoladi, kattalari diskka o'tadi
+    (EXPORT_SPOOL_MAX_SIZE, bayt).
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=getattr(settings, 'EXPORT_SPOOL_MAX_SIZE', 5 * 1024 * 1024))
+    wb.save(spool)
+    spool.seek(0)
+    return FileResponse(spool, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
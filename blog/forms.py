@@ -1,6 +1,7 @@
 from django import forms
 from django.utils.translation import gettext_lazy as _
 from .models import Attendance, Employee, DayOff, NalivshikShiftOverride, Team, MonthlyProduction
+from .work_calendar import WorkCalendar
 import datetime
 import os
 from .models import MonthlyEmployeeStat
@@ -38,7 +39,7 @@ class AttendanceForm(forms.ModelForm):
                     f"{att_date.strftime('%d.%m.%Y')} — {reason}. "
                     "Bu kunda faqat nalivshiklar davomat kiritishi mumkin."
                 )
-        elif att_date and DayOff.objects.filter(date=att_date).exists() and status != 'offday':
+        elif att_date and WorkCalendar.load(att_date.year).is_day_off(att_date) and status != 'offday':
             raise forms.ValidationError("Bu sana yopiq kun. Faqat 'Ish kuni emas' holatini tanlang!")
 
         if status in ['absent', 'sick', 'vacation']:
@@ -48,6 +49,11 @@ class AttendanceForm(forms.ModelForm):
 
 class AttendanceImportForm(forms.Form):
     file = forms.FileField(label=_("Excel yoki CSV fayl"))
+    force = forms.BooleanField(
+        label=_("Avval yuklangan bo'lsa ham qayta import qilish"),
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
 
     def clean_file(self):
         file = self.cleaned_data['file']
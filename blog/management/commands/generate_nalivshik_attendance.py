@@ -0,0 +1,49 @@
+"""
+Nalivshiklar davomatini smena jadvali bo'yicha sana oralig'i uchun yozish.
+Ishlatish: python manage.py generate_nalivshik_attendance --from 2026-01-01 --to 2026-03-31
+
+Mavjud (qo'lda kiritilgan) yozuvlar o'zgartirilmaydi, faqat yetishmayotganlari qo'shiladi.
+"""
+import argparse
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.services import generate_nalivshik_attendance_for_range
+
+
+def iso_date(value):
+    """'YYYY-MM-DD' → date."""
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' — YYYY-MM-DD formatida bo'lishi kerak")
+
+
+class Command(BaseCommand):
+    help = "Nalivshiklar davomatini smena jadvali bo'yicha sana oralig'i uchun yozadi"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--from",
+            dest="start",
+            type=iso_date,
+            required=True,
+            help="Boshlanish sanasi (YYYY-MM-DD)",
+        )
+        parser.add_argument(
+            "--to",
+            dest="end",
+            type=iso_date,
+            required=True,
+            help="Tugash sanasi (YYYY-MM-DD, kiradi)",
+        )
+
+    def handle(self, *args, **options):
+        start, end = options["start"], options["end"]
+        if start > end:
+            raise CommandError("--from sanasi --to sanasidan keyin bo'lishi mumkin emas.")
+        created = generate_nalivshik_attendance_for_range(start, end)
+        self.stdout.write(self.style.SUCCESS(
+            f"Tayyor: {start:%d.%m.%Y}–{end:%d.%m.%Y} oralig'ida {created} ta davomat yozuvi qo'shildi."
+        ))
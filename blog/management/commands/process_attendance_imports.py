@@ -0,0 +1,52 @@
+"""
+Navbatdagi davomat importlarini bajaruvchi worker.
+Ishlatish: python manage.py process_attendance_imports [--loop] [--interval 5]
+
+ATTENDANCE_IMPORT_MODE = 'queue' bo'lganda veb so'rov faqat vazifani
+navbatga qo'yadi; bu buyruq (masalan, systemd/supervisor orqali --loop bilan)
+ularni ketma-ket bajaradi. 'thread' rejimida server qayta ishga tushib
+qolib ketgan vazifalarni ham shu buyruq bilan bajarish mumkin: 'jarayonda'
+holatida ATTENDANCE_IMPORT_STALE_AFTER soniyadan ortiq turganlari navbatga
+qaytariladi.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from blog.attendance_import import process_queued_imports
+
+
+class Command(BaseCommand):
+    help = "Navbatdagi davomat import vazifalarini bajaradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="To'xtatilmaguncha navbatni kuzatib turish",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Navbat bo'sh bo'lganda kutish (soniya, default: 5)",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Bir o'tishda bajariladigan maksimal vazifalar soni",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            done = process_queued_imports(limit=options["limit"])
+            if done:
+                self.stdout.write(self.style.SUCCESS(f"{done} ta import vazifasi bajarildi."))
+            if not options["loop"]:
+                break
+            if not done:
+                # Uzoq kutishda ulanish uzilib qolmasligi uchun
+                connection.close()
+                time.sleep(options["interval"])
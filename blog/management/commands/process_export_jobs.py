@@ -0,0 +1,49 @@
+"""
+Navbatdagi eksport vazifalarini bajaruvchi worker.
+Ishlatish: python manage.py process_export_jobs [--loop] [--interval 5]
+
+EXPORT_JOB_MODE = 'queue' bo'lganda veb so'rov faqat vazifani navbatga
+qo'yadi; bu buyruq ularni bajarib, fayllarni MEDIA_ROOT/exports/ ga yozadi.
+Har o'tishda to'xtab qolgan vazifalar navbatga qaytariladi va
+EXPORT_JOB_KEEP_DAYS kundan eski vazifalar fayllari bilan o'chiriladi.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from blog.export_jobs import process_queued_exports
+
+
+class Command(BaseCommand):
+    help = "Navbatdagi eksport vazifalarini bajaradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="To'xtatilmaguncha navbatni kuzatib turish",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Navbat bo'sh bo'lganda kutish (soniya, default: 5)",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Bir o'tishda bajariladigan maksimal vazifalar soni",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            done = process_queued_exports(limit=options["limit"])
+            if done:
+                self.stdout.write(self.style.SUCCESS(f"{done} ta eksport vazifasi bajarildi."))
+            if not options["loop"]:
+                break
+            if not done:
+                connection.close()
+                time.sleep(options["interval"])
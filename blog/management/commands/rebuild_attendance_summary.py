@@ -0,0 +1,26 @@
+"""
+Oylik davomat rollup jadvalini (MonthlyAttendanceSummary) davomatdan qayta qurish.
+Ishlatish: python manage.py rebuild_attendance_summary [--year 2026]
+"""
+from django.core.management.base import BaseCommand
+
+from blog.services import rebuild_attendance_summary
+
+
+class Command(BaseCommand):
+    help = "Davomat rollup jadvalini Attendance yozuvlaridan qayta quradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--year",
+            type=int,
+            default=None,
+            help="Faqat shu yil (default: barcha yillar)",
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_attendance_summary(year=options["year"])
+        scope = f"{options['year']}-yil" if options["year"] else "barcha yillar"
+        self.stdout.write(self.style.SUCCESS(
+            f"Tayyor: {scope} uchun {count} ta xodim-oy yig'indisi qayta qurildi."
+        ))
@@ -0,0 +1,185 @@
+"""
+Bir necha oy uchun oylik statistikani parallel qayta hisoblash.
+Ishlatish: python manage.py recalculate_payroll --from 2025-01 --to 2026-12 --workers 4
+
+Xodimlar bo'laklarga (chunk) bo'linadi, har bir bo'lak alohida jarayonda
+o'z DB ulanishi bilan hisoblanadi. Bitta xodimning oylari doim ketma-ket
+hisoblanadi, shuning uchun qarzdorlik zanjiri to'g'ri qoladi.
+Tugallangan bo'laklar checkpoint faylga yoziladi; --resume bilan uzilgan
+ish shu joydan davom ettiriladi.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from blog.models import Employee
+from blog.services import calculate_monthly_stats, cascade_debt_chain
+
+
+def year_month(value):
+    """'YYYY-MM' → (yil, oy)."""
+    try:
+        year, month = (int(part) for part in value.split('-'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' — YYYY-MM formatida bo'lishi kerak")
+    if not 1 <= month <= 12:
+        raise argparse.ArgumentTypeError(f"'{value}' — oy 1 dan 12 gacha bo'lishi kerak")
+    return year, month
+
+
+def month_range(start, end):
+    """start dan end gacha (ikkalasi ham kiradi) oylar ro'yxati."""
+    year, month = start
+    months = []
+    while (year, month) <= end:
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def _init_worker():
+    # spawn rejimida (Windows/macOS) Django har bir jarayonda qayta sozlanadi
+    django.setup()
+
+
+def recalculate_chunk(employee_ids, months):
+    """Bitta bo'lak xodimlari uchun oylarni tartib bilan hisoblaydi."""
+    started = time.monotonic()
+    for year, month in months:
+        calculate_monthly_stats(year, month, employee_ids=employee_ids, cascade=False)
+    # Oraliqdan keyingi oylarning qarzdorligi bir marta suriladi
+    last_year, last_month = months[-1]
+    cascade_debt_chain(last_year, last_month, employee_ids=employee_ids)
+    return employee_ids, time.monotonic() - started
+
+
+def _recalculate_task(task):
+    """Worker jarayonidagi vazifa: har bo'lakdan keyin ulanish yopiladi."""
+    try:
+        return recalculate_chunk(*task)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Oylik statistikani bir necha oy uchun xodimlar bo'laklari bo'yicha parallel qayta hisoblaydi"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--from",
+            dest="start",
+            type=year_month,
+            required=True,
+            help="Boshlang'ich oy (YYYY-MM)",
+        )
+        parser.add_argument(
+            "--to",
+            dest="end",
+            type=year_month,
+            required=True,
+            help="Oxirgi oy (YYYY-MM), shu oy ham hisoblanadi",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Parallel jarayonlar soni (default: 1 — shu jarayonda)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=200,
+            help="Bir bo'lakdagi xodimlar soni (default: 200)",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            default=str(Path(settings.BASE_DIR) / "recalculate_payroll.checkpoint.json"),
+            help="Tugallangan bo'laklar yoziladigan fayl",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Checkpoint fayldagi tugallangan xodimlarni o'tkazib yuborish",
+        )
+
+    def handle(self, *args, **options):
+        start, end = options["start"], options["end"]
+        if start > end:
+            raise CommandError("--from oyi --to oyidan keyin bo'lishi mumkin emas.")
+        if options["workers"] < 1 or options["chunk_size"] < 1:
+            raise CommandError("--workers va --chunk-size musbat bo'lishi kerak.")
+
+        months = month_range(start, end)
+        period = f"{start[0]}-{start[1]:02d}..{end[0]}-{end[1]:02d}"
+        checkpoint_path = Path(options["checkpoint"])
+        done_ids = self._load_checkpoint(checkpoint_path, period) if options["resume"] else set()
+
+        employee_ids = [
+            pk for pk in Employee.objects.filter(is_active=True).order_by("pk").values_list("pk", flat=True)
+            if pk not in done_ids
+        ]
+        size = options["chunk_size"]
+        chunks = [employee_ids[i:i + size] for i in range(0, len(employee_ids), size)]
+        if done_ids:
+            self.stdout.write(f"Checkpoint: {len(done_ids)} xodim avval hisoblangan, o'tkazib yuboriladi.")
+        self.stdout.write(
+            f"{period}: {len(months)} oy, {len(employee_ids)} xodim, "
+            f"{len(chunks)} bo'lak, {options['workers']} jarayon."
+        )
+        if not chunks:
+            self._finish(checkpoint_path)
+            return
+
+        started = time.monotonic()
+        for index, (chunk_ids, elapsed) in enumerate(self._run(chunks, months, options["workers"]), start=1):
+            done_ids.update(chunk_ids)
+            self._save_checkpoint(checkpoint_path, period, done_ids)
+            self.stdout.write(
+                f"[{index}/{len(chunks)}] {len(chunk_ids)} xodim × {len(months)} oy — {elapsed:.1f} s"
+            )
+
+        self._finish(checkpoint_path)
+        self.stdout.write(self.style.SUCCESS(
+            f"Tayyor: {len(employee_ids)} xodim, {len(months)} oy, {time.monotonic() - started:.1f} s."
+        ))
+
+    def _run(self, chunks, months, workers):
+        if workers == 1:
+            for chunk_ids in chunks:
+                yield recalculate_chunk(chunk_ids, months)
+            return
+        # Ota jarayon ulanishi bolalarga meros qolmasligi uchun yopiladi
+        connections.close_all()
+        with multiprocessing.Pool(processes=workers, initializer=_init_worker) as pool:
+            tasks = [(chunk_ids, months) for chunk_ids in chunks]
+            yield from pool.imap_unordered(_recalculate_task, tasks)
+
+    def _load_checkpoint(self, path, period):
+        if not path.exists():
+            return set()
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if data.get("period") != period:
+            raise CommandError(
+                f"Checkpoint boshqa oraliq uchun ({data.get('period')}). Faylni o'chiring yoki --resume siz ishga tushiring."
+            )
+        return set(data.get("done_employee_ids", []))
+
+    def _save_checkpoint(self, path, period, done_ids):
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(
+            json.dumps({"period": period, "done_employee_ids": sorted(done_ids)}),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, path)
+
+    def _finish(self, path):
+        if path.exists():
+            path.unlink()
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0017_alter_employee_middle_name_verbose_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollDirtyMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField(verbose_name='Yil')),
+                ('month', models.PositiveIntegerField(verbose_name='Oy')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='blog.employee', verbose_name='Xodim')),
+            ],
+            options={
+                'verbose_name': 'Qayta hisoblash navbati',
+                'verbose_name_plural': 'Qayta hisoblash navbati',
+                'unique_together': {('employee', 'year', 'month')},
+            },
+        ),
+    ]
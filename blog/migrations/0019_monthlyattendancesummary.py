@@ -0,0 +1,61 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def fill_attendance_summary(apps, schema_editor):
+    """Mavjud davomatdan rollup jadvalini to'ldiradi."""
+    Attendance = apps.get_model('blog', 'Attendance')
+    MonthlyAttendanceSummary = apps.get_model('blog', 'MonthlyAttendanceSummary')
+    summaries = {}
+    rows = (
+        Attendance.objects.annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
+        .values('employee_id', 'year', 'month', 'status')
+        .annotate(cnt=Count('id'))
+        .order_by()
+    )
+    for row in rows:
+        key = (row['employee_id'], row['year'], row['month'])
+        summary = summaries.get(key)
+        if summary is None:
+            summary = summaries[key] = MonthlyAttendanceSummary(
+                employee_id=key[0], year=key[1], month=key[2],
+            )
+        setattr(summary, row['status'], row['cnt'])
+    MonthlyAttendanceSummary.objects.bulk_create(summaries.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0018_payrolldirtymonth'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyAttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField(verbose_name='Yil')),
+                ('month', models.PositiveIntegerField(verbose_name='Oy')),
+                ('present', models.PositiveIntegerField(default=0, verbose_name='Keldi')),
+                ('absent', models.PositiveIntegerField(default=0, verbose_name='Kelmagan')),
+                ('late', models.PositiveIntegerField(default=0, verbose_name='Kechikdi')),
+                ('vacation', models.PositiveIntegerField(default=0, verbose_name="Ta'til")),
+                ('sick', models.PositiveIntegerField(default=0, verbose_name='Kasal')),
+                ('business', models.PositiveIntegerField(default=0, verbose_name='Ish safarida')),
+                ('offday', models.PositiveIntegerField(default=0, verbose_name='Ish kuni emas')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='blog.employee', verbose_name='Xodim')),
+            ],
+            options={
+                'verbose_name': "Oylik davomat yig'indisi",
+                'verbose_name_plural': "Oylik davomat yig'indilari",
+                'unique_together': {('employee', 'year', 'month')},
+            },
+        ),
+        migrations.RunPython(fill_attendance_summary, migrations.RunPython.noop),
+    ]
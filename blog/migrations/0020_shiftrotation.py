@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:47
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0019_monthlyattendancesummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShiftRotation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(default='Asosiy sikl', max_length=64, verbose_name='Nomi')),
+                ('anchor_date', models.DateField(verbose_name='Sikl boshlanish sanasi')),
+                ('anchor_hour', models.PositiveSmallIntegerField(default=0, verbose_name='Sikl boshlanish soati')),
+                ('shift_hours', models.PositiveSmallIntegerField(default=12, verbose_name='Smena uzunligi (soat)')),
+                ('team_order', models.CharField(default='1,2,3', max_length=32, validators=[django.core.validators.RegexValidator('^[1-3](,[1-3])*$', 'Komanda raqamlari vergul bilan: 1,2,3')], verbose_name='Komandalar tartibi')),
+                ('day_start_hour', models.PositiveSmallIntegerField(default=9, verbose_name='Kunduzgi smena boshlanishi (soat)')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Faol')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Smena aylanish qoidasi',
+                'verbose_name_plural': 'Smena aylanish qoidalari',
+                'ordering': ['-is_active', '-updated_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0020_shiftrotation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendanceimportlog',
+            name='error_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='attendanceimportlog',
+            name='file',
+            field=models.FileField(blank=True, null=True, upload_to='attendance_imports/%Y/%m/'),
+        ),
+        migrations.AddField(
+            model_name='attendanceimportlog',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='attendanceimportlog',
+            name='processed_rows',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='attendanceimportlog',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='attendanceimportlog',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Navbatda'), ('processing', 'Jarayonda'), ('done', 'Tugadi'), ('failed', 'Xatolik')], db_index=True, default='done', max_length=16),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0021_attendanceimportlog_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendanceimportlog',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Navbatda'), ('processing', 'Jarayonda'), ('done', 'Tugadi'), ('failed', 'Xatolik')], db_index=True, default='queued', max_length=16),
+        ),
+        migrations.CreateModel(
+            name='AttendanceImportError',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row_number', models.PositiveIntegerField(verbose_name='Satr')),
+                ('column', models.CharField(blank=True, max_length=32, verbose_name='Ustun')),
+                ('value', models.CharField(blank=True, max_length=255, verbose_name='Qiymat')),
+                ('message', models.CharField(max_length=500, verbose_name='Xatolik')),
+                ('log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='errors', to='blog.attendanceimportlog')),
+            ],
+            options={
+                'verbose_name': 'Import xatoligi',
+                'verbose_name_plural': 'Import xatoliklari',
+                'ordering': ['log', 'row_number'],
+            },
+        ),
+    ]
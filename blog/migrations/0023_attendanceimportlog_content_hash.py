@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0022_attendanceimporterror'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendanceimportlog',
+            name='changed_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='attendanceimportlog',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
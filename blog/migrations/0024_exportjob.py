@@ -0,0 +1,42 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0023_attendanceimportlog_content_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('attendance', 'Davomat'), ('employees', "Xodimlar ro'yxati"), ('absence_quota', 'Kelmagan kun kvotasi'), ('salary_payments', "Oylik to'lovlar tarixi"), ('salary_statistics', 'Oylik statistikasi')], max_length=32, verbose_name='Eksport turi')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='Parametrlar')),
+                ('language', models.CharField(blank=True, default='', max_length=10)),
+                ('params_hash', models.CharField(db_index=True, max_length=64)),
+                ('status', models.CharField(choices=[('queued', 'Navbatda'), ('processing', 'Jarayonda'), ('done', 'Tugadi'), ('failed', 'Xatolik')], db_index=True, default='queued', max_length=16)),
+                ('file', models.FileField(blank=True, null=True, upload_to='exports/%Y/%m/')),
+                ('file_name', models.CharField(blank=True, default='', max_length=256)),
+                ('file_size', models.PositiveBigIntegerField(default=0, verbose_name='Hajmi (bayt)')),
+                ('row_count', models.PositiveIntegerField(default=0, verbose_name='Qatorlar')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('duration', models.FloatField(blank=True, null=True, verbose_name='Davomiyligi (s)')),
+                ('log', models.TextField(blank=True, default='')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Eksport vazifasi',
+                'verbose_name_plural': 'Eksport vazifalari',
+                'ordering': ['-created_at', '-pk'],
+            },
+        ),
+    ]
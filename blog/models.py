@@ -135,6 +135,55 @@ class NalivshikShiftOverride(models.Model):
     def __str__(self):
         return f"{self.date} - kunduzgi: {self.day_team} / tungi: {self.night_team}"
 
+
+class ShiftRotation(models.Model):
+    """
+    Nalivshik komandalarining avtomatik aylanish qoidasi: sikl boshlanish
+    nuqtasi, smena uzunligi va komandalar tartibi. Faol yozuv bo'lmasa,
+    standart qoida (2026-01-01 00:00, 12 soat, 1-2-3, kunduzgi smena 09:00)
+    ishlatiladi. O'zgartirilgandan keyin oyliklarni qayta hisoblash uchun
+    `recalculate_payroll` buyrug'ini ishga tushiring.
+    """
+
+    name = models.CharField("Nomi", max_length=64, default="Asosiy sikl")
+    anchor_date = models.DateField("Sikl boshlanish sanasi")
+    anchor_hour = models.PositiveSmallIntegerField("Sikl boshlanish soati", default=0)
+    shift_hours = models.PositiveSmallIntegerField("Smena uzunligi (soat)", default=12)
+    team_order = models.CharField(
+        "Komandalar tartibi",
+        max_length=32,
+        default="1,2,3",
+        validators=[RegexValidator(r'^[1-3](,[1-3])*$', "Komanda raqamlari vergul bilan: 1,2,3")],
+    )
+    day_start_hour = models.PositiveSmallIntegerField("Kunduzgi smena boshlanishi (soat)", default=9)
+    is_active = models.BooleanField("Faol", default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Smena aylanish qoidasi"
+        verbose_name_plural = "Smena aylanish qoidalari"
+        ordering = ["-is_active", "-updated_at"]
+
+    def __str__(self):
+        return f"{self.name} ({self.team_order}, {self.shift_hours} soat)"
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+
+        errors = {}
+        if self.anchor_hour is not None and self.anchor_hour > 23:
+            errors['anchor_hour'] = "Soat 0 dan 23 gacha bo'lishi kerak."
+        if self.day_start_hour is not None and self.day_start_hour > 23:
+            errors['day_start_hour'] = "Soat 0 dan 23 gacha bo'lishi kerak."
+        if self.shift_hours is not None and not 1 <= self.shift_hours <= 24:
+            errors['shift_hours'] = "Smena 1 dan 24 soatgacha bo'lishi kerak."
+        if errors:
+            raise ValidationError(errors)
+
+    @property
+    def team_codes(self):
+        return tuple(int(code) for code in self.team_order.split(','))
+
 class DayOff(models.Model):
     date = models.DateField(unique=True)
     reason = models.CharField(max_length=128)
@@ -170,14 +219,138 @@ class Attendance(models.Model):
     def __str__(self):
         return f"{self.date} - {self.employee} - {self.get_status_display()}"
 
+class MonthlyAttendanceSummary(models.Model):
+    """
+    Xodimning oy bo'yicha davomat holatlari soni (rollup).
+    Attendance yozilganda signallar orqali yangilanadi; bulk yozuvlardan keyin
+    services.refresh_attendance_summary chaqiriladi.
+    """
+
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name='attendance_summaries',
+        verbose_name="Xodim",
+    )
+    year = models.PositiveIntegerField("Yil")
+    month = models.PositiveIntegerField("Oy")
+    present = models.PositiveIntegerField("Keldi", default=0)
+    absent = models.PositiveIntegerField("Kelmagan", default=0)
+    late = models.PositiveIntegerField("Kechikdi", default=0)
+    vacation = models.PositiveIntegerField("Ta'til", default=0)
+    sick = models.PositiveIntegerField("Kasal", default=0)
+    business = models.PositiveIntegerField("Ish safarida", default=0)
+    offday = models.PositiveIntegerField("Ish kuni emas", default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('employee', 'year', 'month')
+        verbose_name = "Oylik davomat yig'indisi"
+        verbose_name_plural = "Oylik davomat yig'indilari"
+
+    def __str__(self):
+        return f"{self.year}-{self.month:02d} - {self.employee_id}"
+
+    @property
+    def worked(self):
+        """Oylik hisobda ishlangan kunlar (keldi, kasal, kechikdi)."""
+        return self.present + self.sick + self.late
+
+
 class AttendanceImportLog(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, _("Navbatda")),
+        (STATUS_PROCESSING, _("Jarayonda")),
+        (STATUS_DONE, _("Tugadi")),
+        (STATUS_FAILED, _("Xatolik")),
+    ]
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     file_name = models.CharField(max_length=256)
+    file = models.FileField(upload_to='attendance_imports/%Y/%m/', blank=True, null=True)
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
     imported_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    processed_rows = models.PositiveIntegerField(default=0)
     record_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    changed_count = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
     success = models.BooleanField(default=True)
     log = models.TextField(blank=True, null=True)
 
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+
+class AttendanceImportError(models.Model):
+    """Import qilinmagan satr: qaysi satr, ustun, qiymat va sabab."""
+
+    log = models.ForeignKey(AttendanceImportLog, on_delete=models.CASCADE, related_name='errors')
+    row_number = models.PositiveIntegerField("Satr")
+    column = models.CharField("Ustun", max_length=32, blank=True)
+    value = models.CharField("Qiymat", max_length=255, blank=True)
+    message = models.CharField("Xatolik", max_length=500)
+
+    class Meta:
+        verbose_name = "Import xatoligi"
+        verbose_name_plural = "Import xatoliklari"
+        ordering = ['log', 'row_number']
+
+class ExportJob(models.Model):
+    """
+    Fonda tayyorlanadigan eksport fayli. Parametrlari bir xil (params_hash)
+    tayyor fayl qayta yaratilmaydi — mavjud artefakt qaytariladi.
+    """
+
+    STATUS_QUEUED = 'queued'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = AttendanceImportLog.STATUS_CHOICES
+    KIND_CHOICES = [
+        ('attendance', _("Davomat")),
+        ('employees', _("Xodimlar ro'yxati")),
+        ('absence_quota', _("Kelmagan kun kvotasi")),
+        ('salary_payments', _("Oylik to'lovlar tarixi")),
+        ('salary_statistics', _("Oylik statistikasi")),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
+    kind = models.CharField("Eksport turi", max_length=32, choices=KIND_CHOICES)
+    params = models.JSONField("Parametrlar", default=dict, blank=True)
+    language = models.CharField(max_length=10, blank=True, default='')
+    params_hash = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    file = models.FileField(upload_to='exports/%Y/%m/', blank=True, null=True)
+    file_name = models.CharField(max_length=256, blank=True, default='')
+    file_size = models.PositiveBigIntegerField("Hajmi (bayt)", default=0)
+    row_count = models.PositiveIntegerField("Qatorlar", default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    duration = models.FloatField("Davomiyligi (s)", blank=True, null=True)
+    log = models.TextField(blank=True, default='')
+
+    class Meta:
+        verbose_name = "Eksport vazifasi"
+        verbose_name_plural = "Eksport vazifalari"
+        ordering = ['-created_at', '-pk']
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk}"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+
 class MonthlyEmployeeStat(models.Model):
     CURRENCY_CHOICES = [
         ('UZS', 'So‘m'),
@@ -244,6 +417,33 @@ class SalaryPayment(models.Model):
         return f"{self.paid_at} — {self.amount}"
 
 
+class PayrollDirtyMonth(models.Model):
+    """
+    Qayta hisoblanishi kerak bo'lgan (xodim, yil, oy) kaliti.
+    Davomat, to'lov, yopiq kun va ishlab chiqarish yozuvlari o'zgarganda
+    qo'shiladi; qayta hisoblashdan keyin o'chiriladi.
+    """
+
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name="Xodim",
+    )
+    year = models.PositiveIntegerField("Yil")
+    month = models.PositiveIntegerField("Oy")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('employee', 'year', 'month')
+        verbose_name = "Qayta hisoblash navbati"
+        verbose_name_plural = "Qayta hisoblash navbati"
+
+    def __str__(self):
+        return f"{self.year}-{self.month:02d} - {self.employee_id}"
+
+
 class MonthlyProduction(models.Model):
     """Oylik benzin ishlab chiqarish hajmi (tonna) — premiya hisoblash uchun."""
 
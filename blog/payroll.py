@@ -0,0 +1,278 @@
+"""
+Oylik hisoblash qoidalari (ORM siz).
+
+calculate_monthly_stats ma'lumotlarni bazadan yuklaydi va PayrollInput
+yozuvlariga aylantiradi; bu modul faqat ularni PayrollResult ga hisoblaydi.
+Shu sababli qoidalarni alohida sinash, paketlab yoki parallel ishlatish mumkin.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+
+# Yillik ruxsat etilgan kelmagan kunlar (oylik hisob va kvota sahifasi)
+YEARLY_ABSENCE_FREE_LIMIT = 21
+
+# Ishlab chiqarish premiyasi (benzin, tonna → so'm)
+PRODUCTION_BONUS_LOW_MIN_TONS = Decimal('1500')       # kamida shuncha — premiya boshlanadi
+PRODUCTION_BONUS_HIGH_THRESHOLD_TONS = Decimal('3000')  # undan yuqori → 4.8 mln
+PRODUCTION_BONUS_UP_TO_THRESHOLD = Decimal('2400000')   # 1500–3000 t
+PRODUCTION_BONUS_ABOVE_THRESHOLD = Decimal('4800000')   # 3000 t dan yuqori
+
+# 15 kunlik xodimlar uchun maksimal kunlar; haftalik va qorovul uchun optimal kunlar
+HALF_RATE_MAX_DAYS = 15
+OPTIMAL_DAYS_BY_TYPE = {'weekly': 4, 'guard': 10}
+
+_ZERO = Decimal('0')
+_ONE = Decimal('1')
+_UZS_QUANT = Decimal('1')
+_CENT_QUANT = Decimal('0.01')
+
+
+def production_bonus_amount_for_tons(production_tons):
+    """
+    1500–3000 t → 2.4 mln. 3000 t dan yuqori → 4.8 mln.
+    1500 t dan kam — premiya yo'q.
+    """
+    tons = Decimal(str(production_tons))
+    if tons < PRODUCTION_BONUS_LOW_MIN_TONS:
+        return None
+    if tons <= PRODUCTION_BONUS_HIGH_THRESHOLD_TONS:
+        return PRODUCTION_BONUS_UP_TO_THRESHOLD
+    return PRODUCTION_BONUS_ABOVE_THRESHOLD
+
+
+def is_auto_production_bonus(amount) -> bool:
+    return Decimal(str(amount or 0)) in (
+        PRODUCTION_BONUS_UP_TO_THRESHOLD,
+        PRODUCTION_BONUS_ABOVE_THRESHOLD,
+    )
+
+
+def round_money(amount, currency: str) -> Decimal:
+    """UZS uchun butun so'm, boshqa valyutalar uchun 2 xona."""
+    amount = Decimal(str(amount or 0))
+    if currency in ("UZS", "SUM"):
+        return amount.quantize(_UZS_QUANT, rounding=ROUND_HALF_UP)
+    return amount.quantize(_CENT_QUANT, rounding=ROUND_HALF_UP)
+
+
+def calculate_debt_end(debt_start, accrued, paid, currency: str) -> Decimal:
+    """
+    Qarzdorlik oxirini hisoblaydi.
+    Musbat — kompaniya xodimga qarzdor; manfiy — xodim ortiqcha olgan (avans).
+    """
+    debt_start = round_money(debt_start, currency)
+    accrued = round_money(accrued, currency)
+    paid = round_money(paid, currency)
+    return round_money(debt_start + accrued - paid, currency)
+
+
+def forgiven_absences(absent_before: int, absent_this_month: int) -> int:
+    """Shu oyda kvota hisobidan kechiriladigan kelmagan kunlar."""
+    return min(max(0, YEARLY_ABSENCE_FREE_LIMIT - absent_before), absent_this_month)
+
+
+def absence_quota(absent_before: int, absent_this_month: int) -> dict:
+    """
+    21 kun kvotasi: yil boshidan oldingi oylardagi va shu oydagi kelmagan
+    kunlardan kechiriladigan, oylikka ta'sir qiladigan va qolgan kunlar.
+    """
+    absent_ytd = absent_before + absent_this_month
+    forgiven_in_month = forgiven_absences(absent_before, absent_this_month)
+    used = min(absent_ytd, YEARLY_ABSENCE_FREE_LIMIT)
+    return {
+        'absent_before': absent_before,
+        'absent_this_month': absent_this_month,
+        'absent_ytd': absent_ytd,
+        'forgiven_in_month': forgiven_in_month,
+        'affects_salary': absent_this_month - forgiven_in_month,
+        'used': used,
+        'left': max(0, YEARLY_ABSENCE_FREE_LIMIT - used),
+        'over': max(0, absent_ytd - YEARLY_ABSENCE_FREE_LIMIT),
+    }
+
+
+class PayrollMonth:
+    """Oy bo'yicha umumiy ma'lumotlar (barcha xodimlar uchun bir xil)."""
+
+    __slots__ = ('working_days', 'total_days', 'production_bonus', 'preserve_salary')
+
+    def __init__(self, working_days, total_days, production_bonus=None, preserve_salary=False):
+        self.working_days = working_days
+        self.total_days = total_days
+        self.production_bonus = production_bonus
+        self.preserve_salary = preserve_salary
+
+
+class PayrollInput:
+    """
+    Bitta xodimning bir oylik kiruvchi ma'lumotlari.
+    has_stat/has_prev — joriy va oldingi oy statlari mavjudligi;
+    payments_total None bo'lsa, to'lovlar jadvali bo'sh (stat.paid saqlanadi).
+    planned_days — nalivshik komandasining rejadagi kunlari (0 — reja yo'q).
+    """
+
+    __slots__ = (
+        'employee_id', 'employee_type', 'role', 'planned_days',
+        'has_stat', 'salary', 'salary_override', 'currency', 'bonus', 'bonus_override',
+        'penalty', 'manual_salary', 'paid', 'paid_at',
+        'has_prev', 'prev_salary', 'prev_currency', 'prev_debt_end',
+        'payments_total', 'payments_latest', 'production_eligible',
+        'worked_days', 'absent_this_month', 'absent_before',
+    )
+
+    def __init__(
+        self, employee_id, employee_type='full', role='other', planned_days=0,
+        has_stat=False, salary=_ZERO, salary_override=False, currency='UZS', bonus=_ZERO,
+        bonus_override=False, penalty=_ZERO, manual_salary=False, paid=_ZERO, paid_at=None,
+        has_prev=False, prev_salary=_ZERO, prev_currency='UZS', prev_debt_end=_ZERO,
+        payments_total=None, payments_latest=None, production_eligible=False,
+        worked_days=0, absent_this_month=0, absent_before=0,
+    ):
+        self.employee_id = employee_id
+        self.employee_type = employee_type
+        self.role = role
+        self.planned_days = planned_days
+        self.has_stat = has_stat
+        self.salary = salary
+        self.salary_override = salary_override
+        self.currency = currency
+        self.bonus = bonus
+        self.bonus_override = bonus_override
+        self.penalty = penalty
+        self.manual_salary = manual_salary
+        self.paid = paid
+        self.paid_at = paid_at
+        self.has_prev = has_prev
+        self.prev_salary = prev_salary
+        self.prev_currency = prev_currency
+        self.prev_debt_end = prev_debt_end
+        self.payments_total = payments_total
+        self.payments_latest = payments_latest
+        self.production_eligible = production_eligible
+        self.worked_days = worked_days
+        self.absent_this_month = absent_this_month
+        self.absent_before = absent_before
+
+
+class PayrollResult:
+    """Hisoblangan MonthlyEmployeeStat maydonlari (calculated_at dan tashqari)."""
+
+    __slots__ = (
+        'employee_id', 'salary', 'bonus', 'bonus_override', 'penalty', 'days_in_month',
+        'worked_days', 'accrued', 'paid', 'paid_at', 'debt_start', 'debt_end',
+        'manual_salary', 'currency',
+    )
+
+    FIELDS = __slots__[1:]
+
+    def __init__(self, employee_id, **values):
+        self.employee_id = employee_id
+        for field in self.FIELDS:
+            setattr(self, field, values[field])
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+def compute_payroll(item: PayrollInput, month: PayrollMonth) -> PayrollResult:
+    """Bitta xodim uchun oylik hisob qoidalari."""
+    if item.has_stat:
+        bonus = item.bonus
+        bonus_override = item.bonus_override
+        penalty = item.penalty
+        manual_salary = item.manual_salary
+        if item.salary_override or month.preserve_salary or not item.has_prev:
+            salary = item.salary
+            currency = item.currency
+        else:
+            salary = item.prev_salary
+            currency = item.prev_currency
+        if item.payments_total is not None:
+            # To'lovlar jadvalidan jami summa va oxirgi sana
+            paid = round_money(item.payments_total, item.currency)
+            paid_at = item.payments_latest
+        else:
+            paid = item.paid
+            paid_at = item.paid_at
+    else:
+        # Agar oldingi oy ma'lumoti mavjud bo'lsa, undan oylikni va valyutani olish
+        if item.has_prev:
+            salary = item.prev_salary
+            currency = item.prev_currency
+        else:
+            salary = _ZERO  # Yangi xodim — oylikni keyin qo'lda kiritasiz
+            currency = 'UZS'  # Birinchi marta uchun default valyuta
+        bonus = _ZERO  # Yangi oy uchun bonus 0 dan boshlanadi
+        paid = _ZERO
+        paid_at = None
+        manual_salary = (item.employee_type == 'office')
+        penalty = _ZERO
+        bonus_override = False
+
+    if item.production_eligible and currency == 'UZS' and not bonus_override:
+        bonus = month.production_bonus if month.production_bonus is not None else _ZERO
+    elif not bonus_override and not item.production_eligible:
+        if is_auto_production_bonus(bonus):
+            bonus = _ZERO
+
+    # 21 kun kvotasi: kvota ichidagi kelmagan kunlar ishlangan deb hisoblanadi
+    effective_days = item.worked_days + forgiven_absences(item.absent_before, item.absent_this_month)
+
+    # Hisoblangan summa - turi bo'yicha
+    employee_type = item.employee_type
+    if employee_type == 'office' or manual_salary:
+        # Ofis xodimlari to'liq oylik oladi (davomati umuman hisobga olinmaydi)
+        accrued = salary + bonus - penalty
+    elif employee_type == 'half':
+        # 15 kunlik xodimlar har kuni ishlaydi, ularga dam olish yo'q (maksimal 15 kun)
+        proportion = Decimal(str(min(effective_days, HALF_RATE_MAX_DAYS))) / Decimal(str(HALF_RATE_MAX_DAYS))
+        accrued = salary * proportion + bonus - penalty
+    elif employee_type in OPTIMAL_DAYS_BY_TYPE:
+        # Haftada 1 kun (oyda 4 kun) va qorovullar (oyda 10 kun) — optimal kunlarga proporsional
+        proportion = Decimal(str(effective_days)) / Decimal(str(OPTIMAL_DAYS_BY_TYPE[employee_type]))
+        accrued = salary * min(proportion, _ONE) + bonus - penalty
+    else:
+        # To'liq stavka: oddiy xodimlar ishchi kunlarga, nalivshiklar esa
+        # o'z navbatchilik rejasiga proporsional
+        if item.role == 'nalivshik':
+            denominator_days = item.planned_days or month.total_days
+        else:
+            denominator_days = month.working_days
+        if denominator_days > 0:
+            proportion = Decimal(str(effective_days)) / Decimal(str(denominator_days))
+            # Stavka 100% dan oshib ketmasligi uchun 1 bilan cheklaymiz.
+            accrued = salary * min(proportion, _ONE) + bonus - penalty
+        else:
+            accrued = bonus - penalty  # Faqat bonus
+
+    # Pul summalarini valyutaga mos yaxlitlash (40/67 so'm qoldiqlarini kamaytirish)
+    bonus = round_money(bonus, currency)
+    penalty = round_money(penalty, currency)
+    accrued = round_money(accrued, currency)
+    paid = round_money(paid, currency)
+
+    # Oldingi oy oxiridagi qarzdorlik
+    debt_start = round_money(item.prev_debt_end if item.has_prev else _ZERO, currency)
+    debt_end = calculate_debt_end(debt_start, accrued, paid, currency)
+
+    return PayrollResult(
+        item.employee_id,
+        salary=salary,
+        bonus=bonus,
+        bonus_override=bonus_override,
+        penalty=penalty,
+        days_in_month=month.total_days,
+        worked_days=item.worked_days,
+        accrued=accrued,
+        paid=paid,
+        paid_at=paid_at,
+        debt_start=debt_start,
+        debt_end=debt_end,
+        manual_salary=manual_salary,
+        currency=currency,
+    )
+
+
+def compute_payroll_batch(items, month: PayrollMonth):
+    """Bir oy uchun ko'p xodimni hisoblaydi."""
+    return [compute_payroll(item, month) for item in items]
@@ -0,0 +1,53 @@
+"""
+Admin import-export resurslari.
+
+Eksport formati o'zgarmaydi (xodim ustunida — id). Importda xodim ustuni id,
+telefon raqami yoki to'liq ism ("Familiya Ism [Otchestva]") bo'lishi mumkin
+va davomat importi bilan bir xil EmployeeResolver orqali aniqlanadi; indeks
+har bir import uchun bir marta quriladi.
+"""
+from import_export import fields, resources
+from import_export.widgets import ForeignKeyWidget
+
+from .employee_resolver import EmployeeResolver
+from .models import Attendance, Employee, MonthlyEmployeeStat
+
+
+class EmployeeWidget(ForeignKeyWidget):
+    """Eksportda id (ForeignKeyWidget kabi), importda — EmployeeResolver orqali moslash."""
+
+    def __init__(self, **kwargs):
+        super().__init__(Employee, **kwargs)
+        self.resolver = None
+
+    def clean(self, value, row=None, **kwargs):
+        if value in (None, ''):
+            return None
+        if self.resolver is None:
+            self.resolver = EmployeeResolver.load()
+        # Topilmasa yoki noaniq bo'lsa EmployeeLookupError (ValueError) — satr xatoligi
+        return Employee(pk=self.resolver.resolve_label(value).pk)
+
+
+class EmployeeResolverMixin:
+    """Har bir import boshida xodimlar indeksini yangidan quradi."""
+
+    def before_import(self, dataset, **kwargs):
+        super().before_import(dataset, **kwargs)
+        self.fields['employee'].widget.resolver = EmployeeResolver.load()
+
+
+class AttendanceResource(EmployeeResolverMixin, resources.ModelResource):
+    employee = fields.Field(attribute='employee', column_name='employee', widget=EmployeeWidget())
+
+    class Meta:
+        model = Attendance
+        import_id_fields = ('employee', 'date')
+
+
+class MonthlyEmployeeStatResource(EmployeeResolverMixin, resources.ModelResource):
+    employee = fields.Field(attribute='employee', column_name='employee', widget=EmployeeWidget())
+
+    class Meta:
+        model = MonthlyEmployeeStat
+        import_id_fields = ('employee', 'year', 'month')
@@ -1,37 +1,108 @@
-from datetime import date, timedelta, datetime
+from datetime import date
 from calendar import monthrange
-from decimal import Decimal, ROUND_HALF_UP
+from decimal import Decimal
+from collections import defaultdict
+from dataclasses import dataclass, replace
 from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from .models import Employee, Attendance, MonthlyEmployeeStat, DayOff, Team, NalivshikShiftOverride, MonthlyProduction, SalaryPayment
+from .models import (
+    Employee, Attendance, MonthlyEmployeeStat, Team, MonthlyProduction,
+    SalaryPayment, PayrollDirtyMonth, MonthlyAttendanceSummary, NalivshikShiftOverride,
+)
+from .payroll import (  # noqa: F401 — views va testlar services orqali import qiladi
+    PRODUCTION_BONUS_ABOVE_THRESHOLD,
+    PRODUCTION_BONUS_HIGH_THRESHOLD_TONS,
+    PRODUCTION_BONUS_LOW_MIN_TONS,
+    PRODUCTION_BONUS_UP_TO_THRESHOLD,
+    YEARLY_ABSENCE_FREE_LIMIT,
+    PayrollInput,
+    absence_quota,
+    PayrollMonth,
+    calculate_debt_end,
+    compute_payroll_batch,
+    is_auto_production_bonus,
+    production_bonus_amount_for_tons,
+    round_money,
+)
+from .shift_schedule import (  # noqa: F401
+    SCHEDULE_MAX_DAYS,
+    MonthSchedule,
+    get_month_schedule,
+    get_nalivshik_team_for_datetime,
+    invalidate_month_schedule,
+    load_shift_rotation,
+    propagate_rotation,
+    resolve_nalivshik_teams,
+)
+from .work_calendar import WorkCalendar
 
 
 # Oylik hisobda ishlangan kun sifatida qabul qilinadigan davomat holatlari
 WORKED_DAY_STATUSES = ('present', 'sick', 'late')
 
-# Yillik ruxsat etilgan kelmagan kunlar (oylik hisob va kvota sahifasi)
-YEARLY_ABSENCE_FREE_LIMIT = 21
+# MonthlyAttendanceSummary dagi holat hisoblagichlari (Attendance.status kodlari bilan bir xil)
+ATTENDANCE_SUMMARY_FIELDS = tuple(code for code, _label in Attendance.STATUS_CHOICES)
 
-# Ishlab chiqarish premiyasi (benzin, tonna → so'm)
-PRODUCTION_BONUS_LOW_MIN_TONS = Decimal('1500')       # kamida shuncha — premiya boshlanadi
-PRODUCTION_BONUS_HIGH_THRESHOLD_TONS = Decimal('3000')  # undan yuqori → 4.8 mln
-PRODUCTION_BONUS_UP_TO_THRESHOLD = Decimal('2400000')   # 1500–3000 t
-PRODUCTION_BONUS_ABOVE_THRESHOLD = Decimal('4800000')   # 3000 t dan yuqori
+# Qayta hisoblashda yoziladigan MonthlyEmployeeStat maydonlari
+MONTHLY_STAT_CALCULATED_FIELDS = [
+    'salary', 'bonus', 'bonus_override', 'penalty', 'days_in_month',
+    'worked_days', 'accrued', 'paid', 'paid_at', 'debt_start',
+    'debt_end', 'manual_salary', 'currency', 'calculated_at',
+]
 
 
-def production_bonus_amount_for_tons(production_tons):
+@dataclass(frozen=True)
+class ProductionBonusContext:
     """
-    1500–3000 t → 2.4 mln. 3000 t dan yuqori → 4.8 mln.
-    1500 t dan kam — premiya yo'q.
+    Bir oy uchun ishlab chiqarish premiyasi: MonthlyProduction yozuvi,
+    premiya oluvchilar va premiya summasi. Qayta hisoblashda bir marta
+    yuklanadi va barcha xodimlar uchun umumiy ishlatiladi.
     """
-    tons = Decimal(str(production_tons))
-    if tons < PRODUCTION_BONUS_LOW_MIN_TONS:
-        return None
-    if tons <= PRODUCTION_BONUS_HIGH_THRESHOLD_TONS:
-        return PRODUCTION_BONUS_UP_TO_THRESHOLD
-    return PRODUCTION_BONUS_ABOVE_THRESHOLD
+
+    year: int
+    month: int
+    record: MonthlyProduction | None = None
+    eligible_ids: frozenset = frozenset()
+
+    @classmethod
+    def load(cls, year: int, month: int):
+        record = MonthlyProduction.objects.filter(year=year, month=month).first()
+        if not record:
+            return cls(year, month)
+        return cls(year, month, record, frozenset(record.eligible_employees.values_list('id', flat=True)))
+
+    @property
+    def production_tons(self) -> Decimal:
+        return self.record.production_tons if self.record else Decimal('0')
+
+    @property
+    def bonus_amount(self):
+        """Tonnaga mos premiya yoki None (yozuv yo'q yoki 1500 t dan kam)."""
+        return production_bonus_amount_for_tons(self.record.production_tons) if self.record else None
+
+    @property
+    def is_active(self) -> bool:
+        return self.record is not None and self.production_tons >= PRODUCTION_BONUS_LOW_MIN_TONS
+
+    def is_eligible(self, employee_id) -> bool:
+        return employee_id in self.eligible_ids
+
+    def bonus_for(self, employee_id, currency: str, bonus_override: bool):
+        """
+        Ishlab chiqarish premiyasini qaytaradi yoki None (qo'lda saqlash kerak).
+        Faqat UZS valyutadagi, shu oy ro'yxatiga kiritilgan xodimlar uchun.
+        """
+        if bonus_override or currency != 'UZS' or not self.is_eligible(employee_id):
+            return None
+        return self.bonus_amount
+
+
+def get_production_bonus_context(year: int, month: int) -> ProductionBonusContext:
+    return ProductionBonusContext.load(year, month)
 
 
 def get_monthly_production_record(year: int, month: int):
@@ -39,17 +110,11 @@ def get_monthly_production_record(year: int, month: int):
 
 
 def is_production_bonus_eligible_for_month(employee, year: int, month: int) -> bool:
-    record = get_monthly_production_record(year, month)
-    if not record:
-        return False
-    return record.eligible_employees.filter(pk=employee.pk).exists()
+    return get_production_bonus_context(year, month).is_eligible(employee.pk)
 
 
 def get_production_bonus_eligible_ids(year: int, month: int) -> set:
-    record = get_monthly_production_record(year, month)
-    if not record:
-        return set()
-    return set(record.eligible_employees.values_list('id', flat=True))
+    return set(get_production_bonus_context(year, month).eligible_ids)
 
 
 def resolve_production_bonus(employee, year: int, month: int, currency: str, current_bonus, bonus_override: bool):
@@ -57,14 +122,7 @@ def resolve_production_bonus(employee, year: int, month: int, currency: str, cur
     Ishlab chiqarish premiyasini qaytaradi yoki None (qo'lda saqlash kerak).
     Faqat UZS valyutadagi, shu oy ro'yxatiga kiritilgan xodimlar uchun.
     """
-    if bonus_override or currency != 'UZS':
-        return None
-    record = get_monthly_production_record(year, month)
-    if not record:
-        return None
-    if not record.eligible_employees.filter(pk=employee.pk).exists():
-        return None
-    return production_bonus_amount_for_tons(record.production_tons)
+    return get_production_bonus_context(year, month).bonus_for(employee.pk, currency, bonus_override)
 
 
 def save_production_bonus_settings(year: int, month: int, production_tons, eligible_employee_ids):
@@ -83,11 +141,14 @@ def save_production_bonus_settings(year: int, month: int, production_tons, eligi
         if record.production_tons != tons:
             record.production_tons = tons
             record.save(update_fields=['production_tons'])
-        record.eligible_employees.set(
-            Employee.objects.filter(id__in=eligible_ids, is_active=True)
+        active_ids = frozenset(
+            Employee.objects.filter(id__in=eligible_ids, is_active=True).values_list('id', flat=True)
         )
+        record.eligible_employees.set(active_ids)
+        production = ProductionBonusContext(year, month, record, active_ids)
     else:
         MonthlyProduction.objects.filter(year=year, month=month).delete()
+        production = ProductionBonusContext(year, month)
 
     MonthlyEmployeeStat.objects.filter(
         year=year,
@@ -102,7 +163,7 @@ def save_production_bonus_settings(year: int, month: int, production_tons, eligi
             employee_id__in=eligible_ids,
         ).update(bonus_override=False)
 
-    calculate_monthly_stats(year, month)
+    calculate_monthly_stats(year, month, production=production)
 
 
 def remove_production_bonus_for_employees(year: int, month: int, employee_ids) -> int:
@@ -111,9 +172,10 @@ def remove_production_bonus_for_employees(year: int, month: int, employee_ids) -
     if not ids:
         return 0
 
-    record = get_monthly_production_record(year, month)
-    if record:
-        record.eligible_employees.remove(*Employee.objects.filter(id__in=ids))
+    production = get_production_bonus_context(year, month)
+    if production.record:
+        production.record.eligible_employees.remove(*Employee.objects.filter(id__in=ids))
+        production = replace(production, eligible_ids=production.eligible_ids - ids)
 
     MonthlyEmployeeStat.objects.filter(
         year=year,
@@ -122,7 +184,7 @@ def remove_production_bonus_for_employees(year: int, month: int, employee_ids) -
         bonus_override=False,
     ).update(bonus=Decimal('0'))
 
-    calculate_monthly_stats(year, month)
+    calculate_monthly_stats(year, month, production=production)
     return len(ids)
 
 
@@ -134,14 +196,8 @@ def clear_production_bonus_for_month(year: int, month: int):
         month=month,
         bonus_override=False,
     ).update(bonus=Decimal('0'))
-    calculate_monthly_stats(year, month)
-
+    calculate_monthly_stats(year, month, production=ProductionBonusContext(year, month))
 
-def is_auto_production_bonus(amount) -> bool:
-    return Decimal(str(amount or 0)) in (
-        PRODUCTION_BONUS_UP_TO_THRESHOLD,
-        PRODUCTION_BONUS_ABOVE_THRESHOLD,
-    )
 
 VALID_ATTENDANCE_STATUSES = {choice[0] for choice in Attendance.STATUS_CHOICES}
 ATTENDANCE_STATUS_LABELS = {choice[1].lower(): choice[0] for choice in Attendance.STATUS_CHOICES}
@@ -164,82 +220,50 @@ def normalize_attendance_status(raw_status) -> str:
     raise ValueError(f"Noto'g'ri status: {raw_status}. Qabul qilinadi: {allowed}")
 
 
+def _quota_month(year: int, month: int | None) -> int:
+    """month berilmasa: joriy yil uchun bugungi oy, o'tgan yillar uchun dekabr."""
+    if month is not None:
+        return month
+    today = date.today()
+    return today.month if year == today.year else 12
+
+
 def get_absence_quota_for_period(employee, year: int, month: int | None = None) -> dict:
     """
     Oylik hisobdagi 21 kun kvota formulasi bilan bir xil natija.
     month berilmasa: joriy yil uchun bugungi oy, o'tgan yillar uchun dekabr.
     """
-    today = date.today()
-    if month is None:
-        month = today.month if year == today.year else 12
-
-    year_start = date(year, 1, 1)
-    month_start = date(year, month, 1)
-
-    absent_before = Attendance.objects.filter(
-        employee=employee,
-        date__gte=year_start,
-        date__lt=month_start,
-        status='absent',
-    ).count()
-    absent_this_month = Attendance.objects.filter(
-        employee=employee,
-        date__year=year,
-        date__month=month,
-        status='absent',
-    ).count()
-    absent_ytd = absent_before + absent_this_month
-    free_left = max(0, YEARLY_ABSENCE_FREE_LIMIT - absent_before)
-    forgiven_in_month = min(free_left, absent_this_month)
-    affects_salary = absent_this_month - forgiven_in_month
-    used = min(absent_ytd, YEARLY_ABSENCE_FREE_LIMIT)
-    left = max(0, YEARLY_ABSENCE_FREE_LIMIT - used)
-    over = max(0, absent_ytd - YEARLY_ABSENCE_FREE_LIMIT)
-
-    return {
-        'year': year,
-        'month': month,
-        'absent_before': absent_before,
-        'absent_this_month': absent_this_month,
-        'absent_ytd': absent_ytd,
-        'forgiven_in_month': forgiven_in_month,
-        'affects_salary': affects_salary,
-        'used': used,
-        'left': left,
-        'over': over,
-    }
+    return get_absence_quota_map([employee.pk], year, month)[employee.pk]
 
 
-def round_money(amount, currency: str) -> Decimal:
-    """UZS uchun butun so'm, boshqa valyutalar uchun 2 xona."""
-    amount = Decimal(str(amount or 0))
-    if currency in ("UZS", "SUM"):
-        return amount.quantize(Decimal("1"), rounding=ROUND_HALF_UP)
-    return amount.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-
-
-def calculate_debt_end(debt_start, accrued, paid, currency: str) -> Decimal:
+def get_absence_quota_map(employee_ids, year: int, month: int | None = None) -> dict:
     """
-    Qarzdorlik oxirini hisoblaydi.
-    Musbat — kompaniya xodimga qarzdor; manfiy — xodim ortiqcha olgan (avans).
+    employee_id → kvota (get_absence_quota_for_period bilan bir xil lug'at).
+    Barcha xodimlar uchun rollup jadvalidan bitta guruhlangan so'rov.
     """
-    debt_start = round_money(debt_start, currency)
-    accrued = round_money(accrued, currency)
-    paid = round_money(paid, currency)
-    return round_money(debt_start + accrued - paid, currency)
+    month = _quota_month(year, month)
+    employee_ids = list(employee_ids)
+    counts = _load_attendance_counts(year, month, employee_ids)
+    quotas = {}
+    for employee_id in employee_ids:
+        row = counts.get(employee_id, {})
+        quotas[employee_id] = {
+            'year': year,
+            'month': month,
+            **absence_quota(row.get('absent_before', 0), row.get('absent_this_month', 0)),
+        }
+    return quotas
 
 
 def is_restricted_attendance_date(for_date: date) -> bool:
-    """Yakshanba yoki yopiq kun (nalivshiklar bundan mustasno ishlaydi)."""
-    if for_date.weekday() == 6:
-        return True
-    return DayOff.objects.filter(date=for_date).exists()
+    """Yakshanba yoki yopiq kun (nalivshiklar bundan mustasno ishlaydi). Tekshiruv — bazadan."""
+    return WorkCalendar.load(for_date.year).is_restricted(for_date)
 
 
 def get_restricted_day_reason(for_date: date) -> str:
     if for_date.weekday() == 6:
         return str(_("Yakshanba"))
-    dayoff = DayOff.objects.filter(date=for_date).first()
+    dayoff = WorkCalendar.load(for_date.year).get_day_off(for_date)
     return dayoff.reason if dayoff else str(_("Yopiq kun"))
 
 
@@ -264,63 +288,11 @@ def get_bulk_attendance_employees(for_date: date):
 
 
 def calculate_working_days_in_month(year, month):
-    """Oy ichidagi ишчи кунларни ҳисоблайди (якшанбаларни ва ёпиқ кунларни чиқариб)"""
-    total_days = monthrange(year, month)[1]
-    start_date = date(year, month, 1)
-    
-    working_days = 0
-    dayoffs = set(DayOff.objects.filter(
-        date__year=year, 
-        date__month=month
-    ).values_list('date', flat=True))
-    
-    for day in range(1, total_days + 1):
-        current_date = date(year, month, day)
-        # Якшанба = 6 (Python'да)
-        if current_date.weekday() != 6 and current_date not in dayoffs:
-            working_days += 1
-    
-    return working_days, total_days
-
-
-def get_nalivshik_team_for_datetime(dt: datetime):
     """
-    Berilgan sana/vaqt uchun qaysi komanda (1, 2 yoki 3) ishlashini hisoblaydi.
-
-    Aylanish qoidasi (uzluksiz sikl):
-    1-kun: 1-kom (kun 09:00–21:00), 2-kom (tun 21:00–09:00)
-    2-kun: 3-kom (kun 09:00–21:00), 1-kom (tun 21:00–09:00)
-    3-kun: 2-kom (kun 09:00–21:00), 3-kom (tun 21:00–09:00)
-    va shu tartib 1-2-3 bo'lib davom etadi (kun: K[i], tun: K[i+1]).
-
-    Bu funksiya faqat qaysi komanda ekanini qaytaradi (1/2/3).
+    Oy ichidagi ишчи кунларни ҳисоблайди (якшанбаларни ва ёпиқ кунларни чиқариб).
+    Oylik hisobi uchun — jarayon cache'idan emas, bazadan (bitta kichik so'rov).
     """
-    if not isinstance(dt, datetime):
-        # Agar faqat sana berilsa, uni 12:00 ga qo'yib yuboramiz
-        dt = datetime.combine(dt, datetime.min.time()) + timedelta(hours=12)
-
-    # Siklni boshlash nuqtasi (boshlanish sanasini o'zgaruvchan qilish uchun)
-    # Hozircha: 2026-01-01 ni 1-kun deb qabul qilamiz
-    cycle_start = datetime(2026, 1, 1, 0, 0, 0)
-
-    # Kun boshlanishini 09:00 deb olamiz (09:00–21:00 kun, 21:00–09:00 tun)
-    # Lekin komanda tanlash uchun biz faqat "smena raqami"ni hisoblaymiz.
-
-    # Necha soat/smena o'tganini topish
-    delta_hours = int((dt - cycle_start).total_seconds() // 3600)
-
-    # Har bir smena 12 soat: [09:00–21:00], [21:00–09:00]
-    shift_index = delta_hours // 12  # 0,1,2,3,...
-
-    # 0-chi smena: 1-kun kunduz (1-kom), 1-chi smena: 1-kun tun (2-kom),
-    # 2-chi smena: 2-kun kunduz (3-kom), 3-chi smena: 2-kun tun (1-kom), ...
-    # Ketma-ketlik: [1, 2, 3, 1, 2, 3, ...]
-    team_cycle = [1, 2, 3]
-    team_code = team_cycle[shift_index % len(team_cycle)]
-
-    # Ma'lumot uchun Team obyektini qaytarmoqchi bo'lsak, shu yerda olamiz,
-    # lekin hozircha faqat raqamni qaytaramiz.
-    return team_code
+    return WorkCalendar.load(year).working_days_in_month(month)
 
 
 def get_nalivshik_teams_for_date(day: date):
@@ -328,35 +300,11 @@ def get_nalivshik_teams_for_date(day: date):
     Bitta sana uchun:
       - kunduzgi smena (09:00–21:00) komandasini
       - tungi smena (21:00–ertasi 09:00) komandasini
-    hisoblab qaytaradi.
+    hisoblab qaytaradi (qo'lda kiritilgan override hisobga olinadi).
 
     Natija: (day_team_code, night_team_code) -> (1/2/3, 1/2/3)
     """
-    # Avval qo'lda kiritilgan override mavjudmi, tekshiramiz
-    override = NalivshikShiftOverride.objects.filter(date=day).select_related("day_team", "night_team").first()
-    if override:
-        day_team_code = override.day_team.code if override.day_team else None
-        night_team_code = override.night_team.code if override.night_team else None
-        # Agar faqat bittasi to'ldirilgan bo'lsa, qolganini avtomatik sikldan olamiz
-        if day_team_code is not None and night_team_code is not None:
-            return day_team_code, night_team_code
-
-        day_start = datetime.combine(day, datetime.min.time()) + timedelta(hours=9)   # 09:00
-        night_start = datetime.combine(day, datetime.min.time()) + timedelta(hours=21)  # 21:00
-
-        auto_day = get_nalivshik_team_for_datetime(day_start)
-        auto_night = get_nalivshik_team_for_datetime(night_start)
-
-        return day_team_code or auto_day, night_team_code or auto_night
-
-    # Override bo'lmasa, avtomatik sikl bo'yicha hisoblaymiz
-    day_start = datetime.combine(day, datetime.min.time()) + timedelta(hours=9)   # 09:00
-    night_start = datetime.combine(day, datetime.min.time()) + timedelta(hours=21)  # 21:00
-
-    day_team = get_nalivshik_team_for_datetime(day_start)
-    night_team = get_nalivshik_team_for_datetime(night_start)
-
-    return day_team, night_team
+    return MonthSchedule.build(day.year, day.month).teams_for(day)
 
 
 def calculate_nalivshik_planned_days(year: int, month: int, employee: Employee) -> int:
@@ -365,19 +313,66 @@ def calculate_nalivshik_planned_days(year: int, month: int, employee: Employee)
     to'g'ri kelishini hisoblaydi.
 
     Maqsad: agar u barcha rejalashtirilgan kunlarda kelgan bo'lsa,
-    oyligi 100% bo'lsin.
+    oyligi 100% bo'lsin. Jadval bazadan quriladi (jarayon cache'i eskirgan bo'lishi mumkin).
     """
+    total_days = monthrange(year, month)[1]
     if not employee.team:
-        return monthrange(year, month)[1]
+        return total_days
+    return MonthSchedule.build(year, month).planned_days_for_team(employee.team.code) or total_days
+
+
+def save_nalivshik_override(start: date, day_team=None, night_team=None, comment=None, until=None):
+    """
+    Sana uchun override saqlaydi va (ikkala komanda berilgan bo'lsa) siklni
+    `until` sanasigacha (default: oy oxiri) davom ettiradi — bitta bulk upsert.
+    Oraliq SCHEDULE_MAX_DAYS kundan oshsa, ValueError. Faqat rejadagi kunlari o'zgargan komandalar nalivshiklari qayta hisoblash
+    navbatiga qo'shiladi. Saqlangan kunlar sonini qaytaradi.
+    """
+    rows = [(start, day_team, night_team)]
+    if day_team and night_team:
+        if until is None:
+            until = date(start.year, start.month, monthrange(start.year, start.month)[1])
+        if (until - start).days >= SCHEDULE_MAX_DAYS:
+            raise ValueError(f"Oraliq {SCHEDULE_MAX_DAYS} kundan oshmasligi kerak.")
+        teams_by_code = {team.code: team for team in Team.objects.all()}
+        for day, day_code, night_code in propagate_rotation(start, day_team.code, night_team.code, until):
+            if day_code not in teams_by_code:
+                break
+            rows.append((day, teams_by_code[day_code], teams_by_code[night_code]))
+
+    months = sorted({(day.year, day.month) for day, _day_team, _night_team in rows})
+    # Oldingi va keyingi reja bazadan: boshqa jarayon cache'i eskirgan bo'lishi mumkin
+    planned_before = {key: MonthSchedule.build(*key).planned_days_by_team() for key in months}
+
+    with transaction.atomic():
+        NalivshikShiftOverride.objects.bulk_create(
+            [
+                NalivshikShiftOverride(date=day, day_team=day_team, night_team=night_team, comment=comment)
+                for day, day_team, night_team in rows
+            ],
+            update_conflicts=True,
+            unique_fields=['date'],
+            update_fields=['day_team', 'night_team', 'comment', 'updated_at'],
+        )
+        # bulk_create signal yubormaydi — jadval cache'ini o'zimiz tozalaymiz
+        invalidate_month_schedule(*months)
+
+        dirty_keys = []
+        for year, month in months:
+            before = planned_before[(year, month)]
+            after = MonthSchedule.build(year, month).planned_days_by_team()
+            changed_codes = [code for code in set(before) | set(after) if before.get(code, 0) != after.get(code, 0)]
+            if not changed_codes:
+                continue
+            employee_ids = Employee.objects.filter(
+                role='nalivshik', team__code__in=changed_codes
+            ).values_list('id', flat=True)
+            dirty_keys.extend((employee_id, year, month) for employee_id in employee_ids)
+        mark_payroll_dirty(dirty_keys)
+    return len(rows)
 
-    total_days = monthrange(year, month)[1]
-    planned_days = 0
-    for day_num in range(1, total_days + 1):
-        current_date = date(year, month, day_num)
-        day_team, night_team = get_nalivshik_teams_for_date(current_date)
-        if employee.team.code in (day_team, night_team):
-            planned_days += 1
-    return planned_days or total_days
+
+NALIVSHIK_AUTO_ATTENDANCE_COMMENT = "Nalivshik smena jadvali bo'yicha avtomatik"
 
 
 def generate_nalivshik_attendance_for_day(day: date):
@@ -395,33 +390,63 @@ def generate_nalivshik_attendance_for_day(day: date):
       Hozircha Attendance modelida vaqt yo'qligi uchun, ikkala smena ham
       bitta kunga "keldi" sifatida yoziladi (keyin kerak bo'lsa kengaytiramiz).
     """
+    return generate_nalivshik_attendance_for_range(day, day)
 
-    day_team_code, night_team_code = get_nalivshik_teams_for_date(day)
-
-    # Kun va tun komandalarini topish
-    day_team = Team.objects.filter(code=day_team_code).first()
-    night_team = Team.objects.filter(code=night_team_code).first()
 
-    if not day_team and not night_team:
-        # Komandalar hali yaratilmagan bo'lsa, hech narsa qilmaymiz
-        return
+def generate_nalivshik_attendance_for_range(start: date, end: date, batch_size=1000):
+    """
+    start..end (ikkalasi ham kiradi) oralig'i uchun nalivshiklar davomatini
+    oylik jadval asosida yozadi. Mavjud yozuvlar (qo'lda absent/sick va h.k.)
+    ustiga yozilmaydi: yetishmayotgan satrlar bulk_create(ignore_conflicts) bilan
+    qo'shiladi, so'ng rollup yangilanadi va oylar qayta hisoblash navbatiga
+    qo'yiladi. Qo'shilgan yozuvlar sonini qaytaradi.
+    """
+    team_ids_by_code = dict(Team.objects.values_list('code', 'id'))
+    employee_ids_by_team = defaultdict(list)
+    for employee_id, team_id in Employee.objects.filter(
+        is_active=True, role='nalivshik', team__isnull=False
+    ).values_list('id', 'team_id'):
+        employee_ids_by_team[team_id].append(employee_id)
+    if not employee_ids_by_team or start > end:
+        return 0
 
-    nalivshiks = Employee.objects.filter(is_active=True, role='nalivshik').select_related('team')
+    existing = set(
+        Attendance.objects.filter(
+            date__range=(start, end),
+            employee_id__in=[pk for ids in employee_ids_by_team.values() for pk in ids],
+        ).values_list('employee_id', 'date')
+    )
 
-    for emp in nalivshiks:
-        if not emp.team:
-            continue
+    objs = []
+    keys = set()
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        for day, day_team_code, night_team_code in MonthSchedule.build(year, month):
+            if not start <= day <= end:
+                continue
+            team_ids = {team_ids_by_code.get(day_team_code), team_ids_by_code.get(night_team_code)}
+            for team_id in team_ids:
+                for employee_id in employee_ids_by_team.get(team_id, ()):
+                    if (employee_id, day) in existing:
+                        continue
+                    objs.append(Attendance(
+                        employee_id=employee_id,
+                        date=day,
+                        status='present',
+                        comment=NALIVSHIK_AUTO_ATTENDANCE_COMMENT,
+                    ))
+                    keys.add((employee_id, year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    if not objs:
+        return 0
+    with transaction.atomic():
+        # bulk_create signal yubormaydi — rollup va navbat qo'lda yangilanadi
+        Attendance.objects.bulk_create(objs, batch_size=batch_size, ignore_conflicts=True)
+        refresh_attendance_summary(keys)
+        mark_payroll_dirty(keys)
+    return len(objs)
 
-        if emp.team == day_team or emp.team == night_team:
-            # Mavjud yozuvni (qo'lda absent/sick va h.k.) ustiga yozmaymiz
-            Attendance.objects.get_or_create(
-                employee=emp,
-                date=day,
-                defaults={
-                    'status': 'present',
-                    'comment': "Nalivshik smena jadvali bo'yicha avtomatik",
-                },
-            )
 
 def create_initial_attendance_for_new_employee(employee: Employee, hire_date: date, worked_days_count: int):
     """
@@ -433,9 +458,7 @@ def create_initial_attendance_for_new_employee(employee: Employee, hire_date: da
 
     year, month = hire_date.year, hire_date.month
     total_days = monthrange(year, month)[1]
-    dayoffs = set(
-        DayOff.objects.filter(date__year=year, date__month=month).values_list("date", flat=True)
-    )
+    dayoffs = WorkCalendar.load(year).day_offs_in_month(month)
 
     created = 0
     for day in range(hire_date.day, total_days + 1):
@@ -547,10 +570,10 @@ def update_future_months_salary(employee, new_salary, new_currency, current_year
                 future_stat.currency = new_currency
                 future_stat.save(update_fields=['salary', 'currency'])
                 calculate_monthly_stats(
-                    check_year, check_month, employee=employee, preserve_salary=True
+                    check_year, check_month, employee=employee, preserve_salary=True, cascade=False
                 )
         else:
-            calculate_monthly_stats(check_year, check_month, employee=employee)
+            calculate_monthly_stats(check_year, check_month, employee=employee, cascade=False)
             future_stat = MonthlyEmployeeStat.objects.filter(
                 employee=employee,
                 year=check_year,
@@ -562,7 +585,7 @@ def update_future_months_salary(employee, new_salary, new_currency, current_year
                     future_stat.currency = new_currency
                     future_stat.save(update_fields=['salary', 'currency'])
                     calculate_monthly_stats(
-                        check_year, check_month, employee=employee, preserve_salary=True
+                        check_year, check_month, employee=employee, preserve_salary=True, cascade=False
                     )
 
         # Keyingi oyga o'tish
@@ -571,6 +594,9 @@ def update_future_months_salary(employee, new_salary, new_currency, current_year
         else:
             current_date = current_date.replace(month=current_date.month + 1)
 
+    # Qarzdorlik zanjiri oylar bo'yicha emas, oxirida bir marta yangilanadi
+    cascade_debt_chain(current_year, current_month, employee_ids=[employee.pk])
+
 
 def sync_stat_paid_from_payments(stat: MonthlyEmployeeStat):
     """To'lovlar jadvalidan jami summa va oxirgi sanani statistikaga yozadi."""
@@ -597,195 +623,395 @@ def apply_salary_payment_changes(stat, delete_ids, new_amount=None, new_date=Non
     sync_stat_paid_from_payments(stat)
 
 
-def calculate_monthly_stats(year, month, employee=None, preserve_salary=False):
+def _previous_year_month(year: int, month: int):
+    if month > 1:
+        return year, month - 1
+    return year - 1, 12
+
+
+def _load_attendance_counts(year: int, month: int, employee_ids) -> dict:
+    """
+    Rollup jadvalidan bitta guruhlangan so'rov: ishlangan kunlar, shu oy va
+    oldingi oylardagi kelmagan kunlar (21 kun kvotasi uchun) — xodim bo'yicha.
+    """
+    worked = F(WORKED_DAY_STATUSES[0])
+    for status in WORKED_DAY_STATUSES[1:]:
+        worked = worked + F(status)
+    rows = (
+        MonthlyAttendanceSummary.objects.filter(
+            employee_id__in=employee_ids,
+            year=year,
+            month__lte=month,
+        )
+        .values('employee_id')
+        .annotate(
+            worked=Coalesce(Sum(worked, filter=Q(month=month)), 0),
+            absent_this_month=Coalesce(Sum('absent', filter=Q(month=month)), 0),
+            absent_before=Coalesce(Sum('absent', filter=Q(month__lt=month)), 0),
+        )
+        .order_by()
+    )
+    return {row['employee_id']: row for row in rows}
+
+
+def get_attendance_summary_map(year: int, month: int, employee_ids=None) -> dict:
+    """employee_id → MonthlyAttendanceSummary (shu oy uchun, bitta so'rov)."""
+    summaries = MonthlyAttendanceSummary.objects.filter(year=year, month=month)
+    if employee_ids is not None:
+        summaries = summaries.filter(employee_id__in=employee_ids)
+    return {summary.employee_id: summary for summary in summaries}
+
+
+def refresh_attendance_summary(keys):
+    """
+    (employee_id, year, month) kalitlari uchun rollup satrlarini davomatdan
+    qayta sanaydi. Bulk yozuvlardan (bulk_create, update) keyin chaqiriladi;
+    oddiy save/delete signallar orqali yangilanadi.
+    """
+    ids_by_month = defaultdict(set)
+    for employee_id, year, month in keys:
+        ids_by_month[(year, month)].add(employee_id)
+
+    for (year, month), employee_ids in ids_by_month.items():
+        rows = (
+            Attendance.objects.filter(
+                employee_id__in=employee_ids,
+                date__gte=date(year, month, 1),
+                date__lte=date(year, month, monthrange(year, month)[1]),
+            )
+            .values('employee_id', 'status')
+            .annotate(cnt=Count('id'))
+            .order_by()
+        )
+        summaries = {}
+        for row in rows:
+            if row['status'] not in ATTENDANCE_SUMMARY_FIELDS:
+                continue
+            summary = summaries.get(row['employee_id'])
+            if summary is None:
+                summary = summaries[row['employee_id']] = MonthlyAttendanceSummary(
+                    employee_id=row['employee_id'], year=year, month=month,
+                )
+            setattr(summary, row['status'], row['cnt'])
+
+        empty_ids = employee_ids - summaries.keys()
+        if empty_ids:
+            MonthlyAttendanceSummary.objects.filter(
+                year=year, month=month, employee_id__in=empty_ids,
+            ).delete()
+        if summaries:
+            MonthlyAttendanceSummary.objects.bulk_create(
+                summaries.values(),
+                update_conflicts=True,
+                unique_fields=['employee', 'year', 'month'],
+                update_fields=[*ATTENDANCE_SUMMARY_FIELDS, 'updated_at'],
+            )
+
+
+def rebuild_attendance_summary(year=None) -> int:
+    """Rollup jadvalini davomatdan to'liq qayta quradi (year berilsa — faqat shu yil)."""
+    attendances = Attendance.objects.all()
+    summaries_qs = MonthlyAttendanceSummary.objects.all()
+    if year is not None:
+        attendances = attendances.filter(date__year=year)
+        summaries_qs = summaries_qs.filter(year=year)
+
+    rows = (
+        attendances.annotate(year_num=ExtractYear('date'), month_num=ExtractMonth('date'))
+        .values('employee_id', 'year_num', 'month_num', 'status')
+        .annotate(cnt=Count('id'))
+        .order_by()
+    )
+    summaries = {}
+    for row in rows:
+        if row['status'] not in ATTENDANCE_SUMMARY_FIELDS:
+            continue
+        key = (row['employee_id'], row['year_num'], row['month_num'])
+        summary = summaries.get(key)
+        if summary is None:
+            summary = summaries[key] = MonthlyAttendanceSummary(
+                employee_id=key[0], year=key[1], month=key[2],
+            )
+        setattr(summary, row['status'], row['cnt'])
+
+    with transaction.atomic():
+        summaries_qs.delete()
+        MonthlyAttendanceSummary.objects.bulk_create(summaries.values(), batch_size=1000)
+    return len(summaries)
+
+
+def _load_payment_totals(year: int, month: int, employee_ids) -> dict:
+    """Stat bo'yicha to'lovlar yig'indisi va oxirgi to'lov sanasi (bitta so'rov)."""
+    rows = (
+        SalaryPayment.objects.filter(
+            stat__year=year,
+            stat__month=month,
+            stat__employee_id__in=employee_ids,
+        )
+        .values('stat_id')
+        .annotate(total=Sum('amount'), latest=Max('paid_at'))
+    )
+    return {row['stat_id']: row for row in rows}
+
+
+def calculate_monthly_stats(
+    year, month, employee=None, preserve_salary=False, employee_ids=None, cascade=True, production=None,
+):
     """
     Oylik statistikani hisoblaydi.
     employee berilsa — faqat shu xodim (modal saqlash uchun tez).
+    employee_ids berilsa — faqat shu xodimlar (navbatdagi kalitlar uchun).
     preserve_salary=True — oylikni DB dagi qiymatda qoldiradi (keyingi oyga ko'chirishda).
+    cascade=True — keyingi oylarning debt_start/debt_end zanjiri ham yangilanadi.
+    production — tayyor ProductionBonusContext (bo'lmasa shu oy uchun yuklanadi).
+
+    Barcha kiruvchi ma'lumotlar (statlar, avvalgi oy, davomat, to'lovlar,
+    premiya, nalivshik jadvali) xodimlar soniga bog'liq bo'lmagan sondagi
+    so'rovlar bilan yuklanadi, natija bulk_create/bulk_update bilan yoziladi.
     """
-    working_days_in_month, total_days_in_month = calculate_working_days_in_month(year, month)
-    employees = Employee.objects.filter(is_active=True)
+    now = timezone.now()
     if employee is not None:
-        employees = employees.filter(pk=employee.pk)
+        employee_ids = [employee.pk]
+    elif employee_ids is not None:
+        employee_ids = list(employee_ids)
+
+    working_days_in_month, total_days_in_month = calculate_working_days_in_month(year, month)
+    employees = Employee.objects.filter(is_active=True).select_related('team')
+    if employee_ids is not None:
+        employees = employees.filter(pk__in=employee_ids)
+    employees = list(employees)
+    if not employees:
+        _clear_dirty_keys(year, month, employee_ids, now)
+        return
+    requested_ids = employee_ids
+    employee_ids = [emp.pk for emp in employees]
+
+    prev_year, prev_month = _previous_year_month(year, month)
+    stats_by_employee = {
+        stat.employee_id: stat
+        for stat in MonthlyEmployeeStat.objects.filter(
+            year=year, month=month, employee_id__in=employee_ids
+        )
+    }
+    prev_stats_by_employee = {
+        stat.employee_id: stat
+        for stat in MonthlyEmployeeStat.objects.filter(
+            year=prev_year, month=prev_month, employee_id__in=employee_ids
+        )
+    }
+    payment_totals = _load_payment_totals(year, month, employee_ids)
+    attendance_counts = _load_attendance_counts(year, month, employee_ids)
+
+    if production is None:
+        production = get_production_bonus_context(year, month)
+
+    nalivshik_planned = None
+    if any(emp.role == 'nalivshik' and emp.team for emp in employees):
+        nalivshik_planned = MonthSchedule.build(year, month).planned_days_by_team()
+
+    month_data = PayrollMonth(
+        working_days_in_month, total_days_in_month,
+        production_bonus=production.bonus_amount, preserve_salary=preserve_salary,
+    )
+    inputs = []
     for employee in employees:
-        # Stat yozuvini olish (agar mavjud bo'lsa)
-        stat = MonthlyEmployeeStat.objects.filter(employee=employee, year=year, month=month).first()
+        stat = stats_by_employee.get(employee.pk)
+        prev_stat = prev_stats_by_employee.get(employee.pk)
+        counts = attendance_counts.get(employee.pk, {})
+        item = PayrollInput(
+            employee.pk,
+            employee_type=employee.employee_type,
+            role=employee.role,
+            planned_days=(
+                nalivshik_planned.get(employee.team.code, 0)
+                if employee.role == 'nalivshik' and employee.team else 0
+            ),
+            production_eligible=production.is_eligible(employee.pk),
+            worked_days=counts.get('worked', 0),
+            absent_this_month=counts.get('absent_this_month', 0),
+            absent_before=counts.get('absent_before', 0),
+        )
         if stat:
-            bonus = stat.bonus
-            bonus_override = stat.bonus_override
-            penalty = stat.penalty
-            manual_salary = stat.manual_salary
-            if stat.salary_override or preserve_salary:
-                salary = stat.salary
-                currency = stat.currency
-            else:
-                prev_stat = get_previous_month_stat(employee, year, month)
-                if prev_stat:
-                    salary = prev_stat.salary
-                    currency = prev_stat.currency
-                else:
-                    salary = stat.salary
-                    currency = stat.currency
-            if stat.salary_payments.exists():
-                sync_stat_paid_from_payments(stat)
-                stat.refresh_from_db()
-            paid = stat.paid
-            paid_at = stat.paid_at
+            item.has_stat = True
+            item.salary = stat.salary
+            item.salary_override = stat.salary_override
+            item.currency = stat.currency
+            item.bonus = stat.bonus
+            item.bonus_override = stat.bonus_override
+            item.penalty = stat.penalty
+            item.manual_salary = stat.manual_salary
+            item.paid = stat.paid
+            item.paid_at = stat.paid_at
+            payments = payment_totals.get(stat.pk)
+            if payments:
+                item.payments_total = payments['total'] or Decimal('0')
+                item.payments_latest = payments['latest']
+        if prev_stat:
+            item.has_prev = True
+            item.prev_salary = prev_stat.salary
+            item.prev_currency = prev_stat.currency
+            item.prev_debt_end = prev_stat.debt_end
+        inputs.append(item)
+
+    to_create = []
+    to_update = []
+    for result in compute_payroll_batch(inputs, month_data):
+        values = result.as_dict()
+        values['calculated_at'] = now
+        stat = stats_by_employee.get(result.employee_id)
+        if stat:
+            for field, value in values.items():
+                setattr(stat, field, value)
+            to_update.append(stat)
         else:
-            # Oldingi oyning ma'lumotlarini olish
-            prev_stat = get_previous_month_stat(employee, year, month)
-            
-            # Agar oldingi oy ma'lumoti mavjud bo'lsa, undan oylikni va valyutani olish
-            if prev_stat:
-                salary = prev_stat.salary
-                bonus = Decimal('0')  # Yangi oy uchun bonus 0 dan boshlanadi
-                currency = prev_stat.currency  # Valyutani ham oldingi oydan olish
-            else:
-                salary = Decimal('0')  # Yangi xodim — oylikni keyin qo'lda kiritasiz
-                bonus = Decimal('0')
-                currency = 'UZS'  # Birinchi marta uchun default valyuta
-            
-            paid = Decimal('0')
-            paid_at = None
-            manual_salary = (employee.employee_type == 'office')
-            penalty = Decimal('0')
-            bonus_override = False
-
-        eligible_this_month = is_production_bonus_eligible_for_month(employee, year, month)
-        if eligible_this_month and currency == 'UZS' and not bonus_override:
-            production_bonus = resolve_production_bonus(
-                employee, year, month, currency, bonus, bonus_override
+            to_create.append(
+                MonthlyEmployeeStat(employee_id=result.employee_id, year=year, month=month, **values)
             )
-            bonus = production_bonus if production_bonus is not None else Decimal('0')
-        elif not bonus_override and not eligible_this_month:
-            if is_auto_production_bonus(bonus):
-                bonus = Decimal('0')
 
-        # Ishlangan kunlar hisoblash
-        worked_days = Attendance.objects.filter(
-            employee=employee,
-            date__year=year,
-            date__month=month,
-            status__in=WORKED_DAY_STATUSES,
-        ).count()
-        quota = get_absence_quota_for_period(employee, year, month)
-        forgiven_in_month = quota['forgiven_in_month']
-        effective_worked_days_for_full = worked_days + forgiven_in_month
-        
-        # Hisoblangan summa - turi bo'yicha
-        if employee.employee_type == 'office' or manual_salary:
-            # Ofis xodimlari to'liq oylik oladi (davomati umuman hisobga olinmaydi)
-            # Bonus to'liq beriladi, oylik ham to'liq
-            accrued = salary + bonus - penalty
-        elif employee.employee_type == 'half':
-            # 15 kunlik xodimlar har kuni ishlaydi, ularga dam olish yo'q (maksimal 15 kun)
-            max_days = 15  # Har doim 15 kun
-            effective_worked_days = min(effective_worked_days_for_full, max_days)
-            if max_days > 0:
-                # Oylik proporsional hisoblanadi, bonus to'liq beriladi
-                salary_proportion = Decimal(str(effective_worked_days)) / Decimal(str(max_days))
-                accrued_salary = salary * salary_proportion
-                accrued = accrued_salary + bonus - penalty
-            else:
-                accrued = bonus - penalty  # Faqat bonus
-        elif employee.employee_type == 'weekly':
-            # Haftada 1 kun ishlaydigan xodimlar (to'liq stavka)
-            # Optimal holat: oyda 4 kun
-            optimal_days = 4  # Bir oyda taxminan 4 hafta
-            # Ishlagan kunlarni optimal kunlarga proporsional hisoblash
-            proportion = Decimal(str(effective_worked_days_for_full)) / Decimal(str(optimal_days))
-            # Agar xodim kerakli kundan ko'p ishlasa, to'liq stavka berish
-            if proportion > Decimal('1'):
-                proportion = Decimal('1')
-            # Oylik proporsional hisoblanadi, bonus to'liq beriladi
-            accrued_salary = salary * proportion
-            accrued = accrued_salary + bonus - penalty
-        elif employee.employee_type == 'guard':
-            # Qorovullar (oyda 10 kun ishlashi optimal)
-            optimal_days = 10
-            # Ishlagan kunlarni optimal kunlarga proporsional hisoblash
-            proportion = Decimal(str(effective_worked_days_for_full)) / Decimal(str(optimal_days))
-            # Agar xodim kerakli kundan ko'p ishlasa, to'liq stavka berish
-            if proportion > Decimal('1'):
-                proportion = Decimal('1')
-            # Oylik proporsional hisoblanadi, bonus to'liq beriladi
-            accrued_salary = salary * proportion
-            accrued = accrued_salary + bonus - penalty
+    # Stat yozuvlarini yaratish yoki yangilash
+    with transaction.atomic():
+        if to_create:
+            MonthlyEmployeeStat.objects.bulk_create(to_create)
+        if to_update:
+            MonthlyEmployeeStat.objects.bulk_update(to_update, MONTHLY_STAT_CALCULATED_FIELDS)
+        _clear_dirty_keys(year, month, requested_ids, now)
+        if cascade:
+            cascade_debt_chain(year, month, employee_ids=employee_ids)
+
+
+def cascade_debt_chain(year, month, employee_ids=None):
+    """
+    (year, month) dan keyingi oylarning qarzdorlik zanjirini qayta hisoblaydi:
+    debt_start = oldingi oy debt_end, debt_end = debt_start + accrued - paid.
+    Oldingi oy stati bo'lmasa (oraliq oy yo'q), debt_start 0 — hisoblash bilan bir xil.
+    Barcha keyingi statlar bitta tartiblangan so'rov bilan o'qiladi, faqat o'zgarganlari
+    bulk_update bilan yoziladi. Yangilangan statlar sonini qaytaradi.
+    """
+    stats = MonthlyEmployeeStat.objects.filter(
+        Q(year=year, month__gte=month) | Q(year__gt=year)
+    ).order_by('employee_id', 'year', 'month').only(
+        'id', 'employee_id', 'year', 'month', 'accrued', 'paid', 'currency', 'debt_start', 'debt_end',
+    )
+    if employee_ids is not None:
+        stats = stats.filter(employee_id__in=employee_ids)
+
+    to_update = []
+    prev = None
+    for stat in stats.iterator(chunk_size=2000):
+        if prev is None or prev.employee_id != stat.employee_id:
+            # Boshlang'ich oy statlari qayta hisoblanmaydi — zanjir shu yerdan boshlanadi
+            prev = stat
+            if (stat.year, stat.month) == (year, month):
+                continue
+        prev_year, prev_month = _previous_year_month(stat.year, stat.month)
+        if prev is not stat and (prev.year, prev.month) == (prev_year, prev_month):
+            debt_start = round_money(prev.debt_end, stat.currency)
         else:
-            # To'liq stavka xodimlar uchun (full)
-            # Oddiy xodimlar uchun ishchi kunlarga proporsional,
-            # nalivshiklar uchun esa o'z navbatchilik rejasi (komandaga to'g'ri keladigan kunlar)
-            # bo'yicha proporsional hisoblaymiz.
-            if employee.role == 'nalivshik':
-                denominator_days = calculate_nalivshik_planned_days(year, month, employee)
-            else:
-                denominator_days = working_days_in_month
-
-            if denominator_days > 0:
-                salary_proportion = Decimal(str(effective_worked_days_for_full)) / Decimal(str(denominator_days))
-                # Agar worked_days kunlardan ko'p bo'lsa,
-                # stavka 100% dan oshib ketmasligi uchun 1 bilan cheklaymiz.
-                if salary_proportion > Decimal('1'):
-                    salary_proportion = Decimal('1')
-                accrued_salary = salary * salary_proportion
-                accrued = accrued_salary + bonus - penalty
-            else:
-                accrued = bonus - penalty  # Faqat bonus
-
-        # Pul summalarini valyutaga mos yaxlitlash (40/67 so'm qoldiqlarini kamaytirish)
-        bonus = round_money(bonus, currency)
-        penalty = round_money(penalty, currency)
-        accrued = round_money(accrued, currency)
-        paid = round_money(paid, currency)
-
-        # Oldingi oy oxiridagi qarzdorlik
-        prev_stat = get_previous_month_stat(employee, year, month)
-        debt_start = round_money(prev_stat.debt_end if prev_stat else Decimal('0'), currency)
-        debt_end = calculate_debt_end(debt_start, accrued, paid, currency)
-        now = timezone.now()
-
-        # Stat yozuvini yaratish yoki yangilash
-        with transaction.atomic():
-            stat_obj, created = MonthlyEmployeeStat.objects.get_or_create(
-                employee=employee, year=year, month=month,
-                defaults={
-                    'salary': salary,
-                    'bonus': bonus,
-                    'bonus_override': bonus_override,
-                    'penalty': penalty,
-                    'days_in_month': total_days_in_month,
-                    'worked_days': worked_days,
-                    'accrued': accrued,
-                    'paid': paid,
-                    'paid_at': paid_at,
-                    'debt_start': debt_start,
-                    'debt_end': debt_end,
-                    'manual_salary': manual_salary,
-                    'currency': currency,
-                    'calculated_at': now,
-                }
-            )
-            if not created:
-                stat_obj.salary = salary
-                stat_obj.bonus = bonus
-                stat_obj.bonus_override = bonus_override
-                stat_obj.penalty = penalty
-                stat_obj.days_in_month = total_days_in_month
-                stat_obj.worked_days = worked_days
-                stat_obj.accrued = accrued
-                stat_obj.paid = paid
-                stat_obj.paid_at = paid_at
-                stat_obj.debt_start = debt_start
-                stat_obj.debt_end = debt_end
-                stat_obj.manual_salary = manual_salary
-                stat_obj.currency = currency
-                stat_obj.calculated_at = now
-                update_fields = [
-                    'salary', 'bonus', 'bonus_override', 'penalty', 'days_in_month',
-                    'worked_days', 'accrued', 'paid', 'paid_at', 'debt_start',
-                    'debt_end', 'manual_salary', 'currency', 'calculated_at',
-                ]
-                stat_obj.save(update_fields=update_fields)
+            debt_start = Decimal('0')
+        debt_end = calculate_debt_end(debt_start, stat.accrued, stat.paid, stat.currency)
+        if debt_start != stat.debt_start or debt_end != stat.debt_end:
+            stat.debt_start = debt_start
+            stat.debt_end = debt_end
+            to_update.append(stat)
+        prev = stat
+
+    if to_update:
+        MonthlyEmployeeStat.objects.bulk_update(to_update, ['debt_start', 'debt_end'], batch_size=1000)
+    return len(to_update)
+
+
+def _clear_dirty_keys(year, month, employee_ids, calculated_at):
+    """
+    Hisoblangan (xodim, oy) kalitlarini navbatdan o'chiradi.
+    Hisoblash boshlangandan keyin qo'shilgan kalitlar qoldiriladi.
+    """
+    keys = PayrollDirtyMonth.objects.filter(year=year, month=month, created_at__lte=calculated_at)
+    if employee_ids is not None:
+        keys = keys.filter(employee_id__in=employee_ids)
+    keys.delete()
+
+
+def mark_payroll_dirty(keys):
+    """
+    (employee_id, year, month) kalitlarini qayta hisoblash navbatiga qo'shadi.
+    Mavjud kalitlar takrorlanmaydi.
+    """
+    objs = [
+        PayrollDirtyMonth(employee_id=employee_id, year=year, month=month)
+        for employee_id, year, month in set(keys)
+    ]
+    if objs:
+        PayrollDirtyMonth.objects.bulk_create(objs, ignore_conflicts=True)
+
+
+def mark_month_dirty(year, month):
+    """Oy bo'yicha barcha aktiv xodimlarni navbatga qo'shadi (yopiq kun, premiya)."""
+    employee_ids = Employee.objects.filter(is_active=True).values_list('id', flat=True)
+    mark_payroll_dirty((employee_id, year, month) for employee_id in employee_ids)
+
+
+def mark_nalivshik_days_dirty(days, team_ids=()):
+    """
+    Override qo'lda (admin) o'zgargan kunlar uchun: o'sha kunlarda eski yoki
+    yangi rejada turgan komandalar (override komandalari va avtomatik sikl)
+    nalivshiklarini shu oylar bo'yicha navbatga qo'shadi.
+    """
+    rotation = load_shift_rotation()
+    override_codes = set(Team.objects.filter(pk__in=[pk for pk in team_ids if pk]).values_list('code', flat=True))
+    codes_by_month = defaultdict(set)
+    for day in days:
+        codes_by_month[(day.year, day.month)].update(override_codes, rotation.teams_for(day))
+
+    keys = []
+    for (year, month), codes in codes_by_month.items():
+        employee_ids = Employee.objects.filter(role='nalivshik', team__code__in=codes).values_list('id', flat=True)
+        keys.extend((employee_id, year, month) for employee_id in employee_ids)
+    mark_payroll_dirty(keys)
+
+
+def mark_nalivshik_stats_dirty():
+    """
+    Aylanish qoidasi o'zgarganda: nalivshiklarning hisoblangan barcha oylari
+    navbatga qo'shiladi (reja kunlari qoidaga bog'liq).
+    """
+    mark_payroll_dirty(
+        MonthlyEmployeeStat.objects.filter(employee__role='nalivshik').values_list('employee_id', 'year', 'month')
+    )
+
+
+def recalculate_dirty_stats(year=None, month=None, employee_ids=None):
+    """
+    Navbatdagi kalitlarni oy bo'yicha guruhlab, faqat shu xodimlarni qayta hisoblaydi.
+    Oylar xronologik tartibda hisoblanadi (keyingi oy qarzdorligi oldingisiga bog'liq).
+    year/month/employee_ids — navbatning faqat shu qismi (bitta yozuvni saqlagan
+    so'rov butun navbatni hisoblamasligi uchun). Oy berilsa, undan oldingi oylar
+    kalitlari ham olinadi: oy boshidagi qarz oldingi oy oxiridagi qarzdan keladi.
+    Qayta hisoblangan kalitlar sonini qaytaradi.
+    """
+    keys = PayrollDirtyMonth.objects.all()
+    if year is not None and month is not None:
+        keys = keys.filter(Q(year__lt=year) | Q(year=year, month__lte=month))
+    elif year is not None:
+        keys = keys.filter(year__lte=year)
+    elif month is not None:
+        keys = keys.filter(month=month)
+    if employee_ids is not None:
+        keys = keys.filter(employee_id__in=employee_ids)
+
+    ids_by_month = defaultdict(set)
+    for employee_id, key_year, key_month in keys.values_list('employee_id', 'year', 'month'):
+        ids_by_month[(key_year, key_month)].add(employee_id)
+
+    if not ids_by_month:
+        return 0
+    for key_year, key_month in sorted(ids_by_month):
+        calculate_monthly_stats(
+            key_year, key_month, employee_ids=ids_by_month[(key_year, key_month)], cascade=False,
+        )
+    # Zanjir eng erta oydan bir marta yuriladi
+    first_year, first_month = min(ids_by_month)
+    cascade_debt_chain(first_year, first_month, employee_ids=set().union(*ids_by_month.values()))
+    return sum(len(ids) for ids in ids_by_month.values())
 
 
 def sync_monthly_stats_for_date(employee, day: date):
@@ -798,11 +1024,27 @@ def sync_monthly_stats_for_month(year: int, month: int, employee=None):
     calculate_monthly_stats(year, month, employee=employee)
 
 
+def mark_stale_employee_stats(year: int, month: int):
+    """
+    Hisoblangandan keyin xodim kartochkasi (turi, roli, komandasi va h.k.)
+    o'zgargan statlarni navbatga qo'shadi: Employee saqlanishi navbatga yozmaydi.
+    Faqat aktiv xodimlar — calculate_monthly_stats noaktivlarni hisoblamaydi.
+    """
+    mark_payroll_dirty(
+        MonthlyEmployeeStat.objects.filter(year=year, month=month, employee__is_active=True)
+        .filter(Q(calculated_at__isnull=True) | Q(calculated_at__lt=F('employee__updated_at')))
+        .values_list('employee_id', 'year', 'month')
+    )
+
+
 def ensure_monthly_stats_for_month(year: int, month: int):
     """
     Yangi oy ochilganda faqat yo'q bo'lgan xodim statlarini yaratadi.
-    Mavjud yozuvlarni qayta hisoblamaydi — bu «Qayta hisoblash» tugmasi vazifasi.
+    Mavjud yozuvlarni qayta hisoblamaydi — bu «Qayta hisoblash» tugmasi vazifasi;
+    faqat xodim kartochkasi keyin o'zgarganlarini navbatga qo'yadi
+    (mark_stale_employee_stats), ularni recalculate_dirty_stats hisoblaydi.
     """
+    mark_stale_employee_stats(year, month)
     active_ids = set(Employee.objects.filter(is_active=True).values_list('id', flat=True))
     if not active_ids:
         return
@@ -815,7 +1057,6 @@ def ensure_monthly_stats_for_month(year: int, month: int):
         if missing_ids == active_ids:
             calculate_monthly_stats(year, month)
         else:
-            for emp in Employee.objects.filter(id__in=missing_ids):
-                calculate_monthly_stats(year, month, employee=emp)
+            calculate_monthly_stats(year, month, employee_ids=missing_ids)
 
     sync_salary_from_previous_month(year, month)
\ No newline at end of file
@@ -0,0 +1,301 @@
+"""
+Nalivshik komandalarining smena jadvali.
+
+Avtomatik sikl (ShiftRotation, standart: 1-2-3 aylanish) va qo'lda kiritilgan
+override'lar asosida oyning har bir kuni uchun kunduzgi/tungi komandalar bir
+marta hisoblanadi.
+Oy jadvali bitta so'rov bilan quriladi va Django cache'da saqlanadi;
+override saqlanganda/o'chirilganda signallar cache'ni tozalaydi.
+Cache jarayonga xos, shuning uchun oylik hisobi jadval va qoidani
+bazadan o'qiydi (MonthSchedule.build, load_shift_rotation).
+"""
+from calendar import monthrange
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .models import NalivshikShiftOverride, ShiftRotation
+
+CACHE_KEY = "blog:nalivshik_schedule:{rotation}:{year}:{month}"
+ROTATION_CACHE_KEY = "blog:shift_rotation"
+
+# Komandalar aylanish tartibi (standart)
+TEAM_CYCLE = (1, 2, 3)
+
+# Kunduzgi va tungi smena boshlanishi orasidagi soatlar (09:00 → 21:00)
+NIGHT_SHIFT_OFFSET_HOURS = 12
+
+# Bitta so'rovda o'qiladigan/saqlanadigan jadvalning maksimal uzunligi (kun)
+SCHEDULE_MAX_DAYS = 366
+
+
+def _cache_timeout():
+    return getattr(settings, "NALIVSHIK_SCHEDULE_CACHE_TIMEOUT", 300)
+
+
+class CompiledRotation:
+    """
+    Aylanish qoidasi butun sonli arifmetikaga o'girilgan: vaqt nuqtasi
+    "date.toordinal() * 24 + soat" ko'rinishidagi soat indeksi bilan ifodalanadi,
+    komanda esa team_order[(soat - anchor) // shift_hours % n] — har qanday
+    sana uchun O(1), datetime obyektlarisiz.
+    """
+
+    __slots__ = ("anchor", "shift_hours", "team_order", "day_start_hour")
+
+    def __init__(self, anchor_date: date, anchor_hour=0, shift_hours=12, team_order=TEAM_CYCLE, day_start_hour=9):
+        self.anchor = anchor_date.toordinal() * 24 + anchor_hour
+        self.shift_hours = shift_hours
+        self.team_order = tuple(team_order)
+        self.day_start_hour = day_start_hour
+
+    @classmethod
+    def from_model(cls, rotation):
+        return cls(
+            rotation.anchor_date,
+            anchor_hour=rotation.anchor_hour,
+            shift_hours=rotation.shift_hours,
+            team_order=rotation.team_codes,
+            day_start_hour=rotation.day_start_hour,
+        )
+
+    @property
+    def cache_token(self) -> str:
+        """Cache kalitlari uchun qoidaning qisqa ifodasi."""
+        order = "".join(str(code) for code in self.team_order)
+        return f"{self.anchor}-{self.shift_hours}-{order}-{self.day_start_hour}"
+
+    def as_tuple(self):
+        return self.anchor, self.shift_hours, self.team_order, self.day_start_hour
+
+    @classmethod
+    def from_tuple(cls, values):
+        rotation = cls.__new__(cls)
+        rotation.anchor, rotation.shift_hours, rotation.team_order, rotation.day_start_hour = values
+        return rotation
+
+    def team_at(self, hour_index: int):
+        return self.team_order[(hour_index - self.anchor) // self.shift_hours % len(self.team_order)]
+
+    def team_for_datetime(self, dt):
+        if not isinstance(dt, datetime):
+            # Agar faqat sana berilsa, uni 12:00 ga qo'yib yuboramiz
+            return self.team_at(dt.toordinal() * 24 + 12)
+        return self.team_at(dt.toordinal() * 24 + dt.hour)
+
+    def teams_for(self, day: date):
+        """(kunduzgi, tungi) komanda kodlari."""
+        day_start = day.toordinal() * 24 + self.day_start_hour
+        return self.team_at(day_start), self.team_at(day_start + NIGHT_SHIFT_OFFSET_HOURS)
+
+    def teams_for_range(self, start: date, days: int):
+        """start dan boshlab `days` kun uchun (kunduzgi, tungi) — bitta o'tishda."""
+        order, size, step = self.team_order, len(self.team_order), self.shift_hours
+        first = start.toordinal() * 24 + self.day_start_hour - self.anchor
+        return [
+            (
+                order[(first + offset) // step % size],
+                order[(first + offset + NIGHT_SHIFT_OFFSET_HOURS) // step % size],
+            )
+            for offset in range(0, days * 24, 24)
+        ]
+
+    def year_schedule(self, year: int):
+        """Yilning har bir kuni uchun (kunduzgi, tungi) komanda kodlari."""
+        start = date(year, 1, 1)
+        return self.teams_for_range(start, (date(year + 1, 1, 1) - start).days)
+
+
+# Faol ShiftRotation yozuvi bo'lmaganda ishlatiladigan standart qoida
+DEFAULT_ROTATION = CompiledRotation(date(2026, 1, 1), anchor_hour=0, shift_hours=12, team_order=TEAM_CYCLE, day_start_hour=9)
+
+
+def active_rotation_record():
+    """Faol ShiftRotation yozuvi (bir nechta bo'lsa — oxirgi o'zgargani) yoki None."""
+    return ShiftRotation.objects.filter(is_active=True).order_by("-updated_at").first()
+
+
+def load_shift_rotation() -> CompiledRotation:
+    """
+    Faol aylanish qoidasi bazadan (bitta so'rov, cache'siz). Oylik hisobi
+    shuni ishlatadi: jarayon cache'i boshqa jarayondagi o'zgarishni bilmaydi.
+    """
+    record = active_rotation_record()
+    return CompiledRotation.from_model(record) if record else DEFAULT_ROTATION
+
+
+def get_shift_rotation() -> CompiledRotation:
+    """Faol aylanish qoidasi cache'dan, bo'lmasa bazadan — faqat ko'rsatish uchun."""
+    cached = cache.get(ROTATION_CACHE_KEY)
+    if cached is not None:
+        return CompiledRotation.from_tuple(cached)
+    rotation = load_shift_rotation()
+    if not connection.in_atomic_block:
+        cache.set(ROTATION_CACHE_KEY, rotation.as_tuple(), _cache_timeout())
+    return rotation
+
+
+def invalidate_shift_rotation():
+    """
+    Qoida o'zgarganda uni cache'dan o'chiradi. Oy jadvallari kalitida qoida
+    ifodasi bor, shuning uchun eski jadvallar o'z-o'zidan ishlatilmay qoladi.
+    """
+    cache.delete(ROTATION_CACHE_KEY)
+    transaction.on_commit(lambda: cache.delete(ROTATION_CACHE_KEY))
+
+
+def get_nalivshik_team_for_datetime(dt: datetime):
+    """
+    Berilgan sana/vaqt uchun qaysi komanda (1, 2 yoki 3) ishlashini hisoblaydi.
+
+    Standart aylanish qoidasi (uzluksiz sikl):
+    1-kun: 1-kom (kun 09:00–21:00), 2-kom (tun 21:00–09:00)
+    2-kun: 3-kom (kun 09:00–21:00), 1-kom (tun 21:00–09:00)
+    3-kun: 2-kom (kun 09:00–21:00), 3-kom (tun 21:00–09:00)
+    va shu tartib 1-2-3 bo'lib davom etadi (kun: K[i], tun: K[i+1]).
+    Sikl boshlanishi, smena uzunligi va tartib ShiftRotation da sozlanadi.
+
+    Bu funksiya faqat qaysi komanda ekanini qaytaradi (1/2/3).
+    """
+    return get_shift_rotation().team_for_datetime(dt)
+
+
+def resolve_nalivshik_teams(day: date, day_team_code=None, night_team_code=None, rotation=None):
+    """
+    Sana va (ixtiyoriy) override komanda kodlaridan kunduzgi/tungi komandalarni
+    hisoblaydi. Override'ning bo'sh tomoni avtomatik sikldan olinadi.
+    """
+    if day_team_code is not None and night_team_code is not None:
+        return day_team_code, night_team_code
+    auto_day, auto_night = (rotation or get_shift_rotation()).teams_for(day)
+    return day_team_code or auto_day, night_team_code or auto_night
+
+
+def propagate_rotation(start: date, day_team_code, night_team_code, until: date):
+    """
+    Qo'lda kiritilgan kundan keyin siklni davom ettiradi: (sana, kunduzgi, tungi).
+    Qoidaga ko'ra:
+      keyingi kun kunduzgi komanda = hozirgi kunda ishlamagan komanda
+      keyingi kun tungi komanda = hozirgi kundagi kunduzgi komanda
+    Kunduzgi va tungi komanda bir xil bo'lsa, sikl davom ettirilmaydi.
+    """
+    if day_team_code == night_team_code:
+        return
+    current = start
+    while current < until:
+        current += timedelta(days=1)
+        remaining = sorted(set(TEAM_CYCLE) - {day_team_code, night_team_code})
+        if not remaining:
+            return
+        day_team_code, night_team_code = remaining[0], day_team_code
+        yield current, day_team_code, night_team_code
+
+
+class MonthSchedule:
+    """
+    Oy jadvali: har bir kun uchun (kunduzgi, tungi) komanda kodlari va
+    qaysi kunlar override qilingani.
+    """
+
+    __slots__ = ("year", "month", "teams", "overridden")
+
+    def __init__(self, year: int, month: int, teams: tuple, overridden: frozenset):
+        self.year = year
+        self.month = month
+        self.teams = teams  # teams[day - 1] == (day_team_code, night_team_code)
+        self.overridden = overridden  # override qilingan kun raqamlari
+
+    @classmethod
+    def build(cls, year: int, month: int, rotation=None):
+        """Oy override'larini bitta so'rov bilan olib, barcha kunlarni hisoblaydi."""
+        overrides = {
+            day: (day_code, night_code)
+            for day, day_code, night_code in NalivshikShiftOverride.objects.filter(
+                date__year=year, date__month=month
+            ).values_list("date", "day_team__code", "night_team__code")
+        }
+        return cls.from_overrides(year, month, overrides, rotation=rotation)
+
+    @classmethod
+    def from_overrides(cls, year: int, month: int, overrides: dict, rotation=None):
+        """
+        overrides: sana → (kunduzgi kod, tungi kod); oldindan yuklangan bo'lsa.
+        rotation berilmasa, qoida bazadan o'qiladi (cache'siz).
+        """
+        rotation = rotation or load_shift_rotation()
+        teams = rotation.teams_for_range(date(year, month, 1), monthrange(year, month)[1])
+        for day, (day_code, night_code) in overrides.items():
+            auto_day, auto_night = teams[day.day - 1]
+            teams[day.day - 1] = (day_code or auto_day, night_code or auto_night)
+        return cls(year, month, tuple(teams), frozenset(day.day for day in overrides))
+
+    def __iter__(self):
+        """(sana, kunduzgi, tungi) kunlar bo'yicha."""
+        for day_num, (day_team, night_team) in enumerate(self.teams, start=1):
+            yield date(self.year, self.month, day_num), day_team, night_team
+
+    def teams_for(self, day: date):
+        return self.teams[day.day - 1]
+
+    def is_overridden(self, day: date) -> bool:
+        return day.day in self.overridden
+
+    def planned_days_by_team(self) -> dict:
+        """Komanda kodi → oy bo'yicha rejadagi navbatchilik kunlari soni."""
+        planned = defaultdict(int)
+        for day_teams in self.teams:
+            for code in set(day_teams):
+                planned[code] += 1
+        return planned
+
+    def planned_days_for_team(self, team_code) -> int:
+        return sum(1 for day_teams in self.teams if team_code in day_teams)
+
+
+def get_month_schedule(year: int, month: int) -> MonthSchedule:
+    """
+    Oy jadvali cache'dan, bo'lmasa bazadan (bitta so'rov).
+    Tranzaksiya ichida qurilgan jadval cache'ga yozilmaydi.
+    """
+    rotation = get_shift_rotation()
+    key = CACHE_KEY.format(rotation=rotation.cache_token, year=year, month=month)
+    cached = cache.get(key)
+    if cached is None:
+        schedule = MonthSchedule.build(year, month, rotation=rotation)
+        if not connection.in_atomic_block:
+            cache.set(key, (schedule.teams, schedule.overridden), _cache_timeout())
+        return schedule
+    teams, overridden = cached
+    return MonthSchedule(year, month, teams, overridden)
+
+
+def iter_schedule(start: date, end: date, rotation=None, overrides=None):
+    """
+    start..end (ikkalasi ham kiradi) uchun (sana, kunduzgi, tungi, override qilinganmi).
+    overrides (sana → (kunduzgi kod, tungi kod)) berilsa, jadval cache'siz shu
+    ma'lumotdan va `rotation` dan quriladi; aks holda oy jadvallari cache'dan.
+    """
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        if overrides is None:
+            schedule = get_month_schedule(year, month)
+        else:
+            month_overrides = {
+                day: codes for day, codes in overrides.items() if (day.year, day.month) == (year, month)
+            }
+            schedule = MonthSchedule.from_overrides(year, month, month_overrides, rotation=rotation)
+        for day, day_team, night_team in schedule:
+            if start <= day <= end:
+                yield day, day_team, night_team, schedule.is_overridden(day)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def invalidate_month_schedule(*months):
+    """(yil, oy) jadvallarini cache'dan o'chiradi (darhol va tranzaksiya tugagach)."""
+    token = get_shift_rotation().cache_token
+    keys = [CACHE_KEY.format(rotation=token, year=year, month=month) for year, month in set(months)]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,131 @@
+"""
+Oylik hisobga ta'sir qiluvchi yozuvlar o'zgarganda (xodim, yil, oy)
+kalitlarini qayta hisoblash navbatiga (PayrollDirtyMonth) qo'shadi va
+davomat rollup jadvalini (MonthlyAttendanceSummary) yangilaydi.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import (
+    Attendance, DayOff, MonthlyEmployeeStat, MonthlyProduction, NalivshikShiftOverride, SalaryPayment,
+    ShiftRotation,
+)
+from .services import (
+    mark_month_dirty, mark_nalivshik_days_dirty, mark_nalivshik_stats_dirty, mark_payroll_dirty,
+    refresh_attendance_summary,
+)
+from .shift_schedule import invalidate_month_schedule, invalidate_shift_rotation
+from .work_calendar import invalidate_work_calendar
+
+
+@receiver(post_init, sender=Attendance)
+def remember_attendance_key(sender, instance, **kwargs):
+    """Yozuv boshqa xodim/oyga ko'chirilsa, eski oyni ham belgilash uchun."""
+    instance._payroll_key = (instance.employee_id, instance.date)
+
+
+def _attendance_keys(instance):
+    keys = set()
+    for employee_id, day in (getattr(instance, '_payroll_key', (None, None)), (instance.employee_id, instance.date)):
+        if employee_id and day:
+            keys.add((employee_id, day.year, day.month))
+    return keys
+
+
+@receiver(post_save, sender=Attendance)
+def attendance_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    keys = _attendance_keys(instance)
+    refresh_attendance_summary(keys)
+    mark_payroll_dirty(keys)
+    instance._payroll_key = (instance.employee_id, instance.date)
+
+
+@receiver(post_delete, sender=Attendance)
+def attendance_deleted(sender, instance, **kwargs):
+    keys = _attendance_keys(instance)
+    refresh_attendance_summary(keys)
+    mark_payroll_dirty(keys)
+
+
+@receiver(post_save, sender=SalaryPayment)
+@receiver(post_delete, sender=SalaryPayment)
+def salary_payment_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Stat o'chirilayotgan bo'lsa (kaskad), kalit ham kerak emas
+    mark_payroll_dirty(
+        MonthlyEmployeeStat.objects.filter(pk=instance.stat_id).values_list('employee_id', 'year', 'month')
+    )
+
+
+@receiver(post_init, sender=DayOff)
+def remember_day_off_date(sender, instance, **kwargs):
+    instance._payroll_date = instance.date
+
+
+@receiver(post_save, sender=DayOff)
+@receiver(post_delete, sender=DayOff)
+def day_off_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    months = {(day.year, day.month) for day in (instance._payroll_date, instance.date) if day}
+    invalidate_work_calendar(*(year for year, _month in months))
+    for year, month in months:
+        mark_month_dirty(year, month)
+    instance._payroll_date = instance.date
+
+
+@receiver(post_save, sender=MonthlyProduction)
+@receiver(post_delete, sender=MonthlyProduction)
+def monthly_production_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    mark_month_dirty(instance.year, instance.month)
+
+
+@receiver(m2m_changed, sender=MonthlyProduction.eligible_employees.through)
+def production_eligible_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # instance — Employee, pk_set — MonthlyProduction id lari
+        if action == 'pre_clear':
+            records = instance.production_bonus_months.all()
+        else:
+            records = MonthlyProduction.objects.filter(pk__in=pk_set or ())
+        mark_payroll_dirty((instance.pk, year, month) for year, month in records.values_list('year', 'month'))
+    elif action == 'pre_clear':
+        mark_month_dirty(instance.year, instance.month)
+    else:
+        mark_payroll_dirty((employee_id, instance.year, instance.month) for employee_id in pk_set or ())
+
+
+@receiver(post_init, sender=NalivshikShiftOverride)
+def remember_override_state(sender, instance, **kwargs):
+    instance._schedule_state = (instance.date, instance.day_team_id, instance.night_team_id)
+
+
+@receiver(post_save, sender=NalivshikShiftOverride)
+@receiver(post_delete, sender=NalivshikShiftOverride)
+def shift_override_changed(sender, instance, raw=False, created=False, **kwargs):
+    if raw:
+        return
+    old_date, old_day_team, old_night_team = instance._schedule_state
+    state = (instance.date, instance.day_team_id, instance.night_team_id)
+    days = {day for day in (old_date, instance.date) if day}
+    invalidate_month_schedule(*{(day.year, day.month) for day in days})
+    # Admin orqali tahrir: rejasi o'zgargan komandalar nalivshiklari navbatga
+    if created or kwargs.get('signal') is post_delete or state != instance._schedule_state:
+        mark_nalivshik_days_dirty(days, (old_day_team, old_night_team, instance.day_team_id, instance.night_team_id))
+    instance._schedule_state = state
+
+
+@receiver(post_save, sender=ShiftRotation)
+@receiver(post_delete, sender=ShiftRotation)
+def shift_rotation_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_shift_rotation()
+    mark_nalivshik_stats_dirty()
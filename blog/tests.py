@@ -1,24 +1,47 @@
+import os
+import tempfile
 from datetime import date
 from decimal import Decimal
 
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.test import Client, SimpleTestCase, TestCase, override_settings
 from django.urls import reverse
 
-from blog.models import Attendance, Employee, MonthlyEmployeeStat, MonthlyProduction, Team, AttendanceImportLog
+from blog.models import (
+    Attendance, AttendanceImportLog, DayOff, Employee, MonthlyAttendanceSummary, MonthlyEmployeeStat,
+    MonthlyProduction, NalivshikShiftOverride, PayrollDirtyMonth, SalaryPayment, ShiftRotation, Team,
+)
+from blog.attendance_import import import_attendance_file, process_queued_imports
+from blog.employee_resolver import EmployeeLookupError, EmployeeResolver
+from blog.payroll import PayrollInput, PayrollMonth, compute_payroll
 from blog.services import (
     calculate_debt_end,
     calculate_monthly_stats,
+    calculate_working_days_in_month,
+    cascade_debt_chain,
     create_initial_attendance_for_new_employee,
     ensure_initial_monthly_stat,
     ensure_monthly_stats_for_month,
     generate_nalivshik_attendance_for_day,
+    generate_nalivshik_attendance_for_range,
     get_absence_quota_for_period,
+    get_absence_quota_map,
+    get_production_bonus_context,
     normalize_attendance_status,
+    recalculate_dirty_stats,
     round_money,
+    save_nalivshik_override,
     sync_monthly_stats_for_date,
     YEARLY_ABSENCE_FREE_LIMIT,
 )
+from blog.shift_schedule import (
+    DEFAULT_ROTATION, CompiledRotation, MonthSchedule, get_month_schedule, get_nalivshik_team_for_datetime,
+    invalidate_month_schedule, invalidate_shift_rotation, resolve_nalivshik_teams,
+)
+from blog.work_calendar import WorkCalendar, get_work_calendar, invalidate_work_calendar
+
+# Import testlarida yuklangan fayllar shu vaqtinchalik papkaga saqlanadi
+IMPORT_MEDIA_ROOT = tempfile.mkdtemp(prefix="davomat-test-media-")
 
 
 class RoundMoneyTests(TestCase):
@@ -288,7 +311,7 @@ class EmployeeCreateViewTests(TestCase):
             response["Content-Type"],
         )
         self.assertIn("attachment", response["Content-Disposition"])
-        self.assertGreater(len(response.content), 1000)
+        self.assertGreater(len(b"".join(response.streaming_content)), 1000)
 
     def test_employee_export_respects_search_filter(self):
         Employee.objects.create(
@@ -297,9 +320,16 @@ class EmployeeCreateViewTests(TestCase):
         Employee.objects.create(
             first_name="Boshqa", last_name="Yashirin", position="B", employee_type="full"
         )
+        import io
+        import openpyxl
+
         response = self.client.get(reverse("employee_list_export"), {"q": "Top"})
         self.assertEqual(response.status_code, 200)
-        self.assertGreater(len(response.content), 500)
+        ws = openpyxl.load_workbook(io.BytesIO(b"".join(response.streaming_content))).active
+        self.assertEqual(ws["B5"].value, "Top")
+        self.assertIsNone(ws["B6"].value)
+        self.assertEqual(ws.freeze_panes, "A5")
+        self.assertEqual(ws["M5"].style, "employee-list-active")
 
     def test_employee_list_filters_by_department_and_status(self):
         Employee.objects.create(
@@ -969,6 +999,7 @@ class LogicIntegrationTests(TestCase):
         )
         self.assertIsNotNone(FS)
 
+    @override_settings(ATTENDANCE_IMPORT_MODE="sync", MEDIA_ROOT=IMPORT_MEDIA_ROOT)
     def test_import_invalid_status_skipped(self):
         User = get_user_model()
         user = User.objects.create_user(username="imp", password="pass12345")
@@ -1431,3 +1462,1355 @@ class SalaryPaymentHistoryTests(TestCase):
             response["Content-Type"],
         )
 
+
+class BatchPayrollEngineTests(TestCase):
+    """calculate_monthly_stats so'rovlar soni xodimlar soniga bog'liq bo'lmasligi kerak."""
+
+    def _create_employees(self, count, start=0):
+        for i in range(start, start + count):
+            emp = Employee.objects.create(
+                first_name=f"Ism{i}",
+                last_name=f"Familiya{i}",
+                position="Operator",
+                employee_type=("full", "half", "weekly", "guard", "office")[i % 5],
+            )
+            MonthlyEmployeeStat.objects.create(
+                employee=emp, year=2026, month=5, salary=Decimal("6000000"),
+                debt_end=Decimal("1000"), currency="UZS",
+            )
+            Attendance.objects.create(employee=emp, date=date(2026, 6, 2), status="present")
+            Attendance.objects.create(employee=emp, date=date(2026, 6, 3), status="absent")
+
+    def _count_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        MonthlyEmployeeStat.objects.filter(year=2026, month=6).delete()
+        with CaptureQueriesContext(connection) as ctx:
+            calculate_monthly_stats(2026, 6)
+        return len(ctx.captured_queries)
+
+    def test_query_count_is_constant(self):
+        self._create_employees(2)
+        small = self._count_queries()
+        self._create_employees(20, start=2)
+        large = self._count_queries()
+        self.assertEqual(small, large)
+        self.assertEqual(MonthlyEmployeeStat.objects.filter(year=2026, month=6).count(), 22)
+
+    def test_batch_results_carry_previous_month(self):
+        self._create_employees(3)
+        calculate_monthly_stats(2026, 6)
+        for stat in MonthlyEmployeeStat.objects.filter(year=2026, month=6):
+            self.assertEqual(stat.salary, Decimal("6000000"))
+            self.assertEqual(stat.debt_start, Decimal("1000"))
+            self.assertEqual(stat.worked_days, 1)
+            self.assertEqual(stat.debt_end, stat.debt_start + stat.accrued - stat.paid)
+
+
+class PayrollDirtyTrackingTests(TestCase):
+    """O'zgarishlar (xodim, oy) kalitlarini belgilaydi, qayta hisoblash faqat ularni ko'radi."""
+
+    def setUp(self):
+        self.emp1 = Employee.objects.create(first_name="Ali", last_name="Valiyev", position="Operator")
+        self.emp2 = Employee.objects.create(first_name="Vali", last_name="Aliyev", position="Operator")
+        for emp in (self.emp1, self.emp2):
+            MonthlyEmployeeStat.objects.create(
+                employee=emp, year=2026, month=6, salary=Decimal("6000000"), currency="UZS",
+            )
+
+    def _keys(self):
+        return set(PayrollDirtyMonth.objects.values_list("employee_id", "year", "month"))
+
+    def test_attendance_marks_only_its_employee(self):
+        Attendance.objects.create(employee=self.emp1, date=date(2026, 6, 2), status="present")
+        self.assertEqual(self._keys(), {(self.emp1.pk, 2026, 6)})
+
+        self.assertEqual(recalculate_dirty_stats(), 1)
+        self.assertEqual(self._keys(), set())
+        self.assertEqual(MonthlyEmployeeStat.objects.get(employee=self.emp1, year=2026, month=6).worked_days, 1)
+        self.assertIsNone(MonthlyEmployeeStat.objects.get(employee=self.emp2, year=2026, month=6).calculated_at)
+
+    def test_moving_attendance_marks_both_months(self):
+        record = Attendance.objects.create(employee=self.emp1, date=date(2026, 6, 2), status="present")
+        PayrollDirtyMonth.objects.all().delete()
+        record.date = date(2026, 7, 1)
+        record.save()
+        self.assertEqual(self._keys(), {(self.emp1.pk, 2026, 6), (self.emp1.pk, 2026, 7)})
+
+    def test_day_off_and_production_mark_whole_month(self):
+        DayOff.objects.create(date=date(2026, 6, 12), reason="Bayram")
+        self.assertEqual(self._keys(), {(self.emp1.pk, 2026, 6), (self.emp2.pk, 2026, 6)})
+
+        PayrollDirtyMonth.objects.all().delete()
+        record = MonthlyProduction.objects.create(year=2026, month=8, production_tons=Decimal("2000"))
+        PayrollDirtyMonth.objects.all().delete()
+        record.eligible_employees.add(self.emp2)
+        self.assertEqual(self._keys(), {(self.emp2.pk, 2026, 8)})
+
+    def test_single_row_view_recalculates_only_its_employee(self):
+        get_user_model().objects.create_user(username="dirty_admin", password="pass12345")
+        self.client.login(username="dirty_admin", password="pass12345")
+        record = Attendance.objects.create(employee=self.emp1, date=date(2026, 6, 2), status="present")
+        Attendance.objects.create(employee=self.emp2, date=date(2026, 5, 4), status="present")
+
+        self.client.post(reverse("attendance_delete", args=[record.pk]))
+        # Boshqa xodimning (boshqa oy) navbati so'rov ichida hisoblanmaydi
+        self.assertEqual(self._keys(), {(self.emp2.pk, 2026, 5)})
+        self.assertIsNotNone(MonthlyEmployeeStat.objects.get(employee=self.emp1, year=2026, month=6).calculated_at)
+
+    def test_payment_marks_stat_month(self):
+        stat = MonthlyEmployeeStat.objects.get(employee=self.emp2, year=2026, month=6)
+        SalaryPayment.objects.create(stat=stat, amount=Decimal("100000"), paid_at=date(2026, 6, 20))
+        self.assertEqual(self._keys(), {(self.emp2.pk, 2026, 6)})
+        recalculate_dirty_stats(2026, 6)
+        stat.refresh_from_db()
+        self.assertEqual(stat.paid, Decimal("100000"))
+        self.assertEqual(self._keys(), set())
+
+    def test_month_recalculation_settles_earlier_dirty_months(self):
+        calculate_monthly_stats(2026, 7, employee=self.emp2)
+        june = MonthlyEmployeeStat.objects.get(employee=self.emp2, year=2026, month=6)
+        SalaryPayment.objects.create(stat=june, amount=Decimal("100000"), paid_at=date(2026, 6, 20))
+        self.assertEqual(self._keys(), {(self.emp2.pk, 2026, 6)})
+
+        # Iyul sahifasi/eksporti: iyun qarzi avval hisoblanadi
+        recalculate_dirty_stats(2026, 7)
+        self.assertEqual(self._keys(), set())
+        june.refresh_from_db()
+        july = MonthlyEmployeeStat.objects.get(employee=self.emp2, year=2026, month=7)
+        self.assertEqual(july.debt_start, june.debt_end)
+
+
+class DebtCascadeTests(TestCase):
+    """Oy o'zgarganda keyingi oylarning qarzdorlik zanjiri yangilanadi."""
+
+    def setUp(self):
+        self.emp = Employee.objects.create(
+            first_name="Ali", last_name="Valiyev", position="Ofis", employee_type="office",
+        )
+        for month in (3, 4, 5, 7):
+            MonthlyEmployeeStat.objects.create(
+                employee=self.emp, year=2026, month=month, salary=Decimal("1000000"),
+                accrued=Decimal("1000000"), manual_salary=True, currency="UZS",
+            )
+        calculate_monthly_stats(2026, 3)
+
+    def _debts(self):
+        return {
+            stat.month: (stat.debt_start, stat.debt_end)
+            for stat in MonthlyEmployeeStat.objects.filter(employee=self.emp, year=2026)
+        }
+
+    def test_chain_is_pushed_forward(self):
+        debts = self._debts()
+        self.assertEqual(debts[3], (Decimal("0"), Decimal("1000000")))
+        self.assertEqual(debts[4], (Decimal("1000000"), Decimal("2000000")))
+        self.assertEqual(debts[5], (Decimal("2000000"), Decimal("3000000")))
+        # Iyun stati yo'q — iyul zanjiri noldan boshlanadi
+        self.assertEqual(debts[7], (Decimal("0"), Decimal("1000000")))
+
+    def test_payment_change_updates_later_months(self):
+        stat = MonthlyEmployeeStat.objects.get(employee=self.emp, year=2026, month=3)
+        SalaryPayment.objects.create(stat=stat, amount=Decimal("400000"), paid_at=date(2026, 3, 25))
+        calculate_monthly_stats(2026, 3, employee=self.emp)
+        debts = self._debts()
+        self.assertEqual(debts[3][1], Decimal("600000"))
+        self.assertEqual(debts[5], (Decimal("1600000"), Decimal("2600000")))
+
+    def test_cascade_without_engine(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        MonthlyEmployeeStat.objects.filter(employee=self.emp, year=2026, month=3).update(debt_end=Decimal("5"))
+        with CaptureQueriesContext(connection) as ctx:
+            updated = cascade_debt_chain(2026, 3)
+        self.assertEqual(updated, 2)
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+        self.assertEqual(self._debts()[5], (Decimal("1000005"), Decimal("2000005")))
+
+
+class RecalculatePayrollCommandTests(TestCase):
+    """recalculate_payroll buyrug'i: oylar ketma-ket, checkpoint va davom ettirish."""
+
+    def setUp(self):
+        import tempfile
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.checkpoint = f"{self.tmpdir.name}/checkpoint.json"
+        self.employees = [
+            Employee.objects.create(
+                first_name=f"Ism{i}", last_name=f"Familiya{i}", position="Ofis", employee_type="office",
+            )
+            for i in range(3)
+        ]
+        for emp in self.employees:
+            MonthlyEmployeeStat.objects.create(
+                employee=emp, year=2025, month=12, salary=Decimal("1000000"), currency="UZS",
+            )
+
+    def _call(self, *extra):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command(
+            "recalculate_payroll", "--from", "2025-12", "--to", "2026-02",
+            "--chunk-size", "2", "--checkpoint", self.checkpoint, *extra, stdout=out,
+        )
+        return out.getvalue()
+
+    def test_months_chain_debt_in_order(self):
+        output = self._call()
+        self.assertIn("[2/2]", output)
+        for emp in self.employees:
+            stat = MonthlyEmployeeStat.objects.get(employee=emp, year=2026, month=2)
+            self.assertEqual(stat.debt_start, Decimal("2000000"))
+            self.assertEqual(stat.debt_end, Decimal("3000000"))
+
+    def test_resume_skips_finished_employees(self):
+        import json
+        from pathlib import Path
+
+        Path(self.checkpoint).write_text(json.dumps({
+            "period": "2025-12..2026-02",
+            "done_employee_ids": [self.employees[0].pk],
+        }))
+        output = self._call("--resume")
+        self.assertIn("2 xodim", output)
+        self.assertFalse(MonthlyEmployeeStat.objects.filter(employee=self.employees[0], year=2026).exists())
+        self.assertTrue(MonthlyEmployeeStat.objects.filter(employee=self.employees[1], year=2026, month=2).exists())
+        self.assertFalse(Path(self.checkpoint).exists())
+
+
+class PayrollKernelTests(SimpleTestCase):
+    """blog.payroll qoidalari bazasiz hisoblanadi."""
+
+    def setUp(self):
+        self.month = PayrollMonth(working_days=20, total_days=30, production_bonus=Decimal("2400000"))
+
+    def test_full_rate_forgives_quota_absences(self):
+        item = PayrollInput(
+            1, has_stat=True, salary=Decimal("2000000"), worked_days=15, absent_this_month=5,
+            absent_before=18, has_prev=True, prev_salary=Decimal("2000000"), prev_debt_end=Decimal("100"),
+        )
+        result = compute_payroll(item, self.month)
+        # 3 kun kvota ichida: (15 + 3) / 20
+        self.assertEqual(result.accrued, Decimal("1800000"))
+        self.assertEqual(result.debt_start, Decimal("100"))
+        self.assertEqual(result.debt_end, Decimal("1800100"))
+
+    def test_nalivshik_uses_planned_days(self):
+        item = PayrollInput(
+            2, role="nalivshik", planned_days=10, has_stat=True, salary=Decimal("3000000"), worked_days=5,
+        )
+        self.assertEqual(compute_payroll(item, self.month).accrued, Decimal("1500000"))
+
+    def test_new_employee_takes_previous_salary_and_bonus(self):
+        item = PayrollInput(
+            3, employee_type="office", has_prev=True, prev_salary=Decimal("1000000"), production_eligible=True,
+        )
+        result = compute_payroll(item, self.month)
+        self.assertTrue(result.manual_salary)
+        self.assertEqual(result.bonus, Decimal("2400000"))
+        self.assertEqual(result.accrued, Decimal("3400000"))
+
+    def test_payments_override_stored_paid(self):
+        item = PayrollInput(
+            4, employee_type="weekly", has_stat=True, salary=Decimal("400000"), worked_days=6,
+            paid=Decimal("1"), payments_total=Decimal("100000.4"), payments_latest=date(2026, 6, 3),
+        )
+        result = compute_payroll(item, self.month)
+        self.assertEqual(result.accrued, Decimal("400000"))
+        self.assertEqual(result.paid, Decimal("100000"))
+        self.assertEqual(result.paid_at, date(2026, 6, 3))
+
+
+class MonthlyAttendanceSummaryTests(TestCase):
+    """Davomat rollup jadvali har bir yozuvda yangilanadi va qayta quriladi."""
+
+    def setUp(self):
+        self.emp = Employee.objects.create(first_name="Ali", last_name="Valiyev", position="Operator")
+
+    def _summary(self, month=6):
+        return MonthlyAttendanceSummary.objects.filter(employee=self.emp, year=2026, month=month).first()
+
+    def test_save_update_delete_keep_counts(self):
+        record = Attendance.objects.create(employee=self.emp, date=date(2026, 6, 2), status="present")
+        Attendance.objects.create(employee=self.emp, date=date(2026, 6, 3), status="absent")
+        summary = self._summary()
+        self.assertEqual((summary.present, summary.absent, summary.worked), (1, 1, 1))
+
+        record.status = "sick"
+        record.save()
+        summary = self._summary()
+        self.assertEqual((summary.present, summary.sick), (0, 1))
+
+        record.date = date(2026, 7, 1)
+        record.save()
+        self.assertEqual(self._summary().sick, 0)
+        self.assertEqual(self._summary(month=7).sick, 1)
+
+        Attendance.objects.filter(employee=self.emp, date__month=6).delete()
+        self.assertIsNone(self._summary())
+
+    def test_rebuild_command(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        Attendance.objects.create(employee=self.emp, date=date(2026, 6, 2), status="late")
+        MonthlyAttendanceSummary.objects.all().delete()
+        call_command("rebuild_attendance_summary", stdout=StringIO())
+        self.assertEqual(self._summary().late, 1)
+
+    def test_quota_reads_rollup(self):
+        for day in (1, 2, 3):
+            Attendance.objects.create(employee=self.emp, date=date(2026, 5, day), status="absent")
+        Attendance.objects.create(employee=self.emp, date=date(2026, 6, 2), status="absent")
+        quota = get_absence_quota_for_period(self.emp, 2026, 6)
+        self.assertEqual((quota["absent_before"], quota["absent_this_month"]), (3, 1))
+
+
+class AbsenceQuotaMapTests(TestCase):
+    """Kvota xaritasi butun kompaniya uchun o'zgarmas sondagi so'rov bilan."""
+
+    def test_map_matches_single_and_constant_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        employees = [
+            Employee.objects.create(first_name=f"Ism{i}", last_name=f"Familiya{i}", position="Operator")
+            for i in range(4)
+        ]
+        for i, emp in enumerate(employees):
+            for day in range(1, 6 * i + 2):
+                Attendance.objects.create(employee=emp, date=date(2026, 1 + day % 3, day), status="absent")
+
+        ids = [emp.pk for emp in employees]
+        with CaptureQueriesContext(connection) as ctx:
+            quotas = get_absence_quota_map(ids, 2026, 3)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        for emp in employees:
+            self.assertEqual(quotas[emp.pk], get_absence_quota_for_period(emp, 2026, 3))
+        self.assertEqual(quotas[employees[3].pk]["absent_ytd"], 19)
+
+
+class ProductionBonusContextTests(TestCase):
+    """Premiya konteksti bir marta yuklanadi va qayta hisoblashda umumiy ishlatiladi."""
+
+    def test_context_rules_and_single_load(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        employees = [
+            Employee.objects.create(first_name=f"Ism{i}", last_name=f"Familiya{i}", position="Operator")
+            for i in range(3)
+        ]
+        record = MonthlyProduction.objects.create(year=2026, month=6, production_tons=Decimal("3500"))
+        record.eligible_employees.add(employees[0], employees[1])
+
+        with CaptureQueriesContext(connection) as ctx:
+            production = get_production_bonus_context(2026, 6)
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertTrue(production.is_active)
+        self.assertEqual(production.bonus_for(employees[0].pk, "UZS", False), Decimal("4800000"))
+        self.assertIsNone(production.bonus_for(employees[0].pk, "USD", False))
+        self.assertIsNone(production.bonus_for(employees[2].pk, "UZS", False))
+
+        with CaptureQueriesContext(connection) as ctx:
+            calculate_monthly_stats(2026, 6, production=production)
+        self.assertFalse(any("blog_monthlyproduction" in q["sql"] for q in ctx.captured_queries))
+        bonuses = dict(
+            MonthlyEmployeeStat.objects.filter(year=2026, month=6).values_list("employee_id", "bonus")
+        )
+        self.assertEqual(bonuses[employees[1].pk], Decimal("4800000"))
+        self.assertEqual(bonuses[employees[2].pk], Decimal("0"))
+
+
+class WorkCalendarTests(TestCase):
+    """Yil kalendari bitta so'rov bilan yuklanadi, DayOff o'zgarsa cache tozalanadi."""
+
+    def tearDown(self):
+        invalidate_work_calendar(2026)
+
+    def test_month_counts_and_restrictions(self):
+        DayOff.objects.create(date=date(2026, 6, 12), reason="Bayram")
+        calendar = WorkCalendar.load(2026)
+        # Iyun 2026: 30 kun, 4 yakshanba, 1 yopiq kun
+        self.assertEqual(calendar.working_days_in_month(6), (25, 30))
+        self.assertTrue(calendar.is_restricted(date(2026, 6, 7)))
+        self.assertTrue(calendar.is_restricted(date(2026, 6, 12)))
+        self.assertFalse(calendar.is_restricted(date(2026, 6, 13)))
+        self.assertEqual(calendar.get_day_off(date(2026, 6, 12)).reason, "Bayram")
+        self.assertEqual(calculate_working_days_in_month(2026, 6), (25, 30))
+
+    def test_cached_calendar_is_invalidated_on_change(self):
+        from django.core.cache import cache
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from blog.work_calendar import CACHE_KEY
+
+        cache.set(CACHE_KEY.format(year=2026), {})
+        with CaptureQueriesContext(connection) as ctx:
+            for day in range(1, 31):
+                get_work_calendar(2026).is_restricted(date(2026, 6, day))
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        DayOff.objects.create(date=date(2026, 6, 12), reason="Bayram")
+        self.assertIsNone(cache.get(CACHE_KEY.format(year=2026)))
+        self.assertTrue(get_work_calendar(2026).is_day_off(date(2026, 6, 12)))
+
+    def test_payroll_and_validation_ignore_stale_process_cache(self):
+        from django.core.cache import cache
+
+        from blog.forms import AttendanceForm
+        from blog.services import is_restricted_attendance_date
+        from blog.work_calendar import CACHE_KEY
+
+        # Boshqa jarayon DayOff qo'shgan, bu jarayonning cache'i esa eski
+        cache.set(CACHE_KEY.format(year=2026), {})
+        DayOff.objects.bulk_create([DayOff(date=date(2026, 6, 12), reason="Bayram")])
+        self.assertFalse(get_work_calendar(2026).is_day_off(date(2026, 6, 12)))
+
+        self.assertEqual(calculate_working_days_in_month(2026, 6), (25, 30))
+        self.assertTrue(is_restricted_attendance_date(date(2026, 6, 12)))
+        emp = Employee.objects.create(first_name="Kal", last_name="Endar", position="Op")
+        form = AttendanceForm(data={"employee": emp.pk, "date": "2026-06-12", "status": "present"})
+        self.assertFalse(form.is_valid())
+
+
+class NalivshikMonthScheduleTests(TestCase):
+    """Oy jadvali bitta so'rov bilan quriladi va override o'zgarsa yangilanadi."""
+
+    def setUp(self):
+        self.teams = {code: Team.objects.create(code=code, name=f"{code}-komanda") for code in (1, 2, 3)}
+
+    def tearDown(self):
+        invalidate_month_schedule((2026, 3))
+
+    def test_schedule_matches_per_day_lookup(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        NalivshikShiftOverride.objects.create(
+            date=date(2026, 3, 10), day_team=self.teams[3], night_team=self.teams[3]
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            schedule = MonthSchedule.build(2026, 3, rotation=DEFAULT_ROTATION)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        self.assertEqual(schedule.teams_for(date(2026, 3, 10)), (3, 3))
+        self.assertTrue(schedule.is_overridden(date(2026, 3, 10)))
+        for day, day_team, night_team in schedule:
+            if day.day != 10:
+                self.assertEqual((day_team, night_team), resolve_nalivshik_teams(day))
+        for code in (1, 2, 3):
+            expected = sum(1 for _day, *codes in schedule if code in codes)
+            self.assertEqual(schedule.planned_days_by_team()[code], expected)
+            self.assertEqual(schedule.planned_days_for_team(code), expected)
+
+    def test_cached_schedule_is_invalidated_on_override_change(self):
+        first = date(2026, 3, 1)
+        auto = get_month_schedule(2026, 3).teams_for(first)
+
+        override = NalivshikShiftOverride.objects.create(
+            date=first, day_team=self.teams[2], night_team=self.teams[3]
+        )
+        self.assertEqual(get_month_schedule(2026, 3).teams_for(first), (2, 3))
+
+        override.delete()
+        self.assertEqual(get_month_schedule(2026, 3).teams_for(first), auto)
+
+
+class NalivshikOverrideSaveTests(TestCase):
+    """Override va sikl davomi bitta upsert; faqat rejasi o'zgargan komandalar navbatga."""
+
+    def setUp(self):
+        self.teams = {code: Team.objects.create(code=code, name=f"{code}-komanda") for code in (1, 2, 3)}
+        self.nalivshiks = {
+            code: Employee.objects.create(
+                first_name=f"Nav{code}", last_name="Test", position="Nalivshik", role="nalivshik", team=team,
+            )
+            for code, team in self.teams.items()
+        }
+        User = get_user_model()
+        User.objects.create_user(username="schedule_admin", password="pass12345")
+        self.client = Client()
+        self.client.login(username="schedule_admin", password="pass12345")
+
+    def tearDown(self):
+        invalidate_month_schedule((2026, 3), (2026, 4))
+
+    def test_rotation_continues_past_month_end(self):
+        saved = save_nalivshik_override(
+            date(2026, 3, 30), day_team=self.teams[1], night_team=self.teams[2], until=date(2026, 4, 2),
+        )
+        self.assertEqual(saved, 4)
+        rows = list(
+            NalivshikShiftOverride.objects.order_by("date").values_list("date", "day_team__code", "night_team__code")
+        )
+        self.assertEqual(rows, [
+            (date(2026, 3, 30), 1, 2),
+            (date(2026, 3, 31), 3, 1),
+            (date(2026, 4, 1), 2, 3),
+            (date(2026, 4, 2), 1, 2),
+        ])
+        self.assertEqual(get_month_schedule(2026, 4).teams_for(date(2026, 4, 2)), (1, 2))
+
+        # Qayta saqlash mavjud yozuvlarni yangilaydi
+        save_nalivshik_override(date(2026, 3, 31), day_team=self.teams[2], night_team=self.teams[3], comment="almashuv")
+        self.assertEqual(NalivshikShiftOverride.objects.count(), 4)
+        override = NalivshikShiftOverride.objects.get(date=date(2026, 3, 31))
+        self.assertEqual((override.day_team.code, override.night_team.code, override.comment), (2, 3, "almashuv"))
+
+    def test_only_changed_teams_are_marked_dirty(self):
+        day = date(2026, 3, 10)
+        auto_day, auto_night = get_month_schedule(2026, 3).teams_for(day)
+        before = get_month_schedule(2026, 3).planned_days_by_team()
+
+        # Avtomatik jadval bilan bir xil override — reja o'zgarmaydi
+        save_nalivshik_override(day, day_team=self.teams[auto_day])
+        self.assertFalse(PayrollDirtyMonth.objects.exists())
+
+        save_nalivshik_override(day, day_team=self.teams[auto_night], night_team=self.teams[auto_night])
+        after = get_month_schedule(2026, 3).planned_days_by_team()
+        changed = {code for code in (1, 2, 3) if before.get(code, 0) != after.get(code, 0)}
+        self.assertTrue(changed)
+        self.assertEqual(
+            set(PayrollDirtyMonth.objects.values_list("employee_id", flat=True)),
+            {self.nalivshiks[code].id for code in changed},
+        )
+
+    def test_schedule_page_rejects_unbounded_until(self):
+        response = self.client.post(reverse("nalivshik_schedule") + "?month=2026-03", {
+            "date": "2026-03-28", "day_team": self.teams[1].id, "night_team": self.teams[2].id, "until": "2999-12-31",
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(NalivshikShiftOverride.objects.exists())
+        with self.assertRaises(ValueError):
+            save_nalivshik_override(
+                date(2026, 3, 28), day_team=self.teams[1], night_team=self.teams[2], until=date(2999, 12, 31),
+            )
+
+    def test_admin_override_edit_marks_planned_teams_dirty(self):
+        day = date(2026, 3, 10)
+        auto = set(DEFAULT_ROTATION.teams_for(day))
+        (other,) = {1, 2, 3} - auto
+
+        override = NalivshikShiftOverride.objects.create(
+            date=day, day_team=self.teams[other], night_team=self.teams[other],
+        )
+        self.assertEqual(
+            set(PayrollDirtyMonth.objects.values_list("employee_id", "year", "month")),
+            {(self.nalivshiks[code].id, 2026, 3) for code in (1, 2, 3)},
+        )
+
+        # Faqat izoh o'zgardi — reja o'zgarmaydi
+        PayrollDirtyMonth.objects.all().delete()
+        override.comment = "izoh"
+        override.save()
+        self.assertFalse(PayrollDirtyMonth.objects.exists())
+
+        override.delete()
+        self.assertEqual(PayrollDirtyMonth.objects.count(), 3)
+
+    def test_payroll_schedule_ignores_stale_process_cache(self):
+        from django.core.cache import cache
+
+        from blog.services import calculate_nalivshik_planned_days
+        from blog.shift_schedule import CACHE_KEY
+
+        expected = MonthSchedule.build(2026, 3).planned_days_for_team(2)
+        # Boshqa jarayon override qo'shgan, bu jarayonning cache'i esa eski
+        key = CACHE_KEY.format(rotation=DEFAULT_ROTATION.cache_token, year=2026, month=3)
+        cache.set(key, (((1, 3),) * 31, frozenset()))
+        self.assertEqual(get_month_schedule(2026, 3).planned_days_for_team(2), 0)
+
+        self.assertEqual(calculate_nalivshik_planned_days(2026, 3, self.nalivshiks[2]), expected)
+
+    def test_schedule_page_uses_one_override_query(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        url = reverse("nalivshik_schedule")
+        response = self.client.post(url + "?month=2026-03", {
+            "date": "2026-03-28", "day_team": self.teams[1].id, "night_team": self.teams[2].id, "until": "2026-04-03",
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(NalivshikShiftOverride.objects.filter(date=date(2026, 4, 3)).exists())
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url + "?month=2026-03")
+        self.assertEqual(response.status_code, 200)
+        override_queries = [q for q in ctx.captured_queries if "nalivshikshiftoverride" in q["sql"].lower()]
+        self.assertEqual(len(override_queries), 1)
+
+
+class GenerateNalivshikAttendanceRangeTests(TestCase):
+    def setUp(self):
+        self.teams = {code: Team.objects.create(code=code, name=f"{code}-komanda") for code in (1, 2, 3)}
+        self.employees = {
+            code: Employee.objects.create(
+                first_name=f"Nav{code}", last_name="Oraliq", position="Nalivshik", role="nalivshik", team=team,
+            )
+            for code, team in self.teams.items()
+        }
+
+    def tearDown(self):
+        invalidate_month_schedule((2026, 3), (2026, 4))
+
+    def test_range_matches_schedule_and_keeps_manual_rows(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        manual_day = date(2026, 3, 31)
+        manual_team = get_month_schedule(2026, 3).teams_for(manual_day)[0]
+        Attendance.objects.create(
+            employee=self.employees[manual_team], date=manual_day, status="sick", comment="Kasal",
+        )
+
+        with CaptureQueriesContext(connection) as ctx:
+            created = generate_nalivshik_attendance_for_range(date(2026, 3, 25), date(2026, 4, 5))
+        self.assertLess(len(ctx.captured_queries), 30)
+
+        expected = set()
+        for month in (3, 4):
+            for day, day_code, night_code in get_month_schedule(2026, month):
+                if date(2026, 3, 25) <= day <= date(2026, 4, 5):
+                    expected |= {(self.employees[code].id, day) for code in (day_code, night_code)}
+        self.assertEqual(created, len(expected) - 1)
+        self.assertEqual(set(Attendance.objects.values_list("employee_id", "date")), expected)
+        self.assertEqual(
+            Attendance.objects.get(employee=self.employees[manual_team], date=manual_day).status, "sick"
+        )
+
+        summary = MonthlyAttendanceSummary.objects.get(employee=self.employees[1], year=2026, month=4)
+        self.assertEqual(
+            summary.present,
+            Attendance.objects.filter(employee=self.employees[1], date__month=4, status="present").count(),
+        )
+        self.assertTrue(PayrollDirtyMonth.objects.filter(year=2026, month=4).exists())
+
+        # Qayta ishga tushirish hech narsa qo'shmaydi
+        self.assertEqual(generate_nalivshik_attendance_for_range(date(2026, 3, 25), date(2026, 4, 5)), 0)
+
+    def test_command(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command("generate_nalivshik_attendance", "--from", "2026-04-01", "--to", "2026-04-03", stdout=out)
+        # Har kuni ikki komanda ishlaydi
+        self.assertEqual(Attendance.objects.count(), 6)
+        self.assertIn("6 ta", out.getvalue())
+
+
+class ShiftRotationTests(TestCase):
+    """Aylanish qoidasi bazadan o'qiladi va butun sonli arifmetikaga o'giriladi."""
+
+    def tearDown(self):
+        invalidate_shift_rotation()
+        invalidate_month_schedule((2026, 1))
+
+    def test_default_rotation_keeps_original_cycle(self):
+        from datetime import datetime
+
+        self.assertEqual(DEFAULT_ROTATION.teams_for(date(2026, 1, 1)), (1, 2))
+        self.assertEqual(DEFAULT_ROTATION.teams_for(date(2026, 1, 2)), (3, 1))
+        self.assertEqual(DEFAULT_ROTATION.teams_for(date(2026, 1, 3)), (2, 3))
+        self.assertEqual(DEFAULT_ROTATION.teams_for(date(2025, 12, 31)), (2, 3))
+        self.assertEqual(get_nalivshik_team_for_datetime(datetime(2026, 1, 1, 22, 30)), 2)
+        self.assertEqual(get_nalivshik_team_for_datetime(datetime(2026, 1, 2, 3, 0)), 3)
+
+        schedule = DEFAULT_ROTATION.year_schedule(2026)
+        self.assertEqual(len(schedule), 365)
+        self.assertEqual(schedule[40], DEFAULT_ROTATION.teams_for(date(2026, 2, 10)))
+
+    def test_database_rotation_drives_schedule(self):
+        ShiftRotation.objects.create(
+            anchor_date=date(2026, 1, 1), anchor_hour=9, shift_hours=24, team_order="2,1,3", day_start_hour=8,
+        )
+        # 24 soatlik smena: 08:00 da boshlangan kun oldingi smenaga tegishli
+        self.assertEqual(get_month_schedule(2026, 1).teams_for(date(2026, 1, 1)), (3, 2))
+        self.assertEqual(get_month_schedule(2026, 1).teams_for(date(2026, 1, 2)), (2, 1))
+        self.assertEqual(get_nalivshik_team_for_datetime(date(2026, 1, 2)), 1)
+
+        rotation = CompiledRotation(date(2026, 1, 1), shift_hours=8, team_order=(1, 2, 3))
+        self.assertEqual(
+            rotation.teams_for_range(date(2026, 1, 1), 3),
+            [rotation.teams_for(date(2026, 1, day)) for day in (1, 2, 3)],
+        )
+
+    def test_rotation_change_marks_nalivshiks_dirty_and_payroll_reads_db(self):
+        from django.core.cache import cache
+
+        from blog.services import calculate_nalivshik_planned_days
+        from blog.shift_schedule import ROTATION_CACHE_KEY
+
+        team = Team.objects.create(code=1, name="1-komanda")
+        nalivshik = Employee.objects.create(
+            first_name="Nav", last_name="Sikl", position="Nalivshik", role="nalivshik", team=team,
+        )
+        calculate_monthly_stats(2026, 1, employee=nalivshik)
+        PayrollDirtyMonth.objects.all().delete()
+
+        ShiftRotation.objects.create(
+            anchor_date=date(2026, 1, 1), anchor_hour=9, shift_hours=24, team_order="2,1,3", day_start_hour=8,
+        )
+        self.assertTrue(PayrollDirtyMonth.objects.filter(employee=nalivshik, year=2026, month=1).exists())
+
+        # Boshqa jarayon cache'ida hali eski qoida
+        cache.set(ROTATION_CACHE_KEY, DEFAULT_ROTATION.as_tuple())
+        self.assertEqual(MonthSchedule.build(2026, 1).teams_for(date(2026, 1, 1)), (3, 2))
+        self.assertEqual(
+            calculate_nalivshik_planned_days(2026, 1, nalivshik),
+            MonthSchedule.build(2026, 1).planned_days_for_team(1),
+        )
+        self.assertNotEqual(
+            calculate_nalivshik_planned_days(2026, 1, nalivshik),
+            MonthSchedule.from_overrides(2026, 1, {}, rotation=DEFAULT_ROTATION).planned_days_for_team(1),
+        )
+
+
+class AttendanceExportTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        User.objects.create_user(username="export_admin", password="pass12345")
+        self.client = Client()
+        self.client.login(username="export_admin", password="pass12345")
+        self.emp = Employee.objects.create(
+            first_name="Eksport", last_name="Xodim", position="Op", department="Sex", employee_type="full",
+        )
+
+    def test_export_streams_write_only_workbook(self):
+        import io
+
+        import openpyxl
+
+        Attendance.objects.create(employee=self.emp, date=date(2026, 5, 4), status="late", comment="10 daqiqa")
+        Attendance.objects.create(employee=self.emp, date=date(2026, 5, 5), status="present")
+        Attendance.objects.create(employee=self.emp, date=date(2026, 6, 1), status="present")
+
+        response = self.client.post(reverse("attendance_export"), {
+            "date_from": "2026-05-01", "date_to": "2026-05-31", "department": "Sex", "status": "",
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('filename="attendance.xlsx"', response["Content-Disposition"])
+
+        sheet = openpyxl.load_workbook(io.BytesIO(b"".join(response.streaming_content))).active
+        rows = list(sheet.iter_rows(values_only=True))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1][0].date(), date(2026, 5, 5))
+        self.assertEqual(rows[2][1:], ("Xodim", "Eksport", "Op", "Sex", "Kechikdi", "10 daqiqa"))
+
+
+    def _csv_rows(self, response):
+        import csv
+
+        return list(csv.reader(b"".join(response.streaming_content).decode("utf-8-sig").splitlines()))
+
+    def test_attendance_export_csv_and_gzip(self):
+        import gzip
+
+        Attendance.objects.create(employee=self.emp, date=date(2026, 5, 4), status="late", comment="10 daqiqa")
+        data = {"date_from": "2026-05-01", "date_to": "2026-05-31", "department": "", "status": ""}
+
+        response = self.client.post(reverse("attendance_export"), {**data, "format": "csv"})
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn('filename="attendance.csv"', response["Content-Disposition"])
+        self.assertEqual(self._csv_rows(response)[1], ["2026-05-04", "Xodim", "Eksport", "Op", "Sex", "Kechikdi", "10 daqiqa"])
+
+        response = self.client.post(reverse("attendance_export"), {**data, "format": "csv.gz"})
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        text = gzip.decompress(b"".join(response.streaming_content)).decode("utf-8-sig")
+        self.assertEqual(text.splitlines()[1], "2026-05-04,Xodim,Eksport,Op,Sex,Kechikdi,10 daqiqa")
+
+    def test_list_exports_have_csv_fast_path(self):
+        stat = MonthlyEmployeeStat.objects.create(employee=self.emp, year=2026, month=5, salary=Decimal("3000000"))
+        SalaryPayment.objects.create(stat=stat, amount=Decimal("1000000"), paid_at=date(2026, 5, 20), note="avans")
+
+        employees = self._csv_rows(self.client.get(reverse("employee_list_export"), {"format": "csv"}))
+        self.assertEqual(employees[1][:3], ["1", "Xodim", "Eksport"])
+
+        payments = self._csv_rows(
+            self.client.get(reverse("salary_payment_history_export"), {"format": "csv", "year": 2026})
+        )
+        self.assertEqual(payments[1][1:4], ["2026-05-20", "Xodim", "Eksport"])
+        self.assertEqual(payments[1][8:11], ["1000000.00", "UZS", "avans"])
+
+        salary = self._csv_rows(
+            self.client.get(reverse("salary_statistics_export"), {"format": "csv", "year": 2026, "month": 5})
+        )
+        self.assertEqual(len(salary), 2)
+        self.assertEqual(salary[1][:2], [str(self.emp.pk), "Xodim Eksport"])
+
+        quota = self._csv_rows(self.client.get(reverse("absence_quota_export"), {"format": "csv", "year": 2026}))
+        self.assertEqual(len(quota[0]), 12)
+        self.assertEqual(quota[1][:4], ["1", "Xodim", "Eksport", "Op"])
+
+
+class SalaryExportCacheTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        User.objects.create_user(username="cache_admin", password="pass12345")
+        self.client = Client()
+        self.client.login(username="cache_admin", password="pass12345")
+        self.emp = Employee.objects.create(
+            first_name="Kesh", last_name="Xodim", position="Op", employee_type="full", is_active=True,
+        )
+        self.cache_dir = tempfile.mkdtemp()
+        self.url = reverse("salary_statistics_export")
+
+    def _download(self):
+        with override_settings(EXPORT_CACHE_DIR=self.cache_dir):
+            response = self.client.get(self.url, {"year": 2026, "month": 5})
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def test_repeat_download_uses_stored_stats_and_disk_cache(self):
+        from unittest import mock
+
+        first = self._download()
+        calculated_at = MonthlyEmployeeStat.objects.get(employee=self.emp, year=2026, month=5).calculated_at
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        # Ma'lumot o'zgarmagan: qayta hisoblash ham, workbook qurish ham yo'q
+        with mock.patch("openpyxl.Workbook", side_effect=AssertionError("workbook qayta qurildi")):
+            self.assertEqual(self._download(), first)
+        self.assertEqual(
+            MonthlyEmployeeStat.objects.get(employee=self.emp, year=2026, month=5).calculated_at, calculated_at,
+        )
+
+        # Davomat o'zgarsa kalit navbatga tushadi, stat yangilanadi va yangi fayl quriladi
+        Attendance.objects.create(employee=self.emp, date=date(2026, 5, 4), status="present")
+        self._download()
+        self.assertGreater(
+            MonthlyEmployeeStat.objects.get(employee=self.emp, year=2026, month=5).calculated_at, calculated_at,
+        )
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_employee_edit_recalculates_stat(self):
+        from blog.services import mark_stale_employee_stats
+
+        self._download()
+        calculated_at = MonthlyEmployeeStat.objects.get(employee=self.emp, year=2026, month=5).calculated_at
+
+        # Xodim kartochkasi o'zgardi — navbatga hech narsa yozilmaydi, lekin stat eskirgan
+        self.emp.employee_type = "office"
+        self.emp.save()
+        self.assertFalse(PayrollDirtyMonth.objects.exists())
+
+        self._download()
+        stat = MonthlyEmployeeStat.objects.get(employee=self.emp, year=2026, month=5)
+        self.assertGreater(stat.calculated_at, calculated_at)
+        self.assertGreaterEqual(stat.calculated_at, Employee.objects.get(pk=self.emp.pk).updated_at)
+
+        # Noaktiv xodim hisoblanmaydi — uning stati navbatga ham qo'yilmaydi
+        self.emp.is_active = False
+        self.emp.save()
+        mark_stale_employee_stats(2026, 5)
+        self.assertFalse(PayrollDirtyMonth.objects.exists())
+
+    def test_workbook_layout_and_shared_styles(self):
+        import io
+        import openpyxl
+
+        usd = Employee.objects.create(
+            first_name="Dollar", last_name="Xodim", position="Op", employee_type="office", is_active=True,
+        )
+        MonthlyEmployeeStat.objects.create(
+            employee=usd, year=2026, month=5, salary=Decimal("100"), currency="usd",
+        )
+        wb = openpyxl.load_workbook(io.BytesIO(self._download()))
+        ws = wb.active
+        self.assertIn("A1:L2", {str(cell_range) for cell_range in ws.merged_cells.ranges})
+        self.assertIn("C3:D3", {str(cell_range) for cell_range in ws.merged_cells.ranges})
+        self.assertEqual(ws.freeze_panes, "A5")
+
+        rows = {row[1].value: row for row in ws.iter_rows(min_row=5) if row[1].value}
+        usd_row = rows["Xodim Dollar — Op"]
+        self.assertEqual((usd_row[2].value, usd_row[3].value), (1200000, 100))
+        self.assertEqual(usd_row[3].number_format, '"$" #,##0.00')
+        # Stillar workbook'da bir martadan — kataklar ularga nomi bilan murojaat qiladi
+        names = [style.name for style in wb._named_styles]
+        self.assertEqual(len(names), len(set(names)))
+        self.assertIn("salary-money", names)
+        self.assertEqual(rows["JAMI"][1].style, "salary-total-label")
+
+
+class EmployeeResolverTests(TestCase):
+    def setUp(self):
+        self.gayrat = Employee.objects.create(
+            first_name="G‘ayrat", last_name="Oʻrinov", position="Op", phone_number="+998901112233",
+        )
+        self.ali = Employee.objects.create(first_name="Ali", last_name="Vali", position="Op")
+        self.ali_sobirovich = Employee.objects.create(
+            first_name="Ali", last_name="Vali", middle_name="Sobirovich", position="Op",
+        )
+
+    def test_name_variants_phone_and_id(self):
+        resolver = EmployeeResolver.load()
+        with self.assertNumQueries(0):
+            self.assertEqual(resolver.resolve(last_name="O'RINOV", first_name=" g`ayrat ").pk, self.gayrat.pk)
+            self.assertEqual(resolver.resolve(phone="90 111 22 33").pk, self.gayrat.pk)
+            self.assertEqual(resolver.resolve(employee_id=float(self.ali.pk)).pk, self.ali.pk)
+            self.assertEqual(resolver.resolve_label("Vali Ali Sobirovich").pk, self.ali_sobirovich.pk)
+
+    def test_namesakes_are_reported_as_ambiguous(self):
+        resolver = EmployeeResolver.load()
+        with self.assertRaises(EmployeeLookupError) as ctx:
+            resolver.resolve(last_name="Vali", first_name="Ali")
+        self.assertTrue(ctx.exception.is_ambiguous)
+        self.assertEqual(
+            str(ctx.exception), f"Bir nechta xodim mos keldi (Vali Ali): id {self.ali.pk}, {self.ali_sobirovich.pk}",
+        )
+        with self.assertRaisesMessage(EmployeeLookupError, "Xodim topilmadi (id 999)"):
+            resolver.resolve(employee_id="999")
+
+    def test_admin_resource_uses_resolver(self):
+        import tablib
+
+        from blog.resources import AttendanceResource
+
+        dataset = tablib.Dataset(headers=["employee", "date", "status", "comment"])
+        dataset.append(["o‘rinov g‘ayrat", "2026-05-04", "present", ""])
+        dataset.append(["Vali Ali Sobirovich", "2026-05-04", "late", ""])
+        result = AttendanceResource().import_data(dataset, dry_run=False)
+
+        self.assertFalse(result.has_errors())
+        self.assertEqual(
+            set(Attendance.objects.values_list("employee_id", "status")),
+            {(self.gayrat.pk, "present"), (self.ali_sobirovich.pk, "late")},
+        )
+
+    def test_admin_resource_export_round_trips_by_id(self):
+        from blog.resources import AttendanceResource
+
+        Attendance.objects.create(employee=self.ali, date=date(2026, 5, 4), status="present")
+        exported = AttendanceResource().export()
+        self.assertIn("id", exported.headers)
+        self.assertEqual(exported.dict[0]["employee"], self.ali.pk)
+
+        # Adashlar bor (Vali Ali) — lekin id bo'yicha aniq topiladi
+        column = exported.headers.index("status")
+        exported[0] = tuple("late" if index == column else value for index, value in enumerate(exported[0]))
+        result = AttendanceResource().import_data(exported, dry_run=False)
+        self.assertFalse(result.has_errors())
+        self.assertEqual(Attendance.objects.get(employee=self.ali, date=date(2026, 5, 4)).status, "late")
+
+    def test_import_rejects_namesakes_and_accepts_phone_column(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        csv_content = (
+            "employee_id,phone_number,last_name,first_name,date,status\n"
+            ",,Vali,Ali,2026-05-04,present\n"
+            ",901112233,,,2026-05-04,present\n"
+            f"{self.ali.pk},,,,2026-05-04,late\n"
+        )
+        errors = []
+        count, error_count, _changed, _keys = import_attendance_file(
+            SimpleUploadedFile("ids.csv", csv_content.encode()), on_errors=errors.extend,
+        )
+        self.assertEqual((count, error_count), (2, 1))
+        self.assertEqual(errors[0].column, "last_name")
+        self.assertIn("Bir nechta xodim mos keldi", errors[0].message)
+        self.assertEqual(Attendance.objects.get(employee=self.ali).status, "late")
+
+
+class StreamingAttendanceImportTests(TestCase):
+    def setUp(self):
+        self.emp = Employee.objects.create(first_name="Oqim", last_name="Import", position="Op", employee_type="full")
+        self.other = Employee.objects.create(first_name="Ikki", last_name="Import", position="Op", employee_type="full")
+
+    def _upload(self, name, content):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        return SimpleUploadedFile(name, content)
+
+    def test_csv_upserts_in_chunks_and_reports_rows(self):
+        Attendance.objects.create(employee=self.emp, date=date(2026, 5, 4), status="absent")
+        csv_content = (
+            "last_name,first_name,date,status,comment\n"
+            "Import,Oqim,2026-05-04,present,tuzatildi\n"
+            "Import,Ikki,2026-05-04,late,\n"
+            "Yoq,Xodim,2026-05-04,present,\n"
+            "Import,Oqim,04.05.2026,present,\n"
+            "Import,Ikki,2026-05-05,present,\n"
+            "Import,Ikki,2026-05-05,sick,oxirgisi\n"
+        )
+        errors = []
+        count, error_count, changed_count, _keys = import_attendance_file(
+            self._upload("turnstile.csv", csv_content.encode()), chunk_size=2, on_errors=errors.extend,
+        )
+
+        self.assertEqual((count, error_count, changed_count), (4, 2, 3))
+        self.assertEqual([str(error) for error in errors], [
+            "4-satr: Xodim topilmadi (Yoq Xodim)",
+            "5-satr: Sana formati noto'g'ri (04.05.2026)",
+        ])
+        updated = Attendance.objects.get(employee=self.emp, date=date(2026, 5, 4))
+        self.assertEqual((updated.status, updated.comment), ("present", "tuzatildi"))
+        self.assertEqual(Attendance.objects.get(employee=self.other, date=date(2026, 5, 5)).status, "sick")
+
+        summary = MonthlyAttendanceSummary.objects.get(employee=self.other, year=2026, month=5)
+        self.assertEqual((summary.late, summary.sick), (1, 1))
+        self.assertTrue(PayrollDirtyMonth.objects.filter(employee=self.emp, year=2026, month=5).exists())
+
+    def test_xlsx_read_only_with_date_cells(self):
+        import io
+        from datetime import datetime
+
+        import openpyxl
+
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.append(["last_name", "first_name", "date", "status", "comment"])
+        ws.append(["Import", "Oqim", datetime(2026, 5, 6), "Keldi", None])
+        ws.append([None, None, None, None, None])
+        ws.append(["Import", "Ikki", "2026-05-06", "BOGUS", None])
+        buffer = io.BytesIO()
+        wb.save(buffer)
+
+        errors = []
+        count, _error_count, _changed, _keys = import_attendance_file(
+            self._upload("dump.xlsx", buffer.getvalue()), on_errors=errors.extend,
+        )
+        self.assertEqual(count, 1)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual((errors[0].row_number, errors[0].column, errors[0].value), (4, "status", "BOGUS"))
+        self.assertTrue(str(errors[0]).startswith("4-satr: Noto'g'ri status"))
+        att = Attendance.objects.get(employee=self.emp, date=date(2026, 5, 6))
+        self.assertEqual((att.status, att.comment), ("present", ""))
+
+    def test_restricted_days_only_for_nalivshik(self):
+        DayOff.objects.create(date=date(2026, 5, 9), reason="Xotira kuni")
+        Employee.objects.create(first_name="Nav", last_name="Import", position="Nalivshik", role="nalivshik")
+        csv_content = (
+            "last_name,first_name,date,status,comment\n"
+            "Import,Oqim,2026-05-10,present,\n"
+            "Import,Oqim,2026-05-09,present,\n"
+            "Import,Nav,2026-05-10,present,\n"
+        )
+        errors = []
+        count, _error_count, _changed, _keys = import_attendance_file(
+            self._upload("r.csv", csv_content.encode()), on_errors=errors.extend,
+        )
+        self.assertEqual(count, 1)
+        self.assertEqual([error.row_number for error in errors], [2, 3])
+        self.assertIn("Yakshanba", errors[0].message)
+        self.assertIn("Xotira kuni", errors[1].message)
+        self.assertTrue(Attendance.objects.filter(employee__role="nalivshik", date=date(2026, 5, 10)).exists())
+
+    def test_unchanged_rows_are_not_rewritten(self):
+        Attendance.objects.create(employee=self.emp, date=date(2026, 5, 4), status="present", comment=None)
+        Attendance.objects.create(employee=self.emp, date=date(2026, 4, 6), status="present")
+        csv_content = (
+            "last_name,first_name,date,status,comment\n"
+            "Import,Oqim,2026-05-04,present,\n"
+            "Import,Oqim,2026-04-06,late,\n"
+        )
+        PayrollDirtyMonth.objects.all().delete()
+        count, _error_count, changed_count, _keys = import_attendance_file(self._upload("same.csv", csv_content.encode()))
+        self.assertEqual((count, changed_count), (2, 1))
+        self.assertEqual(Attendance.objects.get(employee=self.emp, date=date(2026, 4, 6)).status, "late")
+        # Faqat o'zgargan oy qayta hisoblash navbatida
+        self.assertEqual(
+            list(PayrollDirtyMonth.objects.values_list("employee_id", "year", "month")), [(self.emp.id, 2026, 4)]
+        )
+
+    def test_missing_columns_fail_whole_file(self):
+        with self.assertRaisesMessage(ValueError, "Faylda ustunlar yo'q: status"):
+            import_attendance_file(self._upload("bad.csv", b"last_name,first_name,date\nImport,Oqim,2026-05-04\n"))
+
+
+@override_settings(ATTENDANCE_IMPORT_MODE="queue", MEDIA_ROOT=IMPORT_MEDIA_ROOT)
+class AttendanceImportJobTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        User.objects.create_user(username="job_admin", password="pass12345")
+        self.client = Client()
+        self.client.login(username="job_admin", password="pass12345")
+        self.emp = Employee.objects.create(first_name="Fon", last_name="Import", position="Op", employee_type="full")
+
+    def _post(self, content):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        return self.client.post(reverse("attendance_import"), {"file": SimpleUploadedFile("job.csv", content.encode())})
+
+    def test_upload_is_queued_and_processed_by_worker(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        response = self._post(
+            "last_name,first_name,date,status,comment\n"
+            "Import,Fon,2026-05-04,present,\n"
+            "Import,Fon,2026-05-05,absent,\n"
+            "Import,Yoq,2026-05-05,absent,\n"
+        )
+        job = AttendanceImportLog.objects.get()
+        self.assertRedirects(response, f"{reverse('attendance_import')}?job={job.pk}")
+        self.assertEqual(job.status, AttendanceImportLog.STATUS_QUEUED)
+        self.assertFalse(Attendance.objects.exists())
+
+        progress_url = reverse("attendance_import_progress", args=[job.pk])
+        self.assertEqual(self.client.get(progress_url).json()["status"], "queued")
+
+        call_command("process_attendance_imports", stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, AttendanceImportLog.STATUS_DONE)
+        self.assertEqual((job.processed_rows, job.record_count, job.error_count), (3, 2, 1))
+        self.assertFalse(job.success)
+        self.assertIn("Xodim topilmadi", job.log)
+        self.assertEqual(Attendance.objects.filter(employee=self.emp).count(), 2)
+        # Oyliklar vazifa oxirida bir marta qayta hisoblangan
+        self.assertFalse(PayrollDirtyMonth.objects.exists())
+        self.assertEqual(MonthlyEmployeeStat.objects.get(employee=self.emp, year=2026, month=5).worked_days, 1)
+
+        data = self.client.get(progress_url).json()
+        self.assertTrue(data["finished"])
+        self.assertEqual(data["record_count"], 2)
+        self.assertEqual(self.client.get(f"{reverse('attendance_import')}?job={job.pk}").status_code, 200)
+
+        # Qayta ishga tushirish bajarilgan vazifani takrorlamaydi
+        self.assertEqual(process_queued_imports(), 0)
+
+    def test_job_recalculates_only_its_own_keys(self):
+        from unittest import mock
+
+        other = Employee.objects.create(first_name="Boshqa", last_name="Xodim", position="Op", employee_type="full")
+        PayrollDirtyMonth.objects.create(employee=other, year=2026, month=4)
+
+        self._post("last_name,first_name,date,status,comment\nImport,Fon,2026-05-04,present,\n")
+        process_queued_imports()
+        job = AttendanceImportLog.objects.get()
+        self.assertEqual(job.status, AttendanceImportLog.STATUS_DONE)
+        # Boshqa foydalanuvchi navbatga qo'ygan kalit tegilmagan
+        self.assertEqual(
+            set(PayrollDirtyMonth.objects.values_list("employee_id", "year", "month")), {(other.pk, 2026, 4)},
+        )
+
+        # Qayta hisoblash xatosi importni FAILED qilmaydi, kalit navbatda qoladi
+        self._post("last_name,first_name,date,status,comment\nImport,Fon,2026-05-05,present,\n")
+        with mock.patch("blog.services.calculate_monthly_stats", side_effect=RuntimeError("hisob buzildi")):
+            process_queued_imports()
+        job = AttendanceImportLog.objects.latest("pk")
+        self.assertEqual(job.status, AttendanceImportLog.STATUS_DONE)
+        self.assertIn("hisob buzildi", job.log)
+        self.assertEqual(Attendance.objects.filter(employee=self.emp).count(), 2)
+        self.assertTrue(PayrollDirtyMonth.objects.filter(employee=self.emp, year=2026, month=5).exists())
+
+    def test_stale_processing_job_is_requeued(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        self._post("last_name,first_name,date,status,comment\nImport,Fon,2026-05-04,present,\n")
+        job = AttendanceImportLog.objects.get()
+        # Worker import o'rtasida to'xtagan
+        AttendanceImportLog.objects.filter(pk=job.pk).update(
+            status=AttendanceImportLog.STATUS_PROCESSING, started_at=timezone.now() - timedelta(minutes=5),
+        )
+        self.assertEqual(process_queued_imports(), 0)
+
+        AttendanceImportLog.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(process_queued_imports(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, AttendanceImportLog.STATUS_DONE)
+        self.assertEqual(Attendance.objects.filter(employee=self.emp).count(), 1)
+
+    @override_settings(ATTENDANCE_IMPORT_MODE="thread")
+    def test_thread_mode_starts_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self._post("last_name,first_name,date,status,comment\nImport,Fon,2026-05-04,present,\n")
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(AttendanceImportLog.objects.get().status, AttendanceImportLog.STATUS_QUEUED)
+
+    def test_errors_are_stored_and_downloadable(self):
+        import io
+
+        import openpyxl
+
+        from blog.attendance_import import IMPORT_LOG_ERROR_LIMIT
+
+        bad_rows = "".join(f"Import,Fon,2026-05-{day:02d},BOGUS,\n" for day in range(1, 29))
+        self._post("last_name,first_name,date,status,comment\n" + bad_rows)
+        process_queued_imports()
+        job = AttendanceImportLog.objects.get()
+        self.assertEqual(job.error_count, 28)
+        self.assertEqual(job.errors.count(), 28)
+        self.assertEqual(job.log.count("Noto'g'ri status"), IMPORT_LOG_ERROR_LIMIT)
+        self.assertIn("jami 28 ta xatolik", job.log)
+
+        url = reverse("attendance_import_errors", args=[job.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        lines = b"".join(response.streaming_content).decode("utf-8-sig").splitlines()
+        self.assertEqual(len(lines), 29)
+        self.assertTrue(lines[1].startswith('2,status,BOGUS,"Noto\'g\'ri status'))
+
+        response = self.client.get(url + "?format=xlsx")
+        ws = openpyxl.load_workbook(io.BytesIO(b"".join(response.streaming_content))).active
+        self.assertEqual(ws.max_row, 29)
+        self.assertEqual(ws.cell(row=2, column=3).value, "BOGUS")
+
+    def test_identical_file_is_detected_by_hash(self):
+        content = "last_name,first_name,date,status,comment\nImport,Fon,2026-05-04,present,\n"
+        self._post(content)
+        process_queued_imports()
+        first = AttendanceImportLog.objects.get()
+        self.assertEqual(len(first.content_hash), 64)
+        self.assertEqual(first.changed_count, 1)
+
+        response = self._post(content)
+        self.assertRedirects(response, f"{reverse('attendance_import')}?job={first.pk}", fetch_redirect_response=False)
+        self.assertEqual(AttendanceImportLog.objects.count(), 1)
+
+        # Majburiy qayta import: yangi vazifa, lekin bazada hech narsa o'zgarmaydi
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        self.client.post(
+            reverse("attendance_import"), {"file": SimpleUploadedFile("job.csv", content.encode()), "force": "on"},
+        )
+        process_queued_imports()
+        second = AttendanceImportLog.objects.latest("pk")
+        self.assertNotEqual(second.pk, first.pk)
+        self.assertEqual((second.record_count, second.changed_count), (1, 0))
+
+    def test_stuck_job_is_not_a_duplicate(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from blog.attendance_import import find_duplicate_import
+
+        content = "last_name,first_name,date,status,comment\nImport,Fon,2026-05-04,present,\n"
+        self._post(content)
+        job = AttendanceImportLog.objects.get()
+        self.assertEqual(find_duplicate_import(job.content_hash), job)
+
+        AttendanceImportLog.objects.filter(pk=job.pk).update(
+            status=AttendanceImportLog.STATUS_PROCESSING, started_at=timezone.now() - timedelta(hours=2),
+        )
+        self.assertIsNone(find_duplicate_import(job.content_hash))
+        self._post(content)
+        self.assertEqual(AttendanceImportLog.objects.count(), 2)
+
+    def test_broken_file_marks_job_failed(self):
+        self._post("last_name,first_name\nImport,Fon\n")
+        process_queued_imports()
+        job = AttendanceImportLog.objects.get()
+        self.assertEqual(job.status, AttendanceImportLog.STATUS_FAILED)
+        self.assertIn("Faylda ustunlar yo'q", job.log)
+
+
+@override_settings(EXPORT_JOB_MODE="queue", MEDIA_ROOT=IMPORT_MEDIA_ROOT)
+class ExportJobTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        User.objects.create_user(username="export_admin", password="pass12345")
+        self.client = Client()
+        self.client.login(username="export_admin", password="pass12345")
+        Employee.objects.create(first_name="Fon", last_name="Eksport", position="Op", employee_type="full")
+        Employee.objects.create(first_name="Ikkinchi", last_name="Eksport", position="Op", employee_type="full")
+
+    def test_background_export_is_stored_and_listed(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        from blog.models import ExportJob
+
+        url = reverse("employee_list_export")
+        response = self.client.get(url, {"background": "1", "format": "csv", "q": "Eksport"})
+        job = ExportJob.objects.get()
+        self.assertRedirects(response, f"{reverse('export_jobs')}?job={job.pk}")
+        self.assertEqual((job.kind, job.status), ("employees", ExportJob.STATUS_QUEUED))
+        self.assertEqual(job.params, {"format": "csv", "q": "Eksport"})
+
+        call_command("process_export_jobs", stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.STATUS_DONE)
+        self.assertTrue(job.file.name.startswith("exports/"))
+        self.assertEqual(job.file_name, f"ISOMER_OIL_Xodimlar_{date.today():%Y%m%d}.csv")
+        self.assertEqual(job.row_count, 2)
+        self.assertEqual(job.file_size, job.file.size)
+        self.assertIsNotNone(job.duration)
+
+        page = self.client.get(reverse("export_jobs"))
+        self.assertContains(page, reverse("export_job_download", args=[job.pk]))
+        download = self.client.get(reverse("export_job_download", args=[job.pk]))
+        lines = b"".join(download.streaming_content).decode("utf-8-sig").splitlines()
+        self.assertEqual(len(lines), 3)
+
+        # Bir xil parametrlar — mavjud fayl, yangi vazifa yo'q; force bilan qayta quriladi
+        self.client.get(url, {"background": "1", "q": "Eksport", "format": "csv"})
+        self.assertEqual(ExportJob.objects.count(), 1)
+        self.client.get(url, {"background": "1", "format": "csv", "q": "Eksport", "force": "1"})
+        self.assertEqual(ExportJob.objects.count(), 2)
+
+    def test_stale_jobs_are_requeued_and_old_artifacts_pruned(self):
+        import time
+        from datetime import timedelta
+
+        from django.core.files.base import ContentFile
+        from django.utils import timezone
+
+        from blog.export_jobs import process_queued_exports, prune_export_jobs
+        from blog.models import ExportJob
+
+        url = reverse("employee_list_export")
+        params = {"background": "1", "format": "csv", "q": "Eksport"}
+        with override_settings(MEDIA_ROOT=tempfile.mkdtemp()):
+            self.client.get(url, params)
+            stuck = ExportJob.objects.get()
+            # Worker fayl yozish o'rtasida to'xtagan — bunday vazifa qayta ishlatilmaydi
+            ExportJob.objects.filter(pk=stuck.pk).update(
+                status=ExportJob.STATUS_PROCESSING, started_at=timezone.now() - timedelta(hours=2),
+            )
+            self.client.get(url, params)
+            self.assertEqual(ExportJob.objects.count(), 2)
+
+            self.assertEqual(process_queued_exports(), 2)
+            self.assertEqual(
+                set(ExportJob.objects.values_list("status", flat=True)), {ExportJob.STATUS_DONE}
+            )
+
+            old, fresh = ExportJob.objects.order_by("pk")
+            ExportJob.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=30))
+            storage = old.file.storage
+            orphan = storage.save("exports/2020/01/orphan.csv", ContentFile(b"x"))
+            expired = time.time() - 30 * 24 * 3600
+            os.utime(storage.path(orphan), (expired, expired))
+
+            self.assertEqual(prune_export_jobs(), 1)
+            self.assertFalse(ExportJob.objects.filter(pk=old.pk).exists())
+            self.assertFalse(storage.exists(old.file.name))
+            self.assertFalse(storage.exists(orphan))
+            self.assertTrue(storage.exists(fresh.file.name))
+
+    @override_settings(EXPORT_JOB_MODE="sync")
+    def test_post_export_and_failures(self):
+        from blog.export_jobs import enqueue_export
+        from blog.models import ExportJob
+
+        self.client.post(reverse("attendance_export"), {
+            "date_from": "2026-05-01", "date_to": "2026-05-31", "department": "", "status": "", "background": "1",
+        })
+        job = ExportJob.objects.get(kind="attendance")
+        self.assertEqual(job.status, ExportJob.STATUS_DONE)
+        self.assertEqual((job.file_name, job.row_count), ("attendance.xlsx", 0))
+        self.assertNotIn("background", job.params)
+
+        # Egasiz vazifa bajarilmaydi
+        failed, created = enqueue_export("absence_quota", {"year": "2026"})
+        self.assertTrue(created)
+        self.assertEqual(failed.status, ExportJob.STATUS_FAILED)
+        self.assertIn("Eksport egasi topilmadi", failed.log)
+        self.assertEqual(self.client.get(reverse("export_job_download", args=[failed.pk])).status_code, 404)
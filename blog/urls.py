@@ -17,7 +17,11 @@ urlpatterns = [
     path('attendance/<int:pk>/delete/', views.attendance_delete, name='attendance_delete'),
 
     path('attendance/import/', views.attendance_import, name='attendance_import'),
+    path('attendance/import/<int:pk>/progress/', views.attendance_import_progress, name='attendance_import_progress'),
+    path('attendance/import/<int:pk>/errors/', views.attendance_import_errors, name='attendance_import_errors'),
     path('attendance/export/', views.attendance_export, name='attendance_export'),
+    path('exports/', views.export_jobs, name='export_jobs'),
+    path('exports/<int:pk>/download/', views.export_job_download, name='export_job_download'),
     path('attendance/individual/', views.individual_attendance_create, name='select_employee_attendance'),
     path('attendance/individual/<int:employee_id>/', views.individual_attendance_create, name='individual_attendance_create'),
 
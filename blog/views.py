@@ -5,12 +5,13 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib import messages
 from collections import defaultdict
+from operator import itemgetter
 
-from django.db.models import Q, Count, F, Max
+from django.db.models import Q, Count, F, Max, Sum
 from django.utils import timezone
 from datetime import timedelta, date
 from urllib.parse import quote, urlencode
-from .models import Employee, Attendance, DayOff, AttendanceImportLog, MonthlyEmployeeStat, Team, NalivshikShiftOverride, MonthlyProduction, SalaryPayment
+from .models import Employee, Attendance, DayOff, AttendanceImportLog, ExportJob, MonthlyEmployeeStat, Team, NalivshikShiftOverride, SalaryPayment
 from .forms import (
     EmployeeForm,
     EmployeeCreateForm,
@@ -24,28 +25,23 @@ from .forms import (
 from django.forms import modelformset_factory
 from django.db import transaction
 
-import pandas as pd
-import openpyxl
-from django.http import HttpResponse
 from .services import (
     calculate_monthly_stats,
     calculate_working_days_in_month,
     employee_can_attend_on_date,
-    get_absence_quota_for_period,
+    get_absence_quota_map,
+    get_attendance_summary_map,
     get_bulk_attendance_employees,
-    get_nalivshik_teams_for_date,
     get_restricted_day_reason,
     is_restricted_attendance_date,
-    normalize_attendance_status,
-    sync_monthly_stats_for_date,
-    sync_monthly_stats_for_month,
+    recalculate_dirty_stats,
     YEARLY_ABSENCE_FREE_LIMIT,
+    save_nalivshik_override,
     save_production_bonus_settings,
     clear_production_bonus_for_month,
     remove_production_bonus_for_employees,
-    production_bonus_amount_for_tons,
     get_monthly_production_record,
-    get_production_bonus_eligible_ids,
+    get_production_bonus_context,
     ensure_monthly_stats_for_month,
     apply_salary_payment_changes,
     PRODUCTION_BONUS_LOW_MIN_TONS,
@@ -53,19 +49,40 @@ from .services import (
     PRODUCTION_BONUS_UP_TO_THRESHOLD,
     PRODUCTION_BONUS_ABOVE_THRESHOLD,
 )
-from openpyxl.utils import get_column_letter
+from .attendance_import import enqueue_attendance_import
+from .export_jobs import background_export
+from .exports import (
+    EXPORT_HEADER_STYLE,
+    XLSX_CONTENT_TYPE,
+    Column,
+    SheetWriter,
+    add_export_rows,
+    cached_file_response,
+    csv_response,
+    export_cache_path,
+    export_format,
+    new_workbook,
+    store_in_cache,
+    xlsx_file_response,
+    zebra,
+)
+from .shift_schedule import SCHEDULE_MAX_DAYS, MonthSchedule, get_month_schedule
+from .work_calendar import get_work_calendar
 
 from django import forms
 from decimal import Decimal
 from django.utils.translation import gettext_lazy as _lazy
 from django.utils.translation import gettext as _
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
-from openpyxl.worksheet.dimensions import ColumnDimension
-from openpyxl.comments import Comment
-from openpyxl.formatting.rule import CellIsRule
+from django.utils.translation import get_language
 from blog.i18n import MONTH_NAME_CHOICES, WEEKDAY_NAMES
 
 
+# Oylik statistikasi workbook'i: USD summalar so'mda ham ko'rsatiladi
+USD_TO_UZS_RATE = 12000
+SALARY_SUM_FORMAT = '#,##0 "so\'m"'
+SALARY_USD_FORMAT = '"$" #,##0.00'
+
+
 def _excel_value(value):
     if value is None:
         return ''
@@ -236,7 +253,7 @@ def dashboard(request):
     employees = Employee.objects.filter(is_active=True)
     attendance_today = Attendance.objects.filter(date=today)
 
-    is_dayoff = DayOff.objects.filter(date=today).exists()
+    is_dayoff = get_work_calendar(today.year).is_day_off(today)
     is_sunday = today.weekday() == 6
     is_restricted_day = is_dayoff or is_sunday
 
@@ -318,11 +335,9 @@ def absence_quota_view(request):
     month_param = request.GET.get('month', '').strip()
     month = int(month_param) if month_param else None
 
-    employees = Employee.objects.filter(is_active=True).order_by("last_name", "first_name")
-    rows = []
-    for emp in employees:
-        quota = get_absence_quota_for_period(emp, year, month)
-        rows.append({"employee": emp, **quota})
+    employees = list(Employee.objects.filter(is_active=True).order_by("last_name", "first_name"))
+    quotas = get_absence_quota_map([emp.pk for emp in employees], year, month)
+    rows = [{"employee": emp, **quotas[emp.pk]} for emp in employees]
 
     month_names = MONTH_NAME_CHOICES
     context = {
@@ -336,22 +351,21 @@ def absence_quota_view(request):
 
 
 @login_required
+@background_export('absence_quota')
 def absence_quota_export(request):
     """Kelmagan kun kvotasi jadvalini Excelga eksport."""
     import datetime as _dt
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, Alignment
 
     today = _dt.date.today()
     year = int(request.GET.get("year", today.year))
     month_param = request.GET.get("month", "").strip()
     month = int(month_param) if month_param else None
 
-    employees = Employee.objects.filter(is_active=True).order_by("last_name", "first_name")
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = f"Kvota_{year}"
+    employees = list(
+        Employee.objects.filter(is_active=True).order_by("last_name", "first_name")
+        .values_list("pk", "last_name", "first_name", "position")
+    )
+    quotas = get_absence_quota_map([pk for pk, *_names in employees], year, month)
 
     headers = [
         "№",
@@ -367,53 +381,31 @@ def absence_quota_export(request):
         _("Qolgan kvota"),
         _("Limitdan ortiq"),
     ]
-    for col, h in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=h)
-        cell.font = Font(bold=True)
-        cell.alignment = Alignment(horizontal="center")
-
-    row_idx = 2
-    for idx, emp in enumerate(employees, start=1):
-        quota = get_absence_quota_for_period(emp, year, month)
-        ws.cell(row=row_idx, column=1, value=idx)
-        ws.cell(row=row_idx, column=2, value=emp.last_name)
-        ws.cell(row=row_idx, column=3, value=emp.first_name)
-        ws.cell(row=row_idx, column=4, value=emp.position)
-        ws.cell(row=row_idx, column=5, value=quota["absent_before"])
-        ws.cell(row=row_idx, column=6, value=quota["absent_this_month"])
-        ws.cell(row=row_idx, column=7, value=quota["absent_ytd"])
-        ws.cell(row=row_idx, column=8, value=quota["forgiven_in_month"])
-        ws.cell(row=row_idx, column=9, value=quota["affects_salary"])
-        ws.cell(row=row_idx, column=10, value=quota["used"])
-        ws.cell(row=row_idx, column=11, value=quota["left"])
-        ws.cell(row=row_idx, column=12, value=quota["over"])
-        row_idx += 1
-
-    # Autosize columns
-    from openpyxl.utils import get_column_letter
-
-    for col in range(1, len(headers) + 1):
-        max_len = 0
-        col_letter = get_column_letter(col)
-        for cell in ws[col_letter]:
-            if cell.value:
-                max_len = max(max_len, len(str(cell.value)))
-        ws.column_dimensions[col_letter].width = max_len + 2
-
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    quota_keys = (
+        "absent_before", "absent_this_month", "absent_ytd", "forgiven_in_month", "affects_salary", "used", "left", "over",
     )
-    filename = f"Kelmagan_kun_kvotasi_{year}.xlsx"
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-    wb.save(response)
-    return response
+    records = [
+        (idx, last_name, first_name, position, *(quotas[pk][key] for key in quota_keys))
+        for idx, (pk, last_name, first_name, position) in enumerate(employees, start=1)
+    ]
+    filename = f"Kelmagan_kun_kvotasi_{year}"
+
+    fmt = export_format(request)
+    if fmt:
+        return csv_response(headers, records, filename, fmt)
+
+    wb = new_workbook()
+    sheet = SheetWriter(wb, f"Kvota_{year}", [Column(header, itemgetter(index)) for index, header in enumerate(headers)])
+    sheet.header(style=EXPORT_HEADER_STYLE)
+    sheet.write(records)
+    sheet.finish()
+    return xlsx_file_response(wb, f"{filename}.xlsx")
 
 
 @login_required
 def nalivshik_schedule_view(request):
     """Nalivshik komandalarining oy bo‘yicha kun/tun jadvali."""
     import datetime as _dt
-    from calendar import monthrange
 
     today = _dt.date.today()
     month_param = request.GET.get('month')
@@ -444,68 +436,32 @@ def nalivshik_schedule_view(request):
             if not day_team and not night_team:
                 messages.error(request, _("Hech bo'lmaganda bitta komanda tanlang."))
             else:
-                # Tanlangan kun uchun override saqlash
-                NalivshikShiftOverride.objects.update_or_create(
-                    date=override_date,
-                    defaults={
-                        "day_team": day_team,
-                        "night_team": night_team,
-                        "comment": comment,
-                    },
-                )
+                # Tanlangan kun uchun override va shu kundan keyingi kunlar sikli
+                # (default: oy oxirigacha, `until` berilsa — undan keyin ham)
+                try:
+                    until = _dt.date.fromisoformat(request.POST.get("until") or "")
+                except ValueError:
+                    until = None
+                if until and (until - override_date).days >= SCHEDULE_MAX_DAYS:
+                    messages.error(
+                        request,
+                        _("Oraliq %(days)s kundan oshmasligi kerak.") % {"days": SCHEDULE_MAX_DAYS},
+                    )
+                else:
+                    save_nalivshik_override(
+                        override_date,
+                        day_team=day_team,
+                        night_team=night_team,
+                        comment=comment,
+                        until=until if until and until > override_date else None,
+                    )
 
-                # Shu kundan keyingi kunlarni avtomatik tarzda qayta hisoblash
-                # 3 ta komanda mavjud: 1, 2, 3 — har kuni ikkita komanda ishlaydi.
-                # Qoidaga ko‘ra:
-                #   keyingi kun kunduzgi komanda = hozirgi kunda ishlamagan komanda
-                #   keyingi kun tungi komanda = hozirgi kundagi kunduzgi komanda
-                if day_team and night_team and day_team != night_team:
-                    # Komanda kodlari bo‘yicha mapping
-                    all_codes = {1, 2, 3}
-                    teams_by_code = {t.code: t for t in Team.objects.filter(code__in=list(all_codes))}
-
-                    current_day_team = day_team
-                    current_night_team = night_team
-
-                    # Shu oydagi oxirgi sanani topamiz
-                    end_day = monthrange(override_date.year, override_date.month)[1]
-
-                    current_date = override_date
-                    # Faqat shu oydagi keyingi kunlar uchun
-                    while current_date.day < end_day:
-                        current_date = current_date + _dt.timedelta(days=1)
-
-                        used_codes = {current_day_team.code, current_night_team.code}
-                        remaining_codes = list(all_codes - used_codes)
-                        if not remaining_codes:
-                            break  # Noto‘g‘ri kombinatsiya, to‘xtatamiz
-
-                        next_day_code = remaining_codes[0]
-                        next_day_team = teams_by_code.get(next_day_code)
-                        if not next_day_team:
-                            break
-
-                        next_night_team = current_day_team
-
-                        NalivshikShiftOverride.objects.update_or_create(
-                            date=current_date,
-                            defaults={
-                                "day_team": next_day_team,
-                                "night_team": next_night_team,
-                                "comment": comment,
-                            },
-                        )
-
-                        # Keyingi iteratsiya uchun yangilash
-                        current_day_team = next_day_team
-                        current_night_team = next_night_team
-
-                messages.success(
-                    request,
-                    _("%(date)s sanadan boshlab keyingi kunlar jadvali yangilandi!") % {"date": override_date.strftime('%d.%m.%Y')},
-                )
-                # Redirect GET so'rovga qaytish uchun (F5 bosilganda qayta POST bo'lmasin)
-                return redirect(f"{request.path}?month={year}-{month:02d}")
+                    messages.success(
+                        request,
+                        _("%(date)s sanadan boshlab keyingi kunlar jadvali yangilandi!") % {"date": override_date.strftime('%d.%m.%Y')},
+                    )
+                    # Redirect GET so'rovga qaytish uchun (F5 bosilganda qayta POST bo'lmasin)
+                    return redirect(f"{request.path}?month={year}-{month:02d}")
 
     # Komanda nomlarini code bo'yicha olish
     teams = Team.objects.all()
@@ -514,18 +470,26 @@ def nalivshik_schedule_view(request):
     # Hafta kunlari nomlari
     weekday_names_uz = dict(WEEKDAY_NAMES)
 
+    # Oyning override'lari bitta so'rov bilan; jadval ham shulardan quriladi
+    overrides = {
+        override.date: override
+        for override in NalivshikShiftOverride.objects.filter(
+            date__year=year, date__month=month
+        ).select_related("day_team", "night_team")
+    }
+    schedule = MonthSchedule.from_overrides(year, month, {
+        day: (
+            override.day_team.code if override.day_team else None,
+            override.night_team.code if override.night_team else None,
+        )
+        for day, override in overrides.items()
+    })
+
     # Oyning barcha kunlari uchun jadval tayyorlash
     days = []
-    total_days = monthrange(year, month)[1]
-    for d in range(1, total_days + 1):
-        current_date = _dt.date(year, month, d)
-        day_team, night_team = get_nalivshik_teams_for_date(current_date)
-
+    for current_date, day_team, night_team in schedule:
         weekday_name = weekday_names_uz.get(current_date.weekday(), "")
-
-        override = NalivshikShiftOverride.objects.filter(date=current_date).select_related(
-            "day_team", "night_team"
-        ).first()
+        override = overrides.get(current_date)
 
         days.append(
             {
@@ -631,132 +595,82 @@ def employee_list(request):
 
 
 @login_required
+@background_export('employees')
 def employee_list_export(request):
     """Xodimlar ro'yxatini professional Excel faylga eksport."""
-    from io import BytesIO
-    from openpyxl import Workbook
-    from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
-    from openpyxl.utils import get_column_letter
-
     filters = _parse_employee_filters(request)
     employees = _employees_queryset(filters)
     today = date.today()
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Xodimlar"
+    fmt = export_format(request)
+    if fmt:
+        location_labels = dict(Employee.LOCATION_CHOICES)
+        type_labels = dict(Employee.EMPLOYEE_TYPE_CHOICES)
+        role_labels = dict(Employee.ROLE_CHOICES)
+        rows = employees.values_list(
+            'last_name', 'first_name', 'middle_name', 'position', 'department', 'phone_number', 'hire_date',
+            'location', 'employee_type', 'role', 'team__name', 'is_active',
+        ).iterator(chunk_size=2000)
+        return csv_response(
+            ['№', _('Familiya'), _('Ismi'), _("Otchestvasi"), _('Lavozim'), _("Bo'lim"), _('Telefon'),
+             _('Ishga kirgan sana'), _('Joylashuv'), _('Xodim turi'), _('Lavozim turi'), _('Komanda'), _('Holat')],
+            (
+                (idx, last_name, first_name, middle_name, position, department, phone,
+                 hire_date.isoformat() if hire_date else '', location_labels.get(location, location),
+                 type_labels.get(employee_type, employee_type), role_labels.get(role, role), team or '',
+                 _('Aktiv') if is_active else _('Noaktiv'))
+                for idx, (last_name, first_name, middle_name, position, department, phone, hire_date,
+                          location, employee_type, role, team, is_active) in enumerate(rows, start=1)
+            ),
+            f"ISOMER_OIL_Xodimlar_{today.strftime('%Y%m%d')}", fmt,
+        )
 
-    thin = Side(style='thin', color='D1D5DB')
-    border = Border(left=thin, right=thin, top=thin, bottom=thin)
-    header_fill = PatternFill(start_color='2C3E50', end_color='2C3E50', fill_type='solid')
-    title_fill = PatternFill(start_color='4A90E2', end_color='5B6FE8', fill_type='solid')
-    alt_fill = PatternFill(start_color='F8FAFC', end_color='F8FAFC', fill_type='solid')
-    active_fill = PatternFill(start_color='D1FAE5', end_color='D1FAE5', fill_type='solid')
-    inactive_fill = PatternFill(start_color='F3F4F6', end_color='F3F4F6', fill_type='solid')
+    def status_style(value, row, row_number):
+        return 'employee-list-active' if row[1].is_active else 'employee-list-inactive'
 
-    headers = [
-        '№',
-        _('Familiya'),
-        _('Ismi'),
-        _("Otchestvasi"),
-        _('Lavozim'),
-        _("Bo'lim"),
-        _('Telefon'),
-        _('Ishga kirgan sana'),
-        _('Joylashuv'),
-        _('Xodim turi'),
-        _('Lavozim turi'),
-        _('Komanda'),
-        _('Holat'),
-    ]
-    last_col = len(headers)
+    cell_styles = {
+        'left': zebra('employee-list-cell', 'employee-list-cell-alt'),
+        'center': zebra('employee-list-center', 'employee-list-center-alt'),
+        'wrap': zebra('employee-list-wrap', 'employee-list-wrap-alt'),
+    }
 
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=last_col)
-    title_cell = ws.cell(row=1, column=1, value=_("ISOMER OIL — Xodimlar ro'yxati"))
-    title_cell.font = Font(bold=True, size=16, color='FFFFFF')
-    title_cell.fill = title_fill
-    title_cell.alignment = Alignment(horizontal='center', vertical='center')
-    ws.row_dimensions[1].height = 32
+    def column(header, value, kind='left'):
+        return Column(header, value, style=cell_styles[kind], padding=3, max_width=42)
+
+    columns = [
+        column('№', itemgetter(0), 'center'),
+        column(_('Familiya'), lambda row: row[1].last_name),
+        column(_('Ismi'), lambda row: row[1].first_name),
+        column(_("Otchestvasi"), lambda row: row[1].middle_name or '—'),
+        column(_('Lavozim'), lambda row: row[1].position or '—', 'wrap'),
+        column(_("Bo'lim"), lambda row: row[1].department or '—', 'wrap'),
+        column(_('Telefon'), lambda row: row[1].phone_number or '—'),
+        column(_('Ishga kirgan sana'),
+               lambda row: row[1].hire_date.strftime('%d.%m.%Y') if row[1].hire_date else '—', 'center'),
+        column(_('Joylashuv'), lambda row: row[1].get_location_display(), 'wrap'),
+        column(_('Xodim turi'), lambda row: row[1].get_employee_type_display(), 'wrap'),
+        column(_('Lavozim turi'), lambda row: row[1].get_role_display(), 'wrap'),
+        column(_('Komanda'), lambda row: row[1].team.name if row[1].team else '—'),
+        Column(_('Holat'), lambda row: _('Aktiv') if row[1].is_active else _('Noaktiv'),
+               style=status_style, padding=3, max_width=42),
+    ]
+    employees = list(employees)
 
+    wb = new_workbook()
+    sheet = SheetWriter(wb, "Xodimlar", columns, freeze_panes='A5')
+    sheet.banner(_("ISOMER OIL — Xodimlar ro'yxati"), 'employee-list-title', height=32)
     subtitle_parts = [
         _("Sana: %(date)s") % {"date": today.strftime('%d.%m.%Y')},
-        _("Jami: %(count)s ta xodim") % {"count": employees.count()},
+        _("Jami: %(count)s ta xodim") % {"count": len(employees)},
     ]
     if filters.get('q'):
         subtitle_parts.append(_("Qidiruv: «%(query)s»") % {"query": filters['q']})
-    ws.merge_cells(start_row=2, start_column=1, end_row=2, end_column=last_col)
-    sub_cell = ws.cell(row=2, column=1, value='  |  '.join(subtitle_parts))
-    sub_cell.font = Font(size=10, color='475569')
-    sub_cell.alignment = Alignment(horizontal='center', vertical='center')
-    ws.row_dimensions[2].height = 20
-
-    header_row = 4
-    for col, label in enumerate(headers, 1):
-        cell = ws.cell(row=header_row, column=col, value=label)
-        cell.font = Font(bold=True, color='FFFFFF', size=11)
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-        cell.border = border
-    ws.row_dimensions[header_row].height = 24
-
-    for idx, emp in enumerate(employees, start=1):
-        row = header_row + idx
-        team_name = emp.team.name if emp.team else '—'
-        status_label = _('Aktiv') if emp.is_active else _('Noaktiv')
-        values = [
-            idx,
-            emp.last_name,
-            emp.first_name,
-            emp.middle_name or '—',
-            emp.position or '—',
-            emp.department or '—',
-            emp.phone_number or '—',
-            emp.hire_date.strftime('%d.%m.%Y') if emp.hire_date else '—',
-            emp.get_location_display(),
-            emp.get_employee_type_display(),
-            emp.get_role_display(),
-            team_name,
-            status_label,
-        ]
-        row_fill = alt_fill if idx % 2 == 0 else None
-        status_fill = active_fill if emp.is_active else inactive_fill
-
-        for col, value in enumerate(values, 1):
-            cell = ws.cell(row=row, column=col, value=value)
-            cell.border = border
-            cell.alignment = Alignment(
-                horizontal='center' if col in (1, 8, 13) else 'left',
-                vertical='center',
-                wrap_text=col in (5, 6, 9, 10, 11),
-            )
-            if col == 13:
-                cell.fill = status_fill
-                cell.font = Font(bold=True, color='065F46' if emp.is_active else '6B7280')
-            elif row_fill:
-                cell.fill = row_fill
-
-    ws.freeze_panes = f'A{header_row + 1}'
-
-    for col in range(1, last_col + 1):
-        col_letter = get_column_letter(col)
-        max_len = len(str(headers[col - 1]))
-        for row in range(header_row, header_row + employees.count() + 1):
-            val = ws.cell(row=row, column=col).value
-            if val is not None:
-                max_len = max(max_len, len(str(val)))
-        ws.column_dimensions[col_letter].width = min(max_len + 3, 42)
-
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-
-    filename = f"ISOMER_OIL_Xodimlar_{today.strftime('%Y%m%d')}.xlsx"
-    response = HttpResponse(
-        buffer.getvalue(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-    )
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    return response
+    sheet.banner('  |  '.join(subtitle_parts), 'employee-list-subtitle', height=20)
+    sheet.blank()
+    sheet.header(style='employee-list-header', height=24)
+    sheet.write(enumerate(employees, start=1))
+    sheet.finish()
+    return xlsx_file_response(wb, f"ISOMER_OIL_Xodimlar_{today.strftime('%Y%m%d')}.xlsx")
 
 @login_required
 def employee_create(request):
@@ -831,7 +745,7 @@ def bulk_attendance_create(request):
 
     employees, restricted_day = get_bulk_attendance_employees(date_val)
     if restricted_day and not employees.exists():
-        dayoff_reason = DayOff.objects.filter(date=date_val).first()
+        dayoff_reason = get_work_calendar(date_val.year).get_day_off(date_val)
         if date_val.weekday() == 6:
             reason = str(_("Yakshanba"))
         elif dayoff_reason:
@@ -883,13 +797,13 @@ def bulk_attendance_create(request):
         )
         if formset.is_valid():
             formset.save()
-            sync_monthly_stats_for_month(date_val.year, date_val.month)
+            recalculate_dirty_stats(date_val.year, date_val.month)
             messages.success(request, _("Davomat muvaffaqiyatli saqlandi!"))
             return redirect('attendance_list')
     else:
         formset = AttendanceFormSet(queryset=Attendance.objects.none(), initial=initial_data)
 
-    dayoff = DayOff.objects.filter(date=date_val).first() if hasattr(DayOff, 'date') else None
+    dayoff = get_work_calendar(date_val.year).get_day_off(date_val)
 
     return render(request, 'attendance/bulk_attendance_form.html', {
         'formset': formset,
@@ -934,10 +848,13 @@ def attendance_list(request):
 def attendance_update(request, pk):
     record = get_object_or_404(Attendance, pk=pk)
     if request.method == 'POST':
+        # is_valid() qiymatlarni instance'ga yozadi — eski xodim oldindan olinadi
+        previous_employee_id = record.employee_id
         form = AttendanceForm(request.POST, request.FILES, instance=record, attendance_employee=record.employee)
         if form.is_valid():
             record = form.save()
-            sync_monthly_stats_for_date(record.employee, record.date)
+            # Faqat shu yozuvning eski va yangi xodimi (boshqa navbat so'rovdan tashqarida)
+            recalculate_dirty_stats(employee_ids={previous_employee_id, record.employee_id})
             messages.success(request, _("Davomat yangilandi!"))
             return redirect('attendance_list')
     else:
@@ -948,93 +865,129 @@ def attendance_update(request, pk):
 def attendance_delete(request, pk):
     record = get_object_or_404(Attendance, pk=pk)
     if request.method == 'POST':
-        employee, att_date = record.employee, record.date
         record.delete()
-        sync_monthly_stats_for_date(employee, att_date)
+        recalculate_dirty_stats(employee_ids=[record.employee_id])
         messages.success(request, _("Davomat o'chirildi!"))
         return redirect('attendance_list')
     return render(request, 'attendance/attendance_confirm_delete.html', {'record': record})
 
 @login_required
 def attendance_import(request):
-    errors = []
     if request.method == 'POST':
         form = AttendanceImportForm(request.POST, request.FILES)
         if form.is_valid():
             file = request.FILES['file']
-            ext = file.name.split('.')[-1]
             try:
-                if ext in ['xls', 'xlsx']:
-                    df = pd.read_excel(file)
-                else:
-                    df = pd.read_csv(file)
-                count = 0
-                sync_targets = set()
-                for idx, row in df.iterrows():
-                    try:
-                        emp = Employee.objects.filter(
-                            last_name=row['last_name'],
-                            first_name=row['first_name']
-                        ).first()
-                        if not emp:
-                            errors.append(f"{idx+2}-satr: Xodim topilmadi ({row.get('last_name','')} {row.get('first_name','')})")
-                            continue
-                        # Sana formati tekshiruvi
-                        try:
-                            row_date = row['date']
-                            if not isinstance(row_date, str):
-                                row_date = str(row_date)
-                            date_obj = date.fromisoformat(row_date)
-                        except Exception:
-                            errors.append(f"{idx+2}-satr: Sana formati noto'g'ri ({row.get('date','')})")
-                            continue
-                        try:
-                            status = normalize_attendance_status(row.get('status'))
-                        except ValueError as exc:
-                            errors.append(f"{idx+2}-satr: {exc}")
-                            continue
-                        Attendance.objects.update_or_create(
-                            employee=emp,
-                            date=date_obj,
-                            defaults={
-                                'status': status,
-                                'comment': row.get('comment', ''),
-                            }
-                        )
-                        sync_targets.add((emp.pk, date_obj.year, date_obj.month))
-                        count += 1
-                    except Exception as e:
-                        errors.append(f"{idx+2}-satr: {str(e)}")
-                for emp_id, sync_year, sync_month in sync_targets:
-                    sync_monthly_stats_for_month(
-                        sync_year, sync_month, employee=Employee.objects.filter(pk=emp_id).first()
-                    )
-                AttendanceImportLog.objects.create(
-                    user=request.user,
-                    file_name=file.name,
-                    record_count=count,
-                    success=(len(errors) == 0),
-                    log='; '.join(errors) if errors else 'OK'
+                # Fayl saqlanadi va fon vazifasi sifatida import qilinadi
+                job, created = enqueue_attendance_import(
+                    file, user=request.user, force=form.cleaned_data.get('force'),
                 )
-                if count:
-                    messages.success(request, _("%(count)s ta davomat import qilindi!") % {"count": count})
-                if errors:
-                    messages.error(request, _("Quyidagi satrlarda xatoliklar: %(errors)s") % {"errors": "; ".join(errors)})
             except Exception as e:
                 AttendanceImportLog.objects.create(
                     user=request.user,
                     file_name=file.name,
+                    status=AttendanceImportLog.STATUS_FAILED,
                     record_count=0,
                     success=False,
                     log=str(e)
                 )
                 messages.error(request, _("Importda xatolik: %(error)s") % {"error": str(e)})
-            return redirect('attendance_import')
+                return redirect('attendance_import')
+            if not created:
+                messages.warning(
+                    request,
+                    _("Bu fayl %(date)s da yuklangan (#%(id)s) — qayta import qilinmadi.") % {
+                        "date": timezone.localtime(job.imported_at).strftime('%d.%m.%Y %H:%M'), "id": job.pk,
+                    },
+                )
+            elif job.status == AttendanceImportLog.STATUS_DONE:
+                if job.record_count:
+                    messages.success(request, _("%(count)s ta davomat import qilindi!") % {"count": job.record_count})
+                if job.error_count:
+                    messages.error(request, _("Quyidagi satrlarda xatoliklar: %(errors)s") % {"errors": job.log})
+            elif job.status == AttendanceImportLog.STATUS_FAILED:
+                messages.error(request, _("Importda xatolik: %(error)s") % {"error": job.log})
+            else:
+                messages.info(request, _("Fayl qabul qilindi, import fon rejimida bajarilmoqda."))
+            return redirect(f"{reverse('attendance_import')}?job={job.pk}")
     else:
         form = AttendanceImportForm()
-    return render(request, 'attendance/attendance_import.html', {'form': form})
+    job = None
+    job_id = request.GET.get('job')
+    if job_id and job_id.isdigit():
+        job = AttendanceImportLog.objects.filter(pk=job_id).first()
+    return render(request, 'attendance/attendance_import.html', {'form': form, 'job': job})
+
+
+@login_required
+def export_jobs(request):
+    """Fonda tayyorlangan eksportlar: holati va yuklab olish havolalari."""
+    jobs = list(ExportJob.objects.select_related('user')[:50])
+    return render(request, 'attendance/export_jobs.html', {
+        'jobs': jobs,
+        'selected_job': request.GET.get('job', ''),
+        'has_pending': any(not job.is_finished for job in jobs),
+    })
+
+
+@login_required
+def export_job_download(request, pk):
+    """Tayyor eksport fayli (MEDIA_ROOT/exports/ dan)."""
+    from django.http import FileResponse, Http404
+
+    job = get_object_or_404(ExportJob, pk=pk, status=ExportJob.STATUS_DONE)
+    try:
+        handle = job.file.open('rb')
+    except (FileNotFoundError, ValueError):
+        raise Http404(_("Eksport fayli topilmadi"))
+    return FileResponse(handle, as_attachment=True, filename=job.file_name or None)
+
+
+@login_required
+def attendance_import_progress(request, pk):
+    """Import vazifasining holati (sahifa shu endpointni so'rab turadi)."""
+    from django.http import JsonResponse
+
+    job = get_object_or_404(AttendanceImportLog, pk=pk)
+    return JsonResponse({
+        'id': job.pk,
+        'file_name': job.file_name,
+        'status': job.status,
+        'status_display': str(job.get_status_display()),
+        'processed_rows': job.processed_rows,
+        'record_count': job.record_count,
+        'error_count': job.error_count,
+        'changed_count': job.changed_count,
+        'finished': job.is_finished,
+        'success': job.success if job.is_finished else None,
+        'log': (job.log or '')[:2000] if job.is_finished else '',
+    })
 
 @login_required
+def attendance_import_errors(request, pk):
+    """Import xatoliklari jadvali: ?format=csv (default) yoki xlsx."""
+    job = get_object_or_404(AttendanceImportLog, pk=pk)
+    headers = [str(_('Satr')), str(_('Ustun')), str(_('Qiymat')), str(_('Xatolik'))]
+    rows = job.errors.order_by('row_number', 'pk').values_list('row_number', 'column', 'value', 'message')
+    base_name = f"import_{job.pk}_xatoliklar"
+
+    if request.GET.get('format') == 'xlsx':
+        wb = new_workbook(write_only=True)
+        sheet = SheetWriter(wb, _("Xatoliklar"), [
+            Column(headers[0], itemgetter(0)),
+            Column(headers[1], itemgetter(1)),
+            Column(headers[2], lambda row: _excel_value(row[2])),
+            Column(headers[3], lambda row: _excel_value(row[3])),
+        ])
+        sheet.header()
+        sheet.write(rows.iterator(chunk_size=2000))
+        return xlsx_file_response(wb, f"{base_name}.xlsx")
+
+    return csv_response(headers, rows.iterator(chunk_size=2000), base_name)
+
+
+@login_required
+@background_export('attendance')
 def attendance_export(request):
     if request.method == 'POST':
         # Get filter parameters
@@ -1058,35 +1011,31 @@ def attendance_export(request):
         if status:
             filters['status'] = status
             
-        # Get data
-        attendances = Attendance.objects.filter(**filters).select_related('employee')
-        
-        # Create Excel file
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = _("Davomat")
-        # Add header row
-        headers = [_('Sana'), _('Familiya'), _('Ismi'), _('Lavozim'), _("Bo'lim"), _('Status'), _('Izoh')]
-        for col_num, header in enumerate(headers, 1):
-            ws.cell(row=1, column=col_num, value=header)
-        
-        # Add data rows
-        for row_num, att in enumerate(attendances, 2):
-            ws.cell(row=row_num, column=1, value=att.date)
-            ws.cell(row=row_num, column=2, value=att.employee.last_name)
-            ws.cell(row=row_num, column=3, value=att.employee.first_name)
-            ws.cell(row=row_num, column=4, value=att.employee.position)
-            ws.cell(row=row_num, column=5, value=att.employee.department)
-            ws.cell(row=row_num, column=6, value=_excel_value(att.get_status_display()))
-            ws.cell(row=row_num, column=7, value=att.comment)
-        
-        # Create response
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        # Get data: modellarsiz qatorlar, bo'laklab o'qiladi
+        rows = Attendance.objects.filter(**filters).values_list(
+            'date', 'employee__last_name', 'employee__first_name', 'employee__position',
+            'employee__department', 'status', 'comment',
         )
-        response['Content-Disposition'] = 'attachment; filename="attendance.xlsx"'
-        wb.save(response)
-        return response
+        status_labels = {code: str(label) for code, label in Attendance.STATUS_CHOICES}
+        headers = [_('Sana'), _('Familiya'), _('Ismi'), _('Lavozim'), _("Bo'lim"), _('Status'), _('Izoh')]
+
+        fmt = export_format(request)
+        if fmt:
+            return csv_response(headers, (
+                (day.isoformat(), last_name, first_name, position, department,
+                 status_labels.get(status_code, status_code), comment)
+                for day, last_name, first_name, position, department, status_code, comment
+                in rows.iterator(chunk_size=2000)
+            ), "attendance", fmt)
+
+        # write_only: qatorlar darhol vaqtinchalik faylga yoziladi, xotira sana oralig'iga bog'liq emas
+        wb = new_workbook(write_only=True)
+        columns = [Column(header, itemgetter(index)) for index, header in enumerate(headers)]
+        columns[5] = Column(headers[5], lambda row: _excel_value(status_labels.get(row[5], row[5])))
+        sheet = SheetWriter(wb, _("Davomat"), columns)
+        sheet.header()
+        sheet.write(rows.iterator(chunk_size=2000))
+        return xlsx_file_response(wb, "attendance.xlsx")
     else:
         # Get unique departments for filter options
         departments = Employee.objects.values_list('department', flat=True).distinct()
@@ -1209,7 +1158,7 @@ def individual_attendance_create(request, employee_id=None):
                 'form': form,
                 'employee': employee,
                 'date_val': date_val,
-                'dayoff': DayOff.objects.filter(date=date_val).first()
+                'dayoff': get_work_calendar(date_val.year).get_day_off(date_val)
             })
         
         # Agar status absent, sick yoki vacation bo'lsa, izoh majburiy
@@ -1223,7 +1172,7 @@ def individual_attendance_create(request, employee_id=None):
                 'form': form,
                 'employee': employee,
                 'date_val': date_val,
-                'dayoff': DayOff.objects.filter(date=date_val).first()
+                'dayoff': get_work_calendar(date_val.year).get_day_off(date_val)
             })
         
         # Mavjud davomatni qidirish (date_val yangilanganidan keyin)
@@ -1237,7 +1186,7 @@ def individual_attendance_create(request, employee_id=None):
                     'comment': comment
                 }
                 )
-            sync_monthly_stats_for_date(employee, date_val)
+            recalculate_dirty_stats(employee_ids=[employee.pk])
 
             # AJAX request uchun JSON response qaytarish
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -1280,7 +1229,7 @@ def individual_attendance_create(request, employee_id=None):
     # GET so'rovi uchun forma tayyorlash
     form = AttendanceForm(instance=attendance) if attendance else AttendanceForm(initial={'status': 'present'})
     
-    dayoff = DayOff.objects.filter(date=date_val).first()
+    dayoff = get_work_calendar(date_val.year).get_day_off(date_val)
     restricted_day = is_restricted_attendance_date(date_val)
 
     return render(request, 'attendance/individual_attendance_form.html', {
@@ -1542,8 +1491,9 @@ def salary_statistics_view(request):
         messages.info(request, _("Oylik statistika qayta hisoblandi."))
     else:
         ensure_monthly_stats_for_month(year, month)
+        recalculate_dirty_stats(year, month)
 
-    stats = MonthlyEmployeeStat.objects.filter(year=year, month=month).select_related('employee').prefetch_related('salary_payments')
+    stats = MonthlyEmployeeStat.objects.filter(year=year, month=month).select_related('employee__team').prefetch_related('salary_payments')
     stats = _filter_salary_statistics(stats, filters)
 
     form = SalaryStatFilterForm(initial={'year': year, 'month': month})
@@ -1561,35 +1511,25 @@ def salary_statistics_view(request):
     # Ҳар бир stat объектига "rejadagi ish kunlari" ni qo'shamiz:
     # - oddiy xodimlar uchun ishchi kunlar (yakshanbasiz)
     # - nalivshiklar uchun esa o'z komandasi bo'yicha navbatchilik kunlari soni.
-    from .services import calculate_nalivshik_planned_days
-
     stats = list(stats)
-    nalivshik_planned_cache = {}
+    nalivshik_planned = get_month_schedule(year, month).planned_days_by_team()
 
-    monthly_production = (
-        MonthlyProduction.objects.filter(year=year, month=month)
-        .prefetch_related('eligible_employees')
-        .first()
-    )
-    production_bonus_eligible_ids = get_production_bonus_eligible_ids(year, month)
+    production = get_production_bonus_context(year, month)
+    monthly_production = production.record
+    production_bonus_eligible_ids = production.eligible_ids
 
     for stat in stats:
         if stat.employee.role == 'nalivshik':
-            if stat.employee_id not in nalivshik_planned_cache:
-                nalivshik_planned_cache[stat.employee_id] = calculate_nalivshik_planned_days(
-                    year, month, stat.employee
-                )
-            stat.working_days_in_month = nalivshik_planned_cache[stat.employee_id]
+            team = stat.employee.team
+            stat.working_days_in_month = (
+                nalivshik_planned.get(team.code, 0) if team else 0
+            ) or total_days_in_month
         else:
             stat.working_days_in_month = working_days_in_month
 
     absent_count_map = {
-        row['employee_id']: row['cnt']
-        for row in Attendance.objects.filter(
-            date__year=year, date__month=month, status='absent'
-        )
-        .values('employee_id')
-        .annotate(cnt=Count('id'))
+        employee_id: summary.absent
+        for employee_id, summary in get_attendance_summary_map(year, month).items()
     }
     absent_dates_map = defaultdict(list)
     for emp_id, d in Attendance.objects.filter(
@@ -1631,17 +1571,10 @@ def salary_statistics_view(request):
         year=year, month=month
     ).aggregate(latest=Max('calculated_at'))['latest']
 
-    production_tons = monthly_production.production_tons if monthly_production else Decimal('0')
-    production_bonus_active = bool(
-        monthly_production and production_tons >= PRODUCTION_BONUS_LOW_MIN_TONS
-    )
-    current_production_bonus = (
-        production_bonus_amount_for_tons(production_tons) if production_bonus_active else None
-    )
-    eligible_employees = (
-        monthly_production.eligible_employees.filter(is_active=True)
-        if monthly_production else Employee.objects.none()
-    )
+    production_tons = production.production_tons
+    production_bonus_active = production.is_active
+    current_production_bonus = production.bonus_amount if production_bonus_active else None
+    eligible_employees = Employee.objects.filter(pk__in=production.eligible_ids, is_active=True)
     active_employees_for_bonus = Employee.objects.filter(is_active=True).order_by(
         'last_name', 'first_name'
     )
@@ -1698,655 +1631,186 @@ def salary_statistics_view(request):
         'recalc_query': recalc_query,
     })
 
+def _salary_statistics_csv(stats, year, month, fmt):
+    """Oylik statistika — bitta tekis jadval (xodim turi ustun sifatida), Excel varaqlarisiz."""
+    working_days_in_month, _total_days = calculate_working_days_in_month(year, month)
+    type_labels = dict(Employee.EMPLOYEE_TYPE_CHOICES)
+    rows = stats.order_by('employee__last_name', 'employee__first_name').values_list(
+        'employee_id', 'employee__last_name', 'employee__first_name', 'employee__middle_name',
+        'employee__employee_type', 'salary', 'currency', 'worked_days', 'accrued', 'paid', 'bonus',
+    ).iterator(chunk_size=2000)
+
+    def stream():
+        for (employee_id, last_name, first_name, middle_name, employee_type,
+             salary, currency, worked_days, accrued, paid, bonus) in rows:
+            percentage = worked_days / working_days_in_month * 100 if working_days_in_month > 0 else 0
+            yield (
+                employee_id, ' '.join(part for part in (last_name, first_name, middle_name) if part),
+                type_labels.get(employee_type, employee_type), salary, (currency or 'UZS').upper(),
+                worked_days, working_days_in_month, f"{percentage:.1f}", accrued, paid, bonus or 0,
+            )
+
+    headers = [
+        _("ID"), _("Xodim"), _("Xodim turi"), _("Oylik"), _("Valyuta"), _("Kelgan"), _("Ish kunlari"),
+        _("Foiz"), _("Hisoblangan"), _("To'langan"), _("Bonus"),
+    ]
+    return csv_response(headers, stream(), f"ISOMER_OIL_oylik_{year}_{month:02d}", fmt)
+
+
 @login_required
+@background_export('salary_statistics')
 def export_salary_statistics_excel(request):
-    import datetime
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-    from openpyxl.styles.differential import DifferentialStyle
-    from openpyxl.formatting.rule import Rule
-    from openpyxl.utils import get_column_letter
-    
-    today = datetime.date.today()
     filters = _parse_salary_statistics_filters(request)
     year = filters['year']
     month = filters['month']
-    calculate_monthly_stats(year, month)
+    # Butun kompaniya uchun qayta hisoblash o'rniga — faqat yo'q statlar va navbatdagi (dirty) kalitlar
+    ensure_monthly_stats_for_month(year, month)
+    recalculate_dirty_stats(year, month)
     stats = MonthlyEmployeeStat.objects.filter(year=year, month=month).select_related('employee').prefetch_related('salary_payments')
     stats = _filter_salary_statistics(stats, filters)
-    
-    # Excel faylini yaratish
-    wb = Workbook()
-    
+
+    fmt = export_format(request)
+    if fmt:
+        return _salary_statistics_csv(stats, year, month, fmt)
+
     # Ishchi kunlarni hisoblash
     working_days_in_month, total_days_in_month = calculate_working_days_in_month(year, month)
-    
-    # Ishchi kunlar har bir stat obyektiga biriktiriladi
-    for stat in stats:
-        stat.working_days_in_month = working_days_in_month
 
-    # Xodimlarni turlariga qarab guruhlash
-    half_stats = [s for s in stats if s.employee.employee_type == 'half']
-    full_stats = [s for s in stats if s.employee.employee_type == 'full']
-    office_stats = [s for s in stats if s.employee.employee_type == 'office']
-    weekly_stats = [s for s in stats if s.employee.employee_type == 'weekly']
-    guard_stats = [s for s in stats if s.employee.employee_type == 'guard']
-    non_office_stats = [s for s in stats if s.employee.employee_type != 'office']
-    
-    # Chegara va ramkalar stili
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    header_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='medium')
+    # Tayyor fayl diskdagi keshdan: kalitda filtrlar, til va statlar "watermark"i
+    filename = f"💰_ISOMER_OIL_Oylik_Statistika_{year}_{month:02d}_Professional.xlsx"
+    watermark = stats.order_by().aggregate(
+        count=Count('id'),
+        calculated_at=Max('calculated_at'),
+        employees_updated_at=Max('employee__updated_at'),
+        salary=Sum('salary'), bonus=Sum('bonus'), accrued=Sum('accrued'), paid=Sum('paid'),
+        debt_start=Sum('debt_start'), debt_end=Sum('debt_end'), worked_days=Sum('worked_days'),
     )
-    
-    # Sodda va toza worksheet yaratish funksiyasi
-    def create_worksheet(worksheet, title, data, color_bg='4A90E2', color_accent='2E5C8A'):
-        # Sodda sarlavha
-        worksheet.merge_cells('A1:H2')
-        title_cell = worksheet.cell(row=1, column=1)
-        title_cell.value = f"ISOMER OIL - {title} ({year}-{month:02d})"
-        title_cell.font = Font(name='Arial', bold=True, size=14, color='FFFFFF')
-        title_cell.alignment = Alignment(horizontal='center', vertical='center')
-        title_cell.fill = PatternFill(start_color=color_bg, end_color=color_bg, fill_type='solid')
-        
-        # Sarlavha uchun oddiy ramka
-        for col in range(1, 9):
-            for row in range(1, 3):
-                cell = worksheet.cell(row=row, column=col)
-                cell.fill = PatternFill(start_color=color_bg, end_color=color_bg, fill_type='solid')
-                cell.border = Border(
-                    left=Side(style='thin', color='000000'),
-                    right=Side(style='thin', color='000000'),
-                    top=Side(style='thin', color='000000'),
-                    bottom=Side(style='thin', color='000000')
-                )
-        
-        # Sodda sarlavhalar
-        headers = [
-            _("Xodim"), _("Oylik"), _("Valyuta"), _("Kelgan/Jami"),
-            _("Foiz"), _("Hisoblangan"), _("To'langan"), _("Bonus")
-        ]
-        
-        for col, header in enumerate(headers, 1):
-            cell = worksheet.cell(row=4, column=col)
-            cell.value = header
-            cell.font = Font(name='Arial', bold=True, size=11, color='000000')
-            cell.fill = PatternFill(start_color='E8E8E8', end_color='E8E8E8', fill_type='solid')
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-            cell.border = Border(
-                left=Side(style='thin', color='000000'),
-                right=Side(style='thin', color='000000'),
-                top=Side(style='thin', color='000000'),
-                bottom=Side(style='thin', color='000000')
-            )
-        
-        # Sodda ma'lumotlar
-        for row, stat in enumerate(data, 5):
-            # Kelish foizini hisoblash
-            if hasattr(stat, 'working_days_in_month') and stat.working_days_in_month > 0:
-                percentage = (stat.worked_days / stat.working_days_in_month) * 100
-            else:
-                percentage = 0
-                
-            # Ma'lumotlarni formatlash
-            row_data = [
-                f"{stat.employee.get_full_name()}",
-                float(stat.salary),
-                stat.currency.upper() if stat.currency else 'UZS',
-                f"{stat.worked_days}/{stat.working_days_in_month}",
-                f"{percentage:.1f}%",
-                float(stat.accrued),
-                float(stat.paid),
-                float(stat.bonus) if stat.bonus else 0
-            ]
-            
-            for col, value in enumerate(row_data, 1):
-                cell = worksheet.cell(row=row, column=col)
-                cell.value = value
-                
-                # Oddiy ramka
-                cell.border = Border(
-                    left=Side(style='thin', color='000000'),
-                    right=Side(style='thin', color='000000'),
-                    top=Side(style='thin', color='000000'),
-                    bottom=Side(style='thin', color='000000')
-                )
-                
-                # Sodda stillar
-                if col == 1:  # Ism
-                    cell.font = Font(name='Arial', size=10)
-                    cell.alignment = Alignment(horizontal='left', vertical='center')
-                elif col == 3:  # Valyuta
-                    cell.font = Font(name='Arial', bold=True, size=10)
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-                elif col == 4:  # Kelgan/Jami
-                    cell.font = Font(name='Arial', size=10)
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-                elif col == 5:  # Foiz
-                    cell.font = Font(name='Arial', bold=True, size=10)
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-                    # Foiz uchun oddiy rang berish
-                    if percentage >= 80:
-                        cell.fill = PatternFill(start_color='E8F5E8', end_color='E8F5E8', fill_type='solid')
-                    elif percentage >= 60:
-                        cell.fill = PatternFill(start_color='FFF8DC', end_color='FFF8DC', fill_type='solid')
-                    else:
-                        cell.fill = PatternFill(start_color='FFE4E1', end_color='FFE4E1', fill_type='solid')
-                elif col in [2, 6, 7, 8]:  # Pul ustunlari
-                    cell.font = Font(name='Arial', size=10)
-                    cell.alignment = Alignment(horizontal='right', vertical='center')
-                    
-                    # Oddiy raqam formati
-                    currency = stat.currency.upper() if stat.currency else 'UZS'
-                    if currency == 'USD':
-                        cell.number_format = '"$" #,##0'
-                    elif currency in ['UZS', 'SUM']:
-                        cell.number_format = '#,##0 "so\'m"'
-                    else:
-                        cell.number_format = f'#,##0 "{currency}"'
-        
-        # Oddiy ustun kengliklari
-        column_widths = [25, 15, 10, 15, 12, 18, 15, 12]
-        for col, width in enumerate(column_widths, 1):
-            column_letter = get_column_letter(col)
-            worksheet.column_dimensions[column_letter].width = width
-        
-        # Oddiy zebra chiziqlar
-        data_end_row = worksheet.max_row
-        for row in range(5, data_end_row + 1):
-            if row % 2 == 0:  # Juft qatorlar
-                for col in range(1, 9):
-                    cell = worksheet.cell(row=row, column=col)
-                    if not cell.fill or cell.fill.start_color.rgb == '00000000':  # Agar rang berilmagan bo'lsa
-                        cell.fill = PatternFill(start_color='F8F8F8', end_color='F8F8F8', fill_type='solid')
-        
-        # Sodda valyuta umumiy hisob-kitobi
-        if data:
-            # Valyutalar bo'yicha guruhlash
-            currency_totals = {}
-            for stat in data:
-                currency = stat.currency.upper() if stat.currency else 'UZS'
-                if currency not in currency_totals:
-                    currency_totals[currency] = {'count': 0, 'salary': 0, 'accrued': 0, 'paid': 0, 'bonus': 0}
-                
-                currency_totals[currency]['count'] += 1
-                currency_totals[currency]['salary'] += float(stat.salary)
-                currency_totals[currency]['accrued'] += float(stat.accrued)
-                currency_totals[currency]['paid'] += float(stat.paid)
-                currency_totals[currency]['bonus'] += float(stat.bonus) if stat.bonus else 0
-            
-            # Umumiy ma'lumotlar sarlavhasi
-            summary_start_row = data_end_row + 2
-            worksheet.merge_cells(f'A{summary_start_row}:H{summary_start_row}')
-            summary_header = worksheet.cell(row=summary_start_row, column=1)
-            summary_header.value = _("VALYUTA BO'YICHA JAMI")
-            summary_header.font = Font(name='Arial', bold=True, size=12, color='FFFFFF')
-            summary_header.fill = PatternFill(start_color=color_bg, end_color=color_bg, fill_type='solid')
-            summary_header.alignment = Alignment(horizontal='center', vertical='center')
-            summary_header.border = Border(
-                left=Side(style='thin', color='000000'),
-                right=Side(style='thin', color='000000'),
-                top=Side(style='thin', color='000000'),
-                bottom=Side(style='thin', color='000000')
-            )
-            
-            # Valyuta sarlavhalari
-            headers = [_("Valyuta"), _("Soni"), _("Jami oylik"), _("Hisoblangan"), _("To'langan"), _("Bonus"), _("Qarzdorlik"), ""]
-            
-            header_row = summary_start_row + 1
-            for col, header in enumerate(headers, 1):
-                cell = worksheet.cell(row=header_row, column=col)
-                cell.value = header
-                cell.font = Font(name='Arial', bold=True, size=10, color='000000')
-                cell.fill = PatternFill(start_color='D0D0D0', end_color='D0D0D0', fill_type='solid')
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-                cell.border = Border(
-                    left=Side(style='thin', color='000000'),
-                    right=Side(style='thin', color='000000'),
-                    top=Side(style='thin', color='000000'),
-                    bottom=Side(style='thin', color='000000')
-                )
-            
-            # Har bir valyuta uchun ma'lumotlar
-            current_row = header_row + 1
-            for currency, totals in sorted(currency_totals.items()):
-                debt_amount = totals['accrued'] - totals['paid']
-                
-                currency_data = [
-                    currency, totals['count'], totals['salary'], totals['accrued'],
-                    totals['paid'], totals['bonus'], debt_amount, ""
-                ]
-                
-                for col, value in enumerate(currency_data, 1):
-                    cell = worksheet.cell(row=current_row, column=col)
-                    cell.value = value
-                    cell.font = Font(name='Arial', size=10)
-                    cell.alignment = Alignment(
-                        horizontal='center' if col in [1, 2] else 'right' if col <= 7 else 'left', 
-                        vertical='center'
-                    )
-                    cell.border = Border(
-                        left=Side(style='thin', color='000000'),
-                        right=Side(style='thin', color='000000'),
-                        top=Side(style='thin', color='000000'),
-                        bottom=Side(style='thin', color='000000')
-                    )
-                    
-                    # Pul ustunlari uchun formatlash
-                    if col in [3, 4, 5, 6, 7] and isinstance(value, (int, float)):
-                        if currency == 'USD':
-                            cell.number_format = '"$" #,##0'
-                        elif currency in ['UZS', 'SUM']:
-                            cell.number_format = '#,##0 "so\'m"'
-                        else:
-                            cell.number_format = f'#,##0 "{currency}"'
-                
-                current_row += 1
-        
-        # Professional freeze panes va print settings
-        worksheet.freeze_panes = 'A5'
-    
-        # Print settings - professional ko'rinish
-        worksheet.page_setup.orientation = worksheet.ORIENTATION_LANDSCAPE
-        worksheet.page_setup.paperSize = worksheet.PAPERSIZE_A4
-        worksheet.page_setup.fitToWidth = 1
-        worksheet.page_setup.fitToHeight = 0
-        
-        # Print titles (header har sahifada ko'rinadi)
-        worksheet.print_title_rows = '1:4'
-        
-        # Margins
-        worksheet.page_margins.left = 0.5
-        worksheet.page_margins.right = 0.5
-        worksheet.page_margins.top = 0.75
-        worksheet.page_margins.bottom = 0.75
-        worksheet.page_margins.header = 0.3
-        worksheet.page_margins.footer = 0.3
-    
-    # Guruhlash bilan worksheet yaratish funksiyasi (BARCHA XODIMLAR uchun)
-    def create_grouped_worksheet(worksheet, title, all_stats, color_bg='1E3A5F', color_accent='2C5282'):
-        LAST_COL = 12  # №, Xodim + 5 juft (sum/$): oylik, hisoblandi, tulandi, qarzdorlik bosh, qarzdorlik oxiri
-
-        # Professional sarlavha - gradient effekt
-        worksheet.merge_cells(f'A1:{get_column_letter(LAST_COL)}2')
-        title_cell = worksheet.cell(row=1, column=1)
-        title_cell.value = f"🏢 ISOMER OIL - {title} ({year}-{month:02d})"
-        title_cell.font = Font(name='Calibri', bold=True, size=16, color='FFFFFF')
-        title_cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-        title_cell.fill = PatternFill(start_color=color_bg, end_color=color_accent, fill_type='solid')
-        
-        # Sarlavha uchun professional ramka
-        thick_border = Border(
-            left=Side(style='thick', color='FFFFFF'),
-            right=Side(style='thick', color='FFFFFF'),
-            top=Side(style='thick', color='FFFFFF'),
-            bottom=Side(style='thick', color='FFFFFF')
-        )
-        for col in range(1, LAST_COL + 1):
-            for row in range(1, 3):
-                cell = worksheet.cell(row=row, column=col)
-                cell.fill = PatternFill(start_color=color_bg, end_color=color_accent, fill_type='solid')
-                cell.border = thick_border
-        
-        # №, Xodim, oylik/hisoblandi/tulandi/qarzdorlik bosh/qarzdorlik oxiri (har biri sum/$)
-        worksheet.merge_cells('A3:A4')  # №
-        worksheet.merge_cells('B3:B4')  # Xodim
-        worksheet.merge_cells('C3:D3')  # oylik
-        worksheet.merge_cells('E3:F3')  # hisoblandi
-        worksheet.merge_cells('G3:H3')  # tulandi
-        worksheet.merge_cells('I3:J3')  # qarzdorlik (bosh)
-        worksheet.merge_cells('K3:L3')  # qarzdorlik (oxiri)
-        
-        main_headers = [
-            "№", _("Xodim"), _("oylik"), _("hisoblandi"), _("tulandi"),
-            _("qarzdorlik (bosh)"), _("qarzdorlik (oxiri)"),
-        ]
-        main_header_cols = [1, 2, 3, 5, 7, 9, 11]
-        
-        header_border = Border(
-            left=Side(style='medium', color='1E3A5F'),
-            right=Side(style='medium', color='1E3A5F'),
-            top=Side(style='medium', color='1E3A5F'),
-            bottom=Side(style='thick', color='1E3A5F')
-        )
-        
-        merge_ranges = [
-            'A3:A4', 'B3:B4', 'C3:D3', 'E3:F3', 'G3:H3', 'I3:J3', 'K3:L3',
-        ]
-        for (col, header), merge_range in zip(zip(main_header_cols, main_headers), merge_ranges):
-            
-            worksheet.merge_cells(merge_range)
-            cell = worksheet.cell(row=3, column=col)
-            cell.value = header
-            cell.font = Font(name='Calibri', bold=True, size=12, color='FFFFFF')
-            cell.fill = PatternFill(start_color='4472C4', end_color='5B7FBD', fill_type='solid')
-            cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-            cell.border = header_border
-        
-        sub_headers = ["sum", "$"] * 5
-        sub_header_cols = list(range(3, LAST_COL + 1))
-        
-        for col, header in zip(sub_header_cols, sub_headers):
-            cell = worksheet.cell(row=4, column=col)
-            cell.value = header
-            cell.font = Font(name='Calibri', bold=True, size=11, color='FFFFFF')
-            cell.fill = PatternFill(start_color='5B7FBD', end_color='4472C4', fill_type='solid')
-            cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-            cell.border = header_border
-        
-        # Xodimlarni turlariga qarab guruhlash - professional ranglar
-        employee_type_groups = {
-            'full': (_('⭐ To\'liq stavka xodimlar'), '2E75B6'),
-            'half': (_('📋 15 kunlik xodimlar'), 'FF6B35'),
-            'weekly': (_('📆 Haftada 1 kun xodimlar'), '6C757D'),
-            'guard': (_('🛡️ Qorovul xodimlar'), 'DC3545'),
-            'office': (_('💼 Ofis xodimlari'), '8E44AD'),
-        }
-        
-        current_row = 5
-        all_currency_totals = {}
-        employee_number = 0  # № uchun raqam
-        
-        # Har bir guruh uchun
-        for emp_type, (group_title, group_color) in employee_type_groups.items():
-            group_stats = [s for s in all_stats if s.employee.employee_type == emp_type]
-            
-            if not group_stats:
-                continue
-            
-            # Professional guruh sarlavhasi
-            worksheet.merge_cells(f'A{current_row}:{get_column_letter(LAST_COL)}{current_row}')
-            group_header = worksheet.cell(row=current_row, column=1)
-            group_header.value = str(group_title).upper()
-            group_header.font = Font(name='Calibri', bold=True, size=13, color='FFFFFF')
-            # Gradient effekt uchun biroz qorong'i rang
-            darker_color = hex(int(group_color, 16) - 0x202020 if int(group_color, 16) > 0x202020 else 0)[2:].upper().zfill(6)
-            group_header.fill = PatternFill(start_color=group_color, end_color=darker_color, fill_type='solid')
-            group_header.alignment = Alignment(horizontal='center', vertical='center')
-            group_header_border = Border(
-                left=Side(style='thick', color='FFFFFF'),
-                right=Side(style='thick', color='FFFFFF'),
-                top=Side(style='thick', color='FFFFFF'),
-                bottom=Side(style='thick', color='FFFFFF')
-            )
-            group_header.border = group_header_border
-            # Row height oshirish
-            worksheet.row_dimensions[current_row].height = 25
-            current_row += 1
-            
-            # Guruh xodimlari
-            for stat in group_stats:
-                employee_number += 1
-                currency = stat.currency.upper() if stat.currency else 'UZS'
-                USD_TO_UZS_RATE = 12000
-                
-                debt_start_amount = float(stat.debt_start)
-                debt_end_amount = float(stat.debt_end)
-                
-                row_data = {
-                    1: employee_number,
-                    2: f"{stat.employee.get_full_name()}"
-                        + (f" — {stat.employee.position}" if stat.employee.position else ""),
-                    3: None, 4: None,  # oylik
-                    5: None, 6: None,  # hisoblandi
-                    7: None, 8: None,  # tulandi
-                    9: None, 10: None,  # qarzdorlik bosh
-                    11: None, 12: None,  # qarzdorlik oxiri
-                }
-                
-                if currency == 'USD':
-                    row_data[4] = float(stat.salary)
-                    row_data[6] = float(stat.accrued)
-                    row_data[8] = float(stat.paid)
-                    row_data[10] = debt_start_amount
-                    row_data[12] = debt_end_amount
-                    row_data[3] = float(stat.salary) * USD_TO_UZS_RATE
-                    row_data[5] = float(stat.accrued) * USD_TO_UZS_RATE
-                    row_data[7] = float(stat.paid) * USD_TO_UZS_RATE
-                    row_data[9] = debt_start_amount * USD_TO_UZS_RATE
-                    row_data[11] = debt_end_amount * USD_TO_UZS_RATE
-                else:
-                    row_data[3] = float(stat.salary)
-                    row_data[5] = float(stat.accrued)
-                    row_data[7] = float(stat.paid)
-                    row_data[9] = debt_start_amount
-                    row_data[11] = debt_end_amount
-                    row_data[4] = row_data[6] = row_data[8] = ""
-                    row_data[10] = row_data[12] = ""
-                
-                # Professional cell border
-                data_border = Border(
-                    left=Side(style='thin', color='000000'),
-                    right=Side(style='thin', color='000000'),
-                    top=Side(style='thin', color='000000'),
-                    bottom=Side(style='thin', color='000000')
-                )
-                
-                for col in range(1, LAST_COL + 1):
-                    value = row_data.get(col)
-                    cell = worksheet.cell(row=current_row, column=col)
-                    cell.value = value
-                    cell.border = data_border
-                    
-                    if col == 1:
-                        cell.font = Font(name='Calibri', bold=True, size=11, color='1F1F1F')
-                        cell.alignment = Alignment(horizontal='center', vertical='center')
-                        cell.fill = PatternFill(start_color='F0F0F0', end_color='F0F0F0', fill_type='solid')
-                    elif col == 2:
-                        cell.font = Font(name='Calibri', size=11, color='1F1F1F')
-                        cell.alignment = Alignment(horizontal='left', vertical='center')
-                    elif col in [3, 5, 7, 9, 11]:
-                        cell.font = Font(name='Calibri', size=11, color='1F1F1F')
-                        cell.alignment = Alignment(horizontal='right', vertical='center')
-                        if value is not None and value != "":
-                            cell.number_format = '#,##0 "so\'m"'
-                    elif col in [4, 6, 8, 10, 12]:
-                        cell.font = Font(name='Calibri', size=11, color='1F1F1F')
-                        cell.alignment = Alignment(horizontal='right', vertical='center')
-                        if value is not None and value != "":
-                            cell.number_format = '"$" #,##0.00'
-                    
-                    if col in [9, 10, 11, 12] and value is not None and value != "":
-                        debt_val = float(value) if isinstance(value, (int, float)) else 0
-                        if debt_val > 0:
-                            cell.fill = PatternFill(start_color='FFE4E1', end_color='FFE4E1', fill_type='solid')
-                            cell.font = Font(name='Calibri', bold=True, size=11, color='9C0006')
-                        elif debt_val == 0:
-                            cell.fill = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
-                            cell.font = Font(name='Calibri', bold=True, size=11, color='006100')
-                
-                # Umumiy valyuta hisob-kitobiga qo'shish
-                if currency not in all_currency_totals:
-                    all_currency_totals[currency] = {
-                        'count': 0, 'salary': 0, 'accrued': 0, 'paid': 0,
-                        'debt_start': 0, 'debt_end': 0,
-                    }
-                all_currency_totals[currency]['count'] += 1
-                all_currency_totals[currency]['salary'] += float(stat.salary)
-                all_currency_totals[currency]['accrued'] += float(stat.accrued)
-                all_currency_totals[currency]['paid'] += float(stat.paid)
-                all_currency_totals[currency]['debt_start'] += debt_start_amount
-                all_currency_totals[currency]['debt_end'] += debt_end_amount
-                
-                if current_row % 2 == 0:
-                    for col in range(1, LAST_COL + 1):
-                        cell = worksheet.cell(row=current_row, column=col)
-                        # Faqat rang berilmagan celllarga rang berish
-                        if not hasattr(cell.fill, 'start_color') or cell.fill.start_color.rgb == '00000000' or cell.fill.start_color.rgb == 'FFFFFFFF':
-                            cell.fill = PatternFill(start_color='F5F5F5', end_color='F5F5F5', fill_type='solid')
-                
-                current_row += 1
-            
-            # Guruhlar orasida bo'sh qator
-            current_row += 1
-        
-        # Ustun kengliklari
-        column_widths = [8, 30, 18, 14, 18, 14, 18, 14, 18, 14, 18, 14]
-        for col, width in enumerate(column_widths, 1):
-            column_letter = get_column_letter(col)
-            worksheet.column_dimensions[column_letter].width = width
-        
-        # Professional umumiy jami (oxirida)
-        if all_currency_totals:
-            summary_start_row = current_row + 2  # Bo'sh qator qo'shish
-            worksheet.merge_cells(f'A{summary_start_row}:{get_column_letter(LAST_COL)}{summary_start_row}')
-            summary_header = worksheet.cell(row=summary_start_row, column=1)
-            summary_header.value = "💰 JAMI"
-            summary_header.font = Font(name='Calibri', bold=True, size=14, color='FFFFFF')
-            summary_header.fill = PatternFill(start_color='1E3A5F', end_color='2C5282', fill_type='solid')
-            summary_header.alignment = Alignment(horizontal='center', vertical='center')
-            summary_header.border = Border(
-                left=Side(style='thick', color='FFFFFF'),
-                right=Side(style='thick', color='FFFFFF'),
-                top=Side(style='thick', color='FFFFFF'),
-                bottom=Side(style='thick', color='FFFFFF')
+    cache_path = export_cache_path((
+        'salary_statistics', year, month, sorted(filters.items()), get_language(),
+        working_days_in_month, sorted(watermark.items()),
+    ))
+    cached = cached_file_response(cache_path, filename, XLSX_CONTENT_TYPE)
+    if cached is not None:
+        add_export_rows(watermark['count'])
+        return cached
+
+    # Har bir valyuta bo'yicha (soni, oylik, hisoblangan, to'langan, qarz boshi, qarz oxiri)
+    money_fields = ('salary', 'accrued', 'paid', 'debt_start', 'debt_end')
+    totals = {'sum': [0] * len(money_fields), 'usd': [0] * len(money_fields)}
+
+    def money_row(stat):
+        amounts = [float(getattr(stat, field)) for field in money_fields]
+        if (stat.currency or '').upper() == 'USD':
+            for index, amount in enumerate(amounts):
+                totals['usd'][index] += amount
+                totals['sum'][index] += amount * USD_TO_UZS_RATE
+            pairs = [(amount * USD_TO_UZS_RATE, amount) for amount in amounts]
+        else:
+            for index, amount in enumerate(amounts):
+                totals['sum'][index] += amount
+            pairs = [(amount, "") for amount in amounts]
+        return [value for pair in pairs for value in pair]
+
+    def money_style(value, record, row_number):
+        return 'salary-money-alt' if row_number % 2 == 0 else 'salary-money'
+
+    def debt_style(value, record, row_number):
+        if value != "" and value > 0:
+            return 'salary-debt'
+        if value != "" and value == 0:
+            return 'salary-debt-clear'
+        return money_style(value, record, row_number)
+
+    sub_headers = ["sum", "$"] * len(money_fields)
+    columns = [
+        Column("№", itemgetter(0), style='salary-number', width=8),
+        Column(_("Xodim"), itemgetter(1), style=zebra('salary-name', 'salary-name-alt'), width=30),
+        *(
+            Column(
+                header, itemgetter(index), style=debt_style if index >= 8 else money_style,
+                number_format=SALARY_SUM_FORMAT if header == "sum" else SALARY_USD_FORMAT,
+                width=18 if header == "sum" else 14,
             )
-            worksheet.row_dimensions[summary_start_row].height = 30
-            
-            # Jami qatori
-            summary_row = summary_start_row + 1
-            USD_TO_UZS_RATE = 12000
-            
-            # Barcha valyutalar uchun jami hisoblash
-            total_salary_sum = 0
-            total_salary_usd = 0
-            total_accrued_sum = 0
-            total_accrued_usd = 0
-            total_paid_sum = 0
-            total_paid_usd = 0
-            total_debt_start_sum = 0
-            total_debt_start_usd = 0
-            total_debt_end_sum = 0
-            total_debt_end_usd = 0
-            
-            for currency, totals in sorted(all_currency_totals.items()):
-                if currency == 'USD':
-                    total_salary_usd += totals['salary']
-                    total_accrued_usd += totals['accrued']
-                    total_paid_usd += totals['paid']
-                    total_debt_start_usd += totals['debt_start']
-                    total_debt_end_usd += totals['debt_end']
-                    total_salary_sum += totals['salary'] * USD_TO_UZS_RATE
-                    total_accrued_sum += totals['accrued'] * USD_TO_UZS_RATE
-                    total_paid_sum += totals['paid'] * USD_TO_UZS_RATE
-                    total_debt_start_sum += totals['debt_start'] * USD_TO_UZS_RATE
-                    total_debt_end_sum += totals['debt_end'] * USD_TO_UZS_RATE
-                else:
-                    total_salary_sum += totals['salary']
-                    total_accrued_sum += totals['accrued']
-                    total_paid_sum += totals['paid']
-                    total_debt_start_sum += totals['debt_start']
-                    total_debt_end_sum += totals['debt_end']
-            
-            summary_data = {
-                1: "",
-                2: "JAMI",
-                3: total_salary_sum if total_salary_sum > 0 else "",
-                4: total_salary_usd if total_salary_usd > 0 else "",
-                5: total_accrued_sum if total_accrued_sum > 0 else "",
-                6: total_accrued_usd if total_accrued_usd > 0 else "",
-                7: total_paid_sum if total_paid_sum > 0 else "",
-                8: total_paid_usd if total_paid_usd > 0 else "",
-                9: total_debt_start_sum if total_debt_start_sum != 0 else "",
-                10: total_debt_start_usd if total_debt_start_usd != 0 else "",
-                11: total_debt_end_sum if total_debt_end_sum != 0 else "",
-                12: total_debt_end_usd if total_debt_end_usd != 0 else "",
-            }
-            
-            # JAMI qatori uchun aniq chiziqlar:
-            # - tashqi ramka qalin
-            # - ichki ajratgichlar (vertikal/горизонтал) medium
-            summary_border_thick = Side(style='thick', color='0B2A3C')
-            summary_border_medium = Side(style='medium', color='0B2A3C')
-            dark_blue_fill = PatternFill(start_color='1E3A5F', end_color='1E3A5F', fill_type='solid')
-            
-            for col in range(1, LAST_COL + 1):
-                value = summary_data.get(col, "")
-                cell = worksheet.cell(row=summary_row, column=col)
-                cell.value = value
-                left_side = summary_border_thick if col == 1 else summary_border_medium
-                right_side = summary_border_thick if col == LAST_COL else summary_border_medium
-                cell.border = Border(
-                    left=left_side,
-                    right=right_side,
-                    top=summary_border_thick,
-                    bottom=summary_border_thick
-                )
-                
-                # Professional stillar
-                if col == 1:  # №
-                    cell.fill = dark_blue_fill
-                    cell.value = ""  # bo'sh
-                elif col == 2:  # JAMI
-                    cell.font = Font(name='Calibri', bold=True, size=12, color='FFFFFF')
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-                    cell.fill = dark_blue_fill
-                elif col in [3, 5, 7, 9, 11]:
-                    cell.font = Font(name='Calibri', bold=True, size=12, color='FFFFFF')
-                    cell.alignment = Alignment(horizontal='right', vertical='center')
-                    cell.fill = dark_blue_fill
-                    if value is not None and value != "":
-                        cell.number_format = '#,##0 "so\'m"'
-                elif col in [4, 6, 8, 10, 12]:
-                    cell.font = Font(name='Calibri', bold=True, size=12, color='FFFFFF')
-                    cell.alignment = Alignment(horizontal='right', vertical='center')
-                    cell.fill = dark_blue_fill
-                    if value is not None and value != "":
-                        cell.number_format = '"$" #,##0.00'
-                
-                if col in [9, 10, 11, 12] and value is not None and value != "":
-                    debt_val = float(value) if isinstance(value, (int, float)) else 0
-                    if debt_val > 0:
-                        cell.fill = PatternFill(start_color='FF6B6B', end_color='FF6B6B', fill_type='solid')
-                        cell.font = Font(name='Calibri', bold=True, size=12, color='FFFFFF')
-                    elif debt_val == 0:
-                        cell.fill = PatternFill(start_color='4ECDC4', end_color='4ECDC4', fill_type='solid')
-                        cell.font = Font(name='Calibri', bold=True, size=12, color='FFFFFF')
-            
-            # JAMI qatorini balandroq va "stol" kabi aniq qilish
-            worksheet.row_dimensions[summary_row].height = 28
-        
-        # Professional freeze panes va print settings
-        worksheet.freeze_panes = 'A5'  # Header qatorlaridan keyin
-        
-        # Print settings - professional ko'rinish
-        worksheet.page_setup.orientation = worksheet.ORIENTATION_LANDSCAPE
-        worksheet.page_setup.paperSize = worksheet.PAPERSIZE_A4
-        worksheet.page_setup.fitToWidth = 1
-        worksheet.page_setup.fitToHeight = 0
-        
-        # Print titles (header har sahifada ko'rinadi)
-        worksheet.print_title_rows = '1:4'  # Sarlavha va header qatorlari
-        
-        # Margins
-        worksheet.page_margins.left = 0.5
-        worksheet.page_margins.right = 0.5
-        worksheet.page_margins.top = 0.75
-        worksheet.page_margins.bottom = 0.75
-        worksheet.page_margins.header = 0.3
-        worksheet.page_margins.footer = 0.3
-    
-    # Faqat bitta list yaratish - BARCHA XODIMLAR (guruhlash bilan)
-    # Default worksheetni o'chirish va yangi yaratish
-    wb.remove(wb.active)
-    
+            for index, header in enumerate(sub_headers, start=2)
+        ),
+    ]
+    last_col = len(columns)
+
+    wb = new_workbook()
+    sheet = SheetWriter(wb, _("BARCHA XODIMLAR"), columns, freeze_panes='A5')
+    sheet.banner(f"🏢 ISOMER OIL - {_('Barcha xodimlar (umumiy)')} ({year}-{month:02d})", 'salary-title', rows=2)
+
+    # Ikki qatorli sarlavha: №, Xodim va har bir pul ustuni uchun sum/$ juftligi
+    main_headers = [
+        "№", _("Xodim"), _("oylik"), _("hisoblandi"), _("tulandi"), _("qarzdorlik (bosh)"), _("qarzdorlik (oxiri)"),
+    ]
+    sheet.row(
+        main_headers[:2] + [value for header in main_headers[2:] for value in (header, None)],
+        style='salary-header',
+    )
+    sheet.row([None, None] + [(header, 'salary-subheader') for header in sub_headers])
+    sheet.merge(1, 1, 3, 4)
+    sheet.merge(2, 2, 3, 4)
+    for first_col in range(3, last_col, 2):
+        sheet.merge(first_col, first_col + 1, 3)
+
+    # Xodimlarni turlariga qarab guruhlash
+    employee_type_groups = {
+        'full': _('⭐ To\'liq stavka xodimlar'),
+        'half': _('📋 15 kunlik xodimlar'),
+        'weekly': _('📆 Haftada 1 kun xodimlar'),
+        'guard': _('🛡️ Qorovul xodimlar'),
+        'office': _('💼 Ofis xodimlari'),
+    }
+    stats = list(stats)
+    employee_number = 0
+    for emp_type, group_title in employee_type_groups.items():
+        group_stats = [stat for stat in stats if stat.employee.employee_type == emp_type]
+        if not group_stats:
+            continue
+        sheet.banner(str(group_title).upper(), f'salary-group-{emp_type}', height=25)
+        records = []
+        for stat in group_stats:
+            employee_number += 1
+            name = stat.employee.get_full_name() + (f" — {stat.employee.position}" if stat.employee.position else "")
+            records.append([employee_number, name, *money_row(stat)])
+        sheet.write(records)
+        # Guruhlar orasida bo'sh qator
+        sheet.blank()
+
     if stats:
-        ws_all = wb.create_sheet(_("BARCHA XODIMLAR"))
-        create_grouped_worksheet(ws_all, _("Barcha xodimlar (umumiy)"), stats, '2C3E50', '34495E')
-    
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    filename = f"💰_ISOMER_OIL_Oylik_Statistika_{year}_{month:02d}_Professional.xlsx"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    wb.save(response)
-    return response
+        sheet.blank()
+        sheet.blank()
+        sheet.banner("💰 JAMI", 'salary-total-banner', height=30)
+        summary = []
+        for index, (sum_total, usd_total) in enumerate(zip(totals['sum'], totals['usd'])):
+            is_debt = money_fields[index].startswith('debt')
+            for amount in (sum_total, usd_total):
+                shown = amount != 0 if is_debt else amount > 0
+                summary.append(amount if shown else "")
+        cells = [("", 'salary-total-first'), ("JAMI", 'salary-total-label')]
+        for col, value in enumerate(summary, start=3):
+            style = 'salary-total'
+            if col >= 9 and value != "":
+                style = 'salary-total-debt' if value > 0 else 'salary-total-clear' if value == 0 else style
+            if col == last_col:
+                style += '-last'
+            cells.append((value, style, SALARY_SUM_FORMAT if col % 2 else SALARY_USD_FORMAT))
+        sheet.row(cells, height=28)
+
+    ws = sheet.finish()
+    ws.page_setup.orientation = ws.ORIENTATION_LANDSCAPE
+    ws.page_setup.paperSize = ws.PAPERSIZE_A4
+    ws.page_setup.fitToWidth = 1
+    ws.page_setup.fitToHeight = 0
+    # Sarlavha va header qatorlari har sahifada ko'rinadi
+    ws.print_title_rows = '1:4'
+    ws.page_margins.left = ws.page_margins.right = 0.5
+    ws.page_margins.top = ws.page_margins.bottom = 0.75
+    ws.page_margins.header = ws.page_margins.footer = 0.3
+
+    store_in_cache(cache_path, wb.save)
+    return cached_file_response(cache_path, filename, XLSX_CONTENT_TYPE)
 
 
 @login_required
@@ -2382,56 +1846,53 @@ def salary_payment_history_view(request):
 
 
 @login_required
+@background_export('salary_payments')
 def export_salary_payment_history_excel(request):
     """Oylik to'lovlar tarixini Excelga eksport."""
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, Alignment
-
     filters = _parse_salary_payment_filters(request)
     payments = _salary_payments_queryset(filters)
     month_labels = dict(MONTH_NAME_CHOICES)
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = _("To'lovlar")
-
     headers = [
         '№', _("To'lov sanasi"), _('Familiya'), _('Ism'), _("Otchestvasi"), _('Lavozim'),
         _('Hisobot yili'), _('Hisobot oyi'), _('Summa'), _('Valyuta'), _('Izoh'), _('Kiritilgan'),
     ]
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.font = Font(bold=True)
-        cell.alignment = Alignment(horizontal='center')
-
-    for idx, payment in enumerate(payments, start=1):
-        emp = payment.stat.employee
-        row = idx + 1
-        ws.cell(row=row, column=1, value=idx)
-        ws.cell(row=row, column=2, value=payment.paid_at.strftime('%d.%m.%Y'))
-        ws.cell(row=row, column=3, value=emp.last_name)
-        ws.cell(row=row, column=4, value=emp.first_name)
-        ws.cell(row=row, column=5, value=emp.middle_name or '')
-        ws.cell(row=row, column=6, value=emp.position or '')
-        ws.cell(row=row, column=7, value=payment.stat.year)
-        ws.cell(row=row, column=8, value=_excel_value(month_labels.get(payment.stat.month, payment.stat.month)))
-        ws.cell(row=row, column=9, value=float(payment.amount))
-        ws.cell(row=row, column=10, value=payment.stat.currency)
-        ws.cell(row=row, column=11, value=payment.note)
-        ws.cell(row=row, column=12, value=payment.created_at.strftime('%d.%m.%Y %H:%M'))
-
-    for col in range(1, len(headers) + 1):
-        col_letter = get_column_letter(col)
-        max_len = max(len(str(ws.cell(row=r, column=col).value or '')) for r in range(1, ws.max_row + 1))
-        ws.column_dimensions[col_letter].width = min(max_len + 2, 40)
-
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+    def payment_rows():
+        return payments.values_list(
+            'paid_at', 'stat__employee__last_name', 'stat__employee__first_name', 'stat__employee__middle_name',
+            'stat__employee__position', 'stat__year', 'stat__month', 'amount', 'stat__currency', 'note', 'created_at',
+        ).iterator(chunk_size=2000)
+
+    fmt = export_format(request)
+    if fmt:
+        return csv_response(headers, (
+            (idx, paid_at.isoformat(), last_name, first_name, middle_name or '', position or '', stat_year,
+             month_labels.get(stat_month, stat_month), amount, currency, note,
+             timezone.localtime(created_at).strftime('%Y-%m-%d %H:%M'))
+            for idx, (paid_at, last_name, first_name, middle_name, position, stat_year, stat_month,
+                      amount, currency, note, created_at) in enumerate(payment_rows(), start=1)
+        ), f"Oylik_tolovlar_{filters['year']}", fmt)
+
+    wb = new_workbook()
+    sheet = SheetWriter(wb, _("To'lovlar"), [
+        Column(headers[0], itemgetter(0), max_width=40),
+        Column(headers[1], lambda row: row[1].strftime('%d.%m.%Y'), max_width=40),
+        *(Column(header, itemgetter(index), max_width=40) for index, header in enumerate(headers[2:7], start=2)),
+        Column(headers[7], lambda row: _excel_value(month_labels.get(row[7], row[7])), max_width=40),
+        Column(headers[8], lambda row: float(row[8]), max_width=40),
+        Column(headers[9], itemgetter(9), max_width=40),
+        Column(headers[10], itemgetter(10), max_width=40),
+        Column(headers[11], lambda row: row[11].strftime('%d.%m.%Y %H:%M'), max_width=40),
+    ])
+    sheet.header(style=EXPORT_HEADER_STYLE)
+    sheet.write(
+        (idx, paid_at, last_name, first_name, middle_name or '', position or '', stat_year, stat_month,
+         amount, currency, note, created_at)
+        for idx, (paid_at, last_name, first_name, middle_name, position, stat_year, stat_month,
+                  amount, currency, note, created_at) in enumerate(payment_rows(), start=1)
     )
-    filename = f"Oylik_tolovlar_{filters['year']}.xlsx"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    wb.save(response)
-    return response
+    sheet.finish()
+    return xlsx_file_response(wb, f"Oylik_tolovlar_{filters['year']}.xlsx")
 
 
 @login_required
@@ -2584,16 +2045,17 @@ def individual_employee_statistics(request, employee_id):
     start_date = date(year, month, 1)
     end_date = date(year, month, monthrange(year, month)[1])
     
-    # Xodimning davomat ma'lumotlari
-    attendances = Attendance.objects.filter(
-        employee=employee,
-        date__range=[start_date, end_date]
-    ).order_by('date')
+    # Xodimning davomat ma'lumotlari (bitta so'rov, sana bo'yicha)
+    attendance_by_date = {
+        attendance.date: attendance
+        for attendance in Attendance.objects.filter(
+            employee=employee,
+            date__range=[start_date, end_date]
+        )
+    }
     
     # Yopiq kunlar
-    dayoffs = DayOff.objects.filter(
-        date__range=[start_date, end_date]
-    ).values_list('date', flat=True)
+    dayoffs = get_work_calendar(year).day_offs_in_month(month)
     
     # Kunlik ma'lumotlar yaratish
     daily_data = []
@@ -2605,7 +2067,7 @@ def individual_employee_statistics(request, employee_id):
         is_dayoff = current_date in dayoffs
         
         # Bu kun uchun davomat ma'lumoti
-        attendance = attendances.filter(date=current_date).first()
+        attendance = attendance_by_date.get(current_date)
         
         if attendance:
             status = attendance.status
@@ -2632,12 +2094,14 @@ def individual_employee_statistics(request, employee_id):
     
     # Statistikalar
     total_days = len(daily_data)
-    present = len([d for d in daily_data if d['status'] == 'present'])
-    absent = len([d for d in daily_data if d['status'] == 'absent'])
-    late = len([d for d in daily_data if d['status'] == 'late'])
-    sick = len([d for d in daily_data if d['status'] == 'sick'])
-    vacation = len([d for d in daily_data if d['status'] == 'vacation'])
-    business = len([d for d in daily_data if d['status'] == 'business'])
+    # Holatlar soni rollup jadvalidan
+    summary = get_attendance_summary_map(year, month, [employee.pk]).get(employee.pk)
+    present = summary.present if summary else 0
+    absent = summary.absent if summary else 0
+    late = summary.late if summary else 0
+    sick = summary.sick if summary else 0
+    vacation = summary.vacation if summary else 0
+    business = summary.business if summary else 0
     sunday = len([d for d in daily_data if d['status'] == 'sunday'])
     dayoff = len([d for d in daily_data if d['status'] == 'dayoff'])
     unknown = len([d for d in daily_data if d['status'] == 'unknown'])
@@ -2749,14 +2213,13 @@ def edit_attendance_history(request):
     if request.method == 'POST':
         formset = AttendanceFormSet(request.POST, queryset=attendances)
         if formset.is_valid():
-            sync_targets = {
-                (obj.employee_id, obj.date.year, obj.date.month) for obj in attendances
-            }
+            changed_forms = [form for form in formset.forms if form.has_changed()]
+            previous_employee_ids = {form.initial.get('employee') for form in changed_forms}
             formset.save()
-            for emp_id, sync_year, sync_month in sync_targets:
-                sync_monthly_stats_for_month(
-                    sync_year, sync_month, employee=Employee.objects.filter(pk=emp_id).first()
-                )
+            employee_ids = {form.instance.employee_id for form in changed_forms} | previous_employee_ids
+            employee_ids |= {obj.employee_id for obj in formset.deleted_objects}
+            employee_ids.discard(None)
+            recalculate_dirty_stats(employee_ids=employee_ids)
             messages.success(request, _("Davomat ma'lumotlari yangilandi!"))
             return redirect('edit_attendance_history')
     else:
@@ -2799,16 +2262,17 @@ def employee_attendance_history(request, employee_id):
     start_date = date(year, month, 1)
     end_date = date(year, month, monthrange(year, month)[1])
     
-    # Xodimning bu oydagi davomat ma'lumotlari
-    attendance_records = Attendance.objects.filter(
-        employee=employee,
-        date__range=[start_date, end_date]
-    ).order_by('date')
+    # Xodimning bu oydagi davomat ma'lumotlari (bitta so'rov, sana bo'yicha)
+    attendance_by_date = {
+        record.date: record
+        for record in Attendance.objects.filter(
+            employee=employee,
+            date__range=[start_date, end_date]
+        )
+    }
     
     # Yopiq kunlar
-    dayoffs = DayOff.objects.filter(
-        date__range=[start_date, end_date]
-    ).values_list('date', flat=True)
+    dayoffs = get_work_calendar(start_date.year).day_offs_in_month(start_date.month)
     
     # Kalendar kunlari yaratish (7x7 grid uchun)
     calendar_days = []
@@ -2833,7 +2297,7 @@ def employee_attendance_history(request, employee_id):
         is_dayoff = current_date in dayoffs
         
         # Bu kun uchun davomat ma'lumoti
-        attendance = attendance_records.filter(date=current_date).first()
+        attendance = attendance_by_date.get(current_date)
         
         if attendance:
             status = attendance.status
@@ -2967,7 +2431,8 @@ def get_attendance_data_ajax(request, employee_id):
     attendance = Attendance.objects.filter(employee=employee, date=date_val).first()
     
     # Yopiq kun yoki yakshanba tekshirish
-    is_dayoff = DayOff.objects.filter(date=date_val).exists()
+    dayoff = get_work_calendar(date_val.year).get_day_off(date_val)
+    is_dayoff = dayoff is not None
     is_sunday = date_val.weekday() == 6
     
     data = {
@@ -2979,7 +2444,7 @@ def get_attendance_data_ajax(request, employee_id):
         'comment': attendance.comment if attendance else '',
         'is_dayoff': is_dayoff,
         'is_sunday': is_sunday,
-        'dayoff_reason': DayOff.objects.filter(date=date_val).first().reason if is_dayoff else None
+        'dayoff_reason': dayoff.reason if is_dayoff else None
     }
     
     return JsonResponse(data)
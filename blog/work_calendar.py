@@ -0,0 +1,93 @@
+"""
+Ish kalendari: yakshanbalar va yopiq kunlar (DayOff).
+
+Bir yillik DayOff yozuvlari bitta so'rov bilan yuklanadi (WorkCalendar.load);
+ishchi kunlar soni va cheklangan kun tekshiruvlari xotirada hisoblanadi.
+
+get_work_calendar() nusxasi Django cache'da saqlanadi va faqat sahifalarda
+ko'rsatish uchun: DayOff signali cache'ni faqat o'z jarayonida tozalaydi,
+umumiy cache (Redis/Memcached) bo'lmasa boshqa jarayonlar eski kalendarni
+WORK_CALENDAR_CACHE_TIMEOUT soniya davomida ko'radi. Oylik hisobi va davomat
+tekshiruvlari (forma, import) shuning uchun WorkCalendar.load() bilan
+to'g'ridan-to'g'ri bazadan o'qiydi.
+"""
+from calendar import monthrange
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .models import DayOff
+
+SUNDAY = 6
+CACHE_KEY = "blog:work_calendar:{year}"
+
+
+def _cache_timeout():
+    return getattr(settings, "WORK_CALENDAR_CACHE_TIMEOUT", 300)
+
+
+class WorkCalendar:
+    """Bir yil uchun yopiq kunlar (sana → sabab) va ular ustidagi hisoblar."""
+
+    __slots__ = ("year", "day_offs")
+
+    def __init__(self, year: int, day_offs: dict):
+        self.year = year
+        self.day_offs = day_offs
+
+    @classmethod
+    def load(cls, year: int):
+        rows = DayOff.objects.filter(date__year=year).values_list("date", "reason")
+        return cls(year, dict(rows))
+
+    def is_day_off(self, day: date) -> bool:
+        return day in self.day_offs
+
+    def is_restricted(self, day: date) -> bool:
+        """Yakshanba yoki yopiq kun."""
+        return day.weekday() == SUNDAY or day in self.day_offs
+
+    def get_day_off(self, day: date):
+        """Shablonlar uchun saqlanmagan DayOff (date, reason) yoki None."""
+        reason = self.day_offs.get(day)
+        return DayOff(date=day, reason=reason) if reason is not None else None
+
+    def day_offs_in_month(self, month: int) -> set:
+        return {day for day in self.day_offs if day.month == month}
+
+    def working_days_in_month(self, month: int):
+        """(ishchi kunlar, oy kunlari) — yakshanba va yopiq kunlarsiz."""
+        total_days = monthrange(self.year, month)[1]
+        first = date(self.year, month, 1)
+        working_days = sum(
+            1
+            for offset in range(total_days)
+            if not self.is_restricted(first + timedelta(days=offset))
+        )
+        return working_days, total_days
+
+
+def get_work_calendar(year: int) -> WorkCalendar:
+    """
+    Yil kalendari cache'dan, bo'lmasa bazadan (bitta so'rov). Faqat ko'rsatish
+    uchun — oylik hisobi va tekshiruvlar WorkCalendar.load() ishlatadi.
+    Tranzaksiya ichida o'qilgan kalendar cache'ga yozilmaydi — orqaga
+    qaytarilishi mumkin bo'lgan yozuvlar boshqa so'rovlarga ko'rinmasligi uchun.
+    """
+    key = CACHE_KEY.format(year=year)
+    day_offs = cache.get(key)
+    if day_offs is None:
+        calendar = WorkCalendar.load(year)
+        if not connection.in_atomic_block:
+            cache.set(key, calendar.day_offs, _cache_timeout())
+        return calendar
+    return WorkCalendar(year, day_offs)
+
+
+def invalidate_work_calendar(*years):
+    """Yillar kalendarini cache'dan o'chiradi (darhol va tranzaksiya tugagach)."""
+    keys = [CACHE_KEY.format(year=year) for year in set(years)]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))